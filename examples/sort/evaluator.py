@@ -11,7 +11,7 @@ for _ in range(10):
     try:
         with run_algorithm(submission.source) as process:
             process.procedures.sort(n, a)
-            b = [process.functions.get_element(i) for i in range(n)]
+            b = process.map("get_element", range(n), has_return_value=True)
     except AlgorithmError as e:
         print(e)
         all_passed = False
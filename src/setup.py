@@ -1,5 +1,51 @@
 #!/usr/bin/env python
 
+import importlib.util
+import os
+import sys
+
 from setuptools import setup
+from setuptools.command.build_py import build_py
+from setuptools.command.develop import develop
+
+COMPILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "turingarena", "driver", "compile")
+
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def generate_static_parser(command):
+    # the package cannot be imported here (its dependencies may not be installed while building),
+    # so only the grammar and the parser modules are loaded, by path
+    try:
+        load_module("turingarena.driver.compile.grammar", os.path.join(COMPILE_DIR, "grammar.py"))
+        parser = load_module("turingarena.driver.compile.parser", os.path.join(COMPILE_DIR, "parser.py"))
+        parser.write_static_parser()
+    except Exception as e:
+        # the grammar is compiled at runtime instead
+        command.warn(f"cannot generate the static interface parser: {e}")
+
+
+class BuildPyCommand(build_py):
+    def run(self):
+        generate_static_parser(self)
+        super().run()
+
+
+class DevelopCommand(develop):
+    def run(self):
+        generate_static_parser(self)
+        super().run()
+
 
-setup()
+setup(
+    cmdclass={
+        "build_py": BuildPyCommand,
+        "develop": DevelopCommand,
+    },
+)
@@ -0,0 +1,290 @@
+import fcntl
+import hashlib
+import io
+import logging
+import os
+import shutil
+import tempfile
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from subprocess import CalledProcessError
+
+from turingarena.driver.jobserver import compile_job
+from turingarena.version import VERSION
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 1024 ** 3
+BUILD_PREFIX = ".build-"
+LOCK_PREFIX = ".lock-"
+TOOL_CACHE_LOCK = "tool-cache"
+# artifacts used more recently than this are not evicted, since they may be about to be used
+EVICTION_GRACE_TIME = 60
+
+
+def default_cache_dir():
+    cache_home = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.environ.get("TURINGARENA_CACHE_DIR", os.path.join(cache_home, "turingarena"))
+
+
+def artifact_key(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode()
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class ArtifactCache(namedtuple("ArtifactCache", ["directory", "max_size"])):
+    """
+    Content-addressed directory of build artifacts, with LRU eviction by size.
+
+    Each artifact is a directory named after its key.
+    Artifacts are built in a temporary directory and then renamed,
+    so concurrent builds of the same artifact are safe.
+    A build of an artifact waits for a build of the same artifact already in progress (in any process),
+    and uses its result.
+
+    If the directory cannot be created (e.g., read-only file system, or no home directory),
+    artifacts are built in temporary directories, without caching them.
+    """
+
+    __slots__ = []
+
+    @classmethod
+    def default(cls, section):
+        return cls(
+            directory=os.path.join(default_cache_dir(), section),
+            max_size=int(os.environ.get("TURINGARENA_CACHE_MAX_SIZE", DEFAULT_MAX_SIZE)),
+        )
+
+    def artifact_path(self, key):
+        return os.path.join(self.directory, key)
+
+    def lookup(self, key):
+        path = self.artifact_path(key)
+        if not os.path.isdir(path):
+            return None
+        # mark as recently used
+        os.utime(path)
+        return path
+
+    def get_or_build(self, key, build):
+        cached_path = self.lookup(key)
+        if cached_path is not None:
+            logger.debug(f"artifact cache hit: {cached_path}")
+            return cached_path
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+        except OSError as e:
+            logger.warning(f"cannot create artifact cache {self.directory} ({e}), building without caching")
+            return self._build_uncached(build)
+
+        lock_path = os.path.join(self.directory, LOCK_PREFIX + key)
+        with open(lock_path, "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+            cached_path = self.lookup(key)
+            if cached_path is not None:
+                logger.debug(f"artifact built concurrently: {cached_path}")
+                return cached_path
+
+            try:
+                return self._build(key, build)
+            finally:
+                # builds waiting on this lock find the artifact (if built), and new ones do not lock
+                try:
+                    os.remove(lock_path)
+                except FileNotFoundError:
+                    pass
+
+    def _build(self, key, build):
+        path = self.artifact_path(key)
+        build_dir = tempfile.mkdtemp(prefix=BUILD_PREFIX, dir=self.directory)
+        try:
+            build(build_dir)
+        except BaseException:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            raise
+
+        try:
+            os.rename(build_dir, path)
+        except OSError:
+            # the same artifact was built concurrently
+            shutil.rmtree(build_dir, ignore_errors=True)
+
+        logger.debug(f"artifact cache miss, built: {path}")
+        self.evict(keep=os.path.basename(path))
+        return path
+
+    def _build_uncached(self, build):
+        build_dir = tempfile.mkdtemp(prefix="turingarena-artifact-")
+        try:
+            build(build_dir)
+        except BaseException:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            raise
+        return build_dir
+
+    def evict(self, keep=None):
+        """
+        Removes the least recently used artifacts, until the cache fits in its maximum size.
+
+        Artifacts being built, or used within the last EVICTION_GRACE_TIME seconds, are never removed,
+        so an artifact is not removed between its lookup and its use by another process.
+        """
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.startswith((BUILD_PREFIX, LOCK_PREFIX)) or name == keep:
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                entries.append((os.stat(path).st_mtime, _directory_size(path), path))
+            except FileNotFoundError:
+                continue
+
+        total_size = sum(size for _, size, _ in entries)
+        if keep is not None:
+            total_size += _directory_size(self.artifact_path(keep))
+
+        for mtime, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            if now - mtime < EVICTION_GRACE_TIME or self._is_building(path):
+                continue
+            logger.debug(f"evicting artifact: {path}")
+            self._remove(path)
+            total_size -= size
+
+    def _is_building(self, path):
+        lock_path = os.path.join(self.directory, LOCK_PREFIX + os.path.basename(path))
+        try:
+            fd = os.open(lock_path, os.O_RDONLY)
+        except FileNotFoundError:
+            return False
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        finally:
+            os.close(fd)
+        return False
+
+    def _remove(self, path):
+        if not os.path.isdir(path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return
+
+        # moved away first, so that a lookup never finds a partially removed artifact
+        trash_dir = tempfile.mkdtemp(prefix=BUILD_PREFIX, dir=self.directory)
+        try:
+            os.rename(path, os.path.join(trash_dir, "evicted"))
+        except FileNotFoundError:
+            # evicted concurrently
+            pass
+        shutil.rmtree(trash_dir, ignore_errors=True)
+
+
+@contextmanager
+def tool_cache_dir(section):
+    """
+    Context manager giving a directory where a build tool keeps its own cache (e.g., GOCACHE) across builds.
+
+    The directory is bounded in size like the artifact caches,
+    evicting its least recently modified top-level entries, which the tool must tolerate.
+    Builds hold a shared lock while using the directory, and eviction an exclusive one,
+    so that entries are never removed while a build may be using them.
+    """
+    cache = ArtifactCache.default(section)
+    try:
+        os.makedirs(cache.directory, exist_ok=True)
+    except OSError as e:
+        logger.warning(f"cannot create tool cache {cache.directory} ({e}), using a temporary one")
+        temp_dir = tempfile.mkdtemp(prefix=f"turingarena-{section}-")
+        try:
+            yield temp_dir
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        return
+
+    with open(os.path.join(cache.directory, LOCK_PREFIX + TOOL_CACHE_LOCK), "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            # other builds are using the directory, a later one evicts
+            pass
+        else:
+            cache.evict()
+        # waits for an eviction in progress
+        fcntl.flock(lock, fcntl.LOCK_SH)
+        yield cache.directory
+
+
+def _directory_size(path):
+    if not os.path.isdir(path):
+        # top-level files of tool caches
+        return os.lstat(path).st_size
+    size = 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                size += os.lstat(os.path.join(dirpath, name)).st_size
+            except FileNotFoundError:
+                pass
+    return size
+
+
+def program_artifact_key(runner):
+    skeleton = io.StringIO()
+    runner.language.Generator().generate_to_file(runner.interface, skeleton)
+
+    with open(runner.program.source_path, "rb") as f:
+        source = f.read()
+
+    return artifact_key(
+        VERSION,
+        runner.language.name,
+        *runner.build_options,
+        skeleton.getvalue(),
+        source,
+    )
+
+
+def compile_program(program, language, interface, cache=None):
+    """
+    Compiles a program, unless it is already in the artifact cache.
+
+    Returns the path of the directory containing the compiled program,
+    or None if the compilation failed.
+    """
+    if cache is None:
+        cache = ArtifactCache.default("programs")
+
+    key = program_artifact_key(language.ProgramRunner(
+        program=program,
+        language=language,
+        interface=interface,
+        temp_dir=None,
+    ))
+
+    def build(build_dir):
+        with compile_job(f"{language.name} {program.source_path}"):
+            language.ProgramRunner(
+                program=program,
+                language=language,
+                interface=interface,
+                temp_dir=build_dir,
+            ).compile()
+
+    try:
+        return cache.get_or_build(key, build)
+    except CalledProcessError:
+        return None
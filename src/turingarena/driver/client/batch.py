@@ -0,0 +1,104 @@
+from collections import deque
+
+from turingarena.driver.client.exceptions import AlgorithmError
+from turingarena.driver.client.proxy import MethodProxy
+
+MAX_PENDING_CALLS = 256
+
+
+class CallFuture:
+    def __init__(self, request):
+        self._request = request
+        self._done = False
+        self._cancelled = False
+        self._result = None
+
+    def done(self):
+        return self._done
+
+    def cancelled(self):
+        return self._cancelled
+
+    def result(self):
+        assert not self._cancelled, f"call to '{self._request.method_name}' was cancelled"
+        assert self._done, f"call to '{self._request.method_name}' has not completed yet"
+        return self._result
+
+    def _set_result(self, result):
+        self._result = result
+        self._done = True
+
+
+class CallBatch:
+    """
+    Sends calls to the driver without waiting for their results.
+
+    Calls are processed back-to-back by the driver, and their responses are collected
+    only when needed, i.e., when too many calls are pending or when the batch is completed.
+    The first error raises as usual, and the following calls are never completed.
+    If the batch is cancelled instead, none of the pending calls is completed.
+    Calls with callbacks cannot be pipelined, so they wait for all the pending calls first.
+    """
+
+    def __init__(self, process, max_pending=MAX_PENDING_CALLS):
+        self._process = process
+        self._max_pending = max_pending
+        self._pending = deque()
+
+        self.procedures = MethodProxy(self, has_return_value=False)
+        self.functions = MethodProxy(self, has_return_value=True)
+
+    def call(self, method_name, *args, has_return_value, callbacks=None):
+        future = CallFuture(self._process._make_call_request(
+            method_name,
+            args,
+            has_return_value=has_return_value,
+            callbacks=callbacks,
+        ))
+
+        if future._request.callbacks:
+            self.complete()
+            future._set_result(self._process._do_call(future._request))
+            return future
+
+        self._process._send_call(future._request)
+        self._pending.append(future)
+
+        while len(self._pending) > self._max_pending:
+            self._complete_next()
+
+        return future
+
+    def map(self, method_name, *iterables, has_return_value):
+        return [
+            self.call(method_name, *args, has_return_value=has_return_value)
+            for args in zip(*iterables)
+        ]
+
+    def complete(self):
+        while self._pending:
+            self._complete_next()
+
+    def cancel(self):
+        """
+        Gives up the results of the pending calls, without raising their errors.
+        """
+        pending, self._pending = self._pending, deque()
+        for future in pending:
+            future._cancelled = True
+        # the responses are still received, so that the next requests get their own
+        for future in pending:
+            try:
+                self._process._receive_call_result(future._request)
+            except AlgorithmError:
+                # the driver stops at the first error
+                break
+
+    def _complete_next(self):
+        future = self._pending.popleft()
+        try:
+            future._set_result(self._process._receive_call_result(future._request))
+        except BaseException:
+            # the driver stops at the first error, the following calls will never complete
+            self._pending.clear()
+            raise
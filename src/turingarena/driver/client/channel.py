@@ -0,0 +1,201 @@
+import logging
+import struct
+from array import array
+from enum import Enum
+
+logger = logging.getLogger(__name__)
+
+
+class DriverProtocol(Enum):
+    LINES = "lines"
+    FRAMES = "frames"
+
+
+FRAME_HEADER = struct.Struct("=I")
+FLOAT_VALUE = struct.Struct("=d")
+
+INT_CHUNK = ord("i")
+FLOAT_CHUNK = ord("f")
+STR_CHUNK = ord("s")
+
+
+class LineChannel:
+    """
+    Exchanges one item per text line.
+
+    Slow, but human readable: useful for debugging the driver.
+    """
+
+    protocol = DriverProtocol.LINES
+
+    def __init__(self, input, output):
+        self._input = input
+        self._output = output
+
+    def send(self, item):
+        print(item, file=self._output)
+
+    def flush(self):
+        self._output.flush()
+
+    def fileno(self):
+        return self._input.fileno()
+
+    def receive(self):
+        self.flush()
+        line = self._input.readline()
+        if not line:
+            return None
+        return line.strip()
+
+
+class FrameChannel:
+    """
+    Exchanges length-prefixed binary frames.
+
+    Items are buffered until the channel is flushed (which happens implicitly
+    before receiving), so that a whole request or response travels in a single frame.
+    Consecutive integers are packed together as a single array chunk.
+    """
+
+    protocol = DriverProtocol.FRAMES
+
+    def __init__(self, input, output):
+        self._input = input
+        self._output = output
+        self._pending = []
+        self._received = iter(())
+        # size of the frame whose header was read, but not its payload yet
+        self._frame_size = None
+
+    def send(self, item):
+        self._pending.append(item)
+
+    def flush(self):
+        if self._pending:
+            payload = encode_frame(self._pending)
+            self._pending = []
+            self._output.write(FRAME_HEADER.pack(len(payload)))
+            self._output.write(payload)
+        self._output.flush()
+
+    def fileno(self):
+        return self._input.fileno()
+
+    def receive(self):
+        for item in self._received:
+            return item
+
+        self.flush()
+        # on a non-blocking input, each read may raise BlockingIOError, and receive is called again
+        if self._frame_size is None:
+            header = self._input.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                return None
+            self._frame_size, = FRAME_HEADER.unpack(header)
+        size = self._frame_size
+        payload = self._input.read(size)
+        self._frame_size = None
+        if len(payload) < size:
+            return None
+
+        self._received = iter(decode_frame(payload))
+        return self.receive()
+
+
+def encode_frame(items):
+    chunks = []
+    ints = array("q")
+
+    def flush_ints():
+        if ints:
+            chunks.append(bytes([INT_CHUNK]))
+            chunks.append(FRAME_HEADER.pack(len(ints)))
+            chunks.append(ints.tobytes())
+            del ints[:]
+
+    for item in items:
+        if isinstance(item, str):
+            flush_ints()
+            data = item.encode()
+            chunks.append(bytes([STR_CHUNK]))
+            chunks.append(FRAME_HEADER.pack(len(data)))
+            chunks.append(data)
+        elif isinstance(item, float):
+            flush_ints()
+            chunks.append(bytes([FLOAT_CHUNK]))
+            chunks.append(FLOAT_VALUE.pack(item))
+        else:
+            ints.append(int(item))
+    flush_ints()
+
+    return b"".join(chunks)
+
+
+def decode_frame(payload):
+    items = []
+    pos = 0
+    while pos < len(payload):
+        tag = payload[pos]
+        pos += 1
+        if tag == FLOAT_CHUNK:
+            value, = FLOAT_VALUE.unpack_from(payload, pos)
+            pos += FLOAT_VALUE.size
+            items.append(value)
+            continue
+
+        size, = FRAME_HEADER.unpack_from(payload, pos)
+        pos += FRAME_HEADER.size
+        if tag == INT_CHUNK:
+            ints = array("q")
+            end = pos + size * ints.itemsize
+            ints.frombytes(payload[pos:end])
+            items.extend(ints.tolist())
+        elif tag == STR_CHUNK:
+            end = pos + size
+            items.append(payload[pos:end].decode())
+        else:
+            raise ValueError(f"invalid chunk in driver frame: {tag}")
+        pos = end
+    return items
+
+
+def _create_channel(protocol, *, input, output):
+    if protocol is DriverProtocol.FRAMES:
+        return FrameChannel(input.buffer, output.buffer)
+    return LineChannel(input, output)
+
+
+def open_client_channel(connection, protocol=DriverProtocol.FRAMES):
+    """
+    Negotiates the protocol with the driver server, on the client side.
+
+    The negotiation happens in line mode: the client proposes a protocol,
+    and the server answers with the one it accepts.
+    """
+    protocol = DriverProtocol(protocol)
+
+    print(protocol.value, file=connection.downward)
+    connection.downward.flush()
+    answer = connection.upward.readline().strip()
+    assert answer, "no protocol received from driver"
+    accepted = DriverProtocol(answer)
+
+    logger.debug(f"driver protocol: {accepted.value}")
+    return _create_channel(accepted, input=connection.upward, output=connection.downward)
+
+
+def accept_server_channel(connection):
+    """
+    Negotiates the protocol with the driver client, on the server side.
+    """
+    proposal = connection.downward.readline().strip()
+    try:
+        protocol = DriverProtocol(proposal)
+    except ValueError:
+        logger.warning(f"unknown driver protocol '{proposal}', falling back to lines")
+        protocol = DriverProtocol.LINES
+
+    print(protocol.value, file=connection.upward)
+    connection.upward.flush()
+    return _create_channel(protocol, input=connection.downward, output=connection.upward)
@@ -1,4 +1,4 @@
-import collections
+import collections.abc
 import logging
 import numbers
 from enum import IntEnum
@@ -18,7 +18,7 @@ class MetaType(IntEnum):
 
 
 def get_meta_type(value):
-    if isinstance(value, collections.Iterable):
+    if isinstance(value, collections.abc.Iterable):
         return MetaType.ARRAY
     if isinstance(value, numbers.Integral):
         return MetaType.SCALAR
@@ -3,6 +3,7 @@ import math
 from collections import namedtuple
 from contextlib import contextmanager
 
+from turingarena.driver.client.batch import CallBatch
 from turingarena.driver.client.commands import DriverState, serialize_data
 from turingarena.driver.client.exceptions import *
 from turingarena.driver.client.processinfo import SandboxProcessInfo
@@ -24,8 +25,8 @@ class ProcessSection:
 
 
 class Process:
-    def __init__(self, connection):
-        self._connection = connection
+    def __init__(self, channel):
+        self._channel = channel
 
         self.procedures = MethodProxy(self, has_return_value=False)
         self.functions = MethodProxy(self, has_return_value=True)
@@ -35,6 +36,9 @@ class Process:
         self._main_section = ProcessSection()
         self._running_sections = set()
 
+        self._batch = None
+        self._driver_failed = False
+
     @contextmanager
     def section(self, time_limit=None, memory_limit=None):
         if time_limit is None:
@@ -69,17 +73,49 @@ class Process:
             exc_type=MemoryLimitExceeded,
         )
 
+    @contextmanager
+    def batch(self):
+        assert self._batch is None, "batches cannot be nested"
+        batch = CallBatch(self)
+        self._batch = batch
+        try:
+            yield batch
+        except (InterfaceExit, ProcessStop):
+            batch.complete()
+            raise
+        except BaseException:
+            # the error of a pending call must not hide this one
+            batch.cancel()
+            raise
+        else:
+            batch.complete()
+        finally:
+            self._batch = None
+
     def call(self, method_name, *args, has_return_value, callbacks=None):
+        request = self._make_call_request(
+            method_name,
+            args,
+            has_return_value=has_return_value,
+            callbacks=callbacks,
+        )
+        return self._do_call(request)
+
+    def map(self, method_name, *iterables, has_return_value):
+        with self.batch() as batch:
+            futures = batch.map(method_name, *iterables, has_return_value=has_return_value)
+        return [f.result() for f in futures]
+
+    def _make_call_request(self, method_name, args, *, has_return_value, callbacks):
         if callbacks is None:
             callbacks = {}
 
-        request = CallRequest(
+        return CallRequest(
             method_name=method_name,
             arguments=args,
             has_return_value=has_return_value,
             callbacks=callbacks,
         )
-        return self._do_call(request)
 
     def check(self, condition, message, exc_type=AlgorithmLogicError):
         if not condition:
@@ -153,9 +189,15 @@ class Process:
             )
 
     def _do_call(self, request):
+        self._complete_batch()
+        self._send_call(request)
+        return self._receive_call_result(request)
+
+    def _send_call(self, request):
         for line in self._call_lines(request):
             self._send_request_line(line)
 
+    def _receive_call_result(self, request):
         self._accept_callbacks(request.callbacks)
 
         if request.has_return_value:
@@ -171,16 +213,24 @@ class Process:
         raise ProcessStop
 
     def checkpoint(self):
+        self._complete_batch()
         self._send_request_line("checkpoint")
         self._wait_ready()
 
     def _send_stop(self):
+        if self._driver_failed:
+            # the driver already terminated after reporting the error
+            return
         self._send_request_line("stop")
         self._wait_ready()
 
     def _send_exit(self):
         self._send_request_line("exit")
 
+    def _complete_batch(self):
+        if self._batch is not None:
+            self._batch.complete()
+
     def _accept_callbacks(self, callback_list):
         while True:
             self._wait_ready()
@@ -208,9 +258,8 @@ class Process:
             self._send_request_line(0)
 
     def _get_response_line(self):
-        self._connection.downward.flush()
-        line = self._connection.upward.readline().strip()
-        assert line, "no line received from driver"
+        line = self._channel.receive()
+        assert line not in (None, ""), "no line received from driver"
         return line
 
     def _get_response_value(self):
@@ -218,6 +267,7 @@ class Process:
 
     def _raise_error(self):
         message = self._get_response_line()
+        self._driver_failed = True
         self.fail(message, exc_type=AlgorithmRuntimeError)
 
     def _wait_ready(self):
@@ -242,7 +292,7 @@ class Process:
             yield c.__code__.co_argcount
 
     def _send_request_line(self, line):
-        print(line, file=self._connection.downward)
+        self._channel.send(line)
 
 
 CallRequest = namedtuple("CallRequest", ["method_name", "arguments", "has_return_value", "callbacks"])
@@ -4,15 +4,44 @@ import subprocess
 import threading
 from collections import namedtuple
 from contextlib import ExitStack, contextmanager
+from enum import Enum
 
+from turingarena.driver.client.channel import DriverProtocol, _create_channel, open_client_channel
 from turingarena.driver.client.connection import DriverProcessConnection
 from turingarena.driver.client.exceptions import InterfaceExit
 from turingarena.driver.client.process import Process
 
 
+class ServerMode(Enum):
+    # a driver server thread for each running program
+    THREAD = "thread"
+    # a single thread serving all the running programs (see turingarena.driver.multiplex)
+    MULTIPLEXED = "multiplexed"
+
+    @classmethod
+    def default(cls):
+        return cls(os.environ.get("TURINGARENA_DRIVER_SERVER", cls.THREAD.value))
+
+
 class Program(namedtuple("Program", [
     "source_path", "interface_path",
 ])):
+    def compile(self):
+        """
+        Compiles the program into the artifact cache, so that the following runs start immediately.
+
+        Returns the path of the compiled artifact, or None if the compilation failed.
+        """
+        from turingarena.driver.artifacts import compile_program
+        from turingarena.driver.compile.compile import load_interface
+        from turingarena.driver.language import Language
+
+        return compile_program(
+            self,
+            Language.from_source_path(self.source_path),
+            load_interface(self.interface_path),
+        )
+
     def _open_pipes(self, stack: ExitStack):
         return [
             stack.enter_context(open(fd, mode))
@@ -20,7 +49,7 @@ class Program(namedtuple("Program", [
         ]
 
     @contextmanager
-    def _run_server_in_thread(self, downward_tee, upward_tee):
+    def _run_server_in_thread(self, downward_tee, upward_tee, execution_mode=None):
         with ExitStack() as stack:
             client_upward, server_upward = self._open_pipes(stack)
             server_downward, client_downward = self._open_pipes(stack)
@@ -31,7 +60,8 @@ class Program(namedtuple("Program", [
                     run_server(DriverProcessConnection(
                         upward=server_upward,
                         downward=server_downward,
-                    ), self.source_path, self.interface_path, downward_tee=downward_tee, upward_tee=upward_tee)
+                    ), self.source_path, self.interface_path, downward_tee=downward_tee, upward_tee=upward_tee,
+                        execution_mode=execution_mode)
 
                     logging.debug("driver server terminated")
                 except Exception as e:
@@ -50,6 +80,49 @@ class Program(namedtuple("Program", [
 
             stack.callback(thread.join)
 
+    @contextmanager
+    def _run_server_multiplexed(self, downward_tee, upward_tee, protocol, execution_mode=None):
+        """
+        Runs the driver server in the multiplexed server of this process,
+        and returns the channel of the client.
+        Since both ends are here, the protocol is not negotiated.
+        """
+        from turingarena.driver.multiplex import NonBlockingReader, NonBlockingWriter, get_multiplexed_server
+        from turingarena.driver.server import DriverSession
+
+        protocol = DriverProtocol(protocol)
+        upward_read, upward_write = os.pipe()
+        downward_read, downward_write = os.pipe()
+        server_upward = NonBlockingWriter(upward_write)
+        server_downward = NonBlockingReader(downward_read)
+
+        with open(upward_read) as client_upward, open(downward_write, "w") as client_downward:
+            try:
+                server_channel = _create_channel(protocol, input=server_downward, output=server_upward)
+                session = DriverSession(
+                    server_channel, self.source_path, self.interface_path, downward_tee, upward_tee,
+                    execution_mode=execution_mode,
+                    multiplexed=True,
+                )
+            except:
+                server_upward.close()
+                server_downward.close()
+                raise
+
+            # the server files are closed by the multiplexed server
+            done = get_multiplexed_server().submit(
+                session.run(),
+                session.watchdog,
+                writers=[server_upward, session.sandbox_downward],
+                closing=[server_upward, server_downward],
+            )
+            try:
+                yield _create_channel(protocol, input=client_upward, output=client_downward)
+            finally:
+                # the server terminates anyway, if the client did not stop it
+                client_downward.close()
+                done.wait()
+
     @contextmanager
     def _run_server_in_process(self, downward_tee, upward_tee):
         with subprocess.Popen(
@@ -72,10 +145,22 @@ class Program(namedtuple("Program", [
             )
 
     @contextmanager
-    def run(self, downward_tee="/dev/null", upward_tee="/dev/null", **kwargs):
+    def run(self, downward_tee="/dev/null", upward_tee="/dev/null", protocol=DriverProtocol.FRAMES,
+            execution_mode=None, server_mode=None, **kwargs):
+        if server_mode is None:
+            server_mode = ServerMode.default()
+
         with ExitStack() as stack:
-            driver_connection = stack.enter_context(self._run_server_in_thread(downward_tee, upward_tee))
+            if server_mode is ServerMode.MULTIPLEXED:
+                channel = stack.enter_context(
+                    self._run_server_multiplexed(downward_tee, upward_tee, protocol, execution_mode),
+                )
+            else:
+                driver_connection = stack.enter_context(
+                    self._run_server_in_thread(downward_tee, upward_tee, execution_mode),
+                )
+                channel = open_client_channel(driver_connection, protocol)
 
-            process = Process(driver_connection)
+            process = Process(channel)
             with process._run(**kwargs):
                 yield process
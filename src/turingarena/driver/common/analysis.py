@@ -1,12 +1,14 @@
 from turingarena.driver.common.nodes import *
 from turingarena.driver.compile.analysis import ReferenceDefinition, ReferenceResolution
 from turingarena.driver.gen.nodes import VariableDeclaration, Alloc
+from turingarena.util.memo import memoizedanalysis
 from turingarena.util.visitor import visitormethod
 
 
 class InterfaceAnalyzer:
+    @memoizedanalysis
     def reference_actions(self, n):
-        return list(self._get_reference_actions(n))
+        return tuple(self._get_reference_actions(n))
 
     @visitormethod
     def _get_reference_actions(self, n):
@@ -92,7 +94,8 @@ class InterfaceAnalyzer:
         return self.is_reference(e.array) and isinstance(e.index, Variable)
 
     def variable_declarations(self, n):
-        return frozenset(self._get_variable_declarations(n))
+        # keep the order of definition, so that generated code is reproducible
+        return tuple(dict.fromkeys(self._get_variable_declarations(n)))
 
     def _get_variable_declarations(self, n):
         types = [Read, Call, For]
@@ -1,14 +1,19 @@
 import logging
+import os
+import pickle
 from enum import Enum
 from functools import partial
 
+from turingarena.driver.artifacts import ArtifactCache, artifact_key
 from turingarena.driver.common.analysis import InterfaceAnalyzer
 from turingarena.driver.common.nodes import *
 from turingarena.driver.compile.analysis import CompileAnalyzer, ReferenceDefinition, ReferenceResolution
 from turingarena.driver.compile.diagnostics import *
+from turingarena.driver.compile.grammar import grammar_ebnf
 from turingarena.driver.compile.parser import parse_interface
 from turingarena.driver.compile.postprocess import CompilationPostprocessor
 from turingarena.util.visitor import classvisitormethod
+from turingarena.version import VERSION
 
 STATEMENT_CLASSES = {
     "checkpoint": Checkpoint,
@@ -399,16 +404,55 @@ class Compiler(CompileAnalyzer, InterfaceAnalyzer, CompilationPostprocessor):
         return cls(array, index)
 
 
-def compile_interface(source_text):
-    compiler = Compiler.create()
-    interface = compiler.compile_interface_source(source_text)
+INTERFACE_PICKLE = "interface.pickle"
+
+_compiled_interfaces = {}
+
 
-    for msg in compiler.diagnostics:
+def compile_interface(source_text, cache=None):
+    """
+    Compiles the given interface text, using both an in-process memo
+    and an on-disk cache keyed by the hash of the text.
+    """
+    key = artifact_key(VERSION, grammar_ebnf, source_text)
+
+    compiled = _compiled_interfaces.get(key)
+    if compiled is None:
+        compiled = _load_or_compile_interface(key, source_text, cache)
+        _compiled_interfaces[key] = compiled
+
+    interface, diagnostics = compiled
+    for msg in diagnostics:
         logging.warning(f"interface contains an error: {msg}")
 
     return interface
 
 
+def _load_or_compile_interface(key, source_text, cache):
+    if cache is None:
+        cache = ArtifactCache.default("interfaces")
+
+    def build(build_dir):
+        compiled = _do_compile_interface(source_text)
+        with open(os.path.join(build_dir, INTERFACE_PICKLE), "wb") as f:
+            pickle.dump(compiled, f, pickle.HIGHEST_PROTOCOL)
+
+    path = cache.get_or_build(key, build)
+    try:
+        with open(os.path.join(path, INTERFACE_PICKLE), "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        # e.g., a stale entry left by a different version of the node classes
+        logging.debug(f"cannot load cached interface ({e}), compiling it again")
+        return _do_compile_interface(source_text)
+
+
+def _do_compile_interface(source_text):
+    compiler = Compiler.create()
+    interface = compiler.compile_interface_source(source_text)
+    return interface, tuple(str(msg) for msg in compiler.diagnostics)
+
+
 def load_interface(path):
     with open(path) as f:
         return compile_interface(f.read())
@@ -1,4 +1,7 @@
+import hashlib
 import logging
+import os
+from contextlib import contextmanager
 from functools import lru_cache
 
 import tatsu
@@ -7,14 +10,72 @@ from turingarena.driver.compile.grammar import grammar_ebnf
 
 logger = logging.getLogger(__name__)
 
+STATIC_PARSER_PATH = os.path.join(os.path.dirname(__file__), "static_parser.py")
+
+
+def grammar_fingerprint():
+    return hashlib.sha256(f"{tatsu.__version__}\n{grammar_ebnf}".encode()).hexdigest()
+
 
 @lru_cache(None)
 def get_grammar():
     return tatsu.compile(grammar_ebnf)
 
 
+def generate_static_parser_source():
+    return "\n".join([
+        tatsu.to_python_sourcecode(grammar_ebnf, name="Interface"),
+        "",
+        f"GRAMMAR_FINGERPRINT = {grammar_fingerprint()!r}",
+        "",
+    ])
+
+
+def write_static_parser(path=STATIC_PARSER_PATH):
+    with open(path, "w") as f:
+        f.write(generate_static_parser_source())
+
+
+@lru_cache(None)
+def get_static_parser():
+    try:
+        from turingarena.driver.compile import static_parser
+    except ImportError:
+        logger.debug("static interface parser not generated")
+        return None
+
+    if getattr(static_parser, "GRAMMAR_FINGERPRINT", None) != grammar_fingerprint():
+        logger.warning("static interface parser is out of date, compiling the grammar at runtime")
+        return None
+
+    return create_static_parser(static_parser)
+
+
+def create_static_parser(static_parser):
+    class StaticParser(static_parser.InterfaceParser):
+        @contextmanager
+        def _optional(self):
+            # generated code names the last node after an optional,
+            # so do not leave there what a failed attempt parsed
+            succeeded = False
+            with super()._optional():
+                yield
+                succeeded = True
+            if not succeeded:
+                self.last_node = None
+
+    return StaticParser()
+
+
+def get_parser():
+    parser = get_static_parser()
+    if parser is None:
+        parser = get_grammar()
+    return parser
+
+
 def parse_interface(text):
-    return get_grammar().parse(text, start="interface", asmodel=False, parseinfo=True)
+    return get_parser().parse(text, start="interface", asmodel=False, parseinfo=True)
 
 
 def get_line(parseinfo):
@@ -27,3 +88,7 @@ def get_line(parseinfo):
         return lines[0][start:end].strip()
     else:
         return lines[0][start:].strip() + "..."
+
+
+if __name__ == "__main__":
+    write_static_parser()
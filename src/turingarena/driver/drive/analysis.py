@@ -1,9 +1,11 @@
+from collections import namedtuple
 from enum import Enum
 
 from turingarena.driver.common.analysis import InterfaceAnalyzer
 from turingarena.driver.common.nodes import *
 from turingarena.driver.drive.nodes import *
 from turingarena.driver.drive.requests import *
+from turingarena.util.memo import memoizedanalysis
 from turingarena.util.visitor import visitormethod
 
 ReferenceDirection = Enum("ReferenceDirection", names=["DOWNWARD", "UPWARD"])
@@ -18,8 +20,22 @@ DIRECTION_MAP = {
     ],
 }
 
+# nodes which do nothing in the upward and downward phases
+PASSIVE_NODES = [
+    RequestLookahead,
+    ValueResolve,
+    CallAccept,
+    CallCompleted,
+    CallReturn,
+    Exit,
+]
+
+BulkTransfer = namedtuple("BulkTransfer", ["index", "items"])
+BulkLine = namedtuple("BulkLine", ["arrays"])
+
 
 class ExecutionAnalyzer(InterfaceAnalyzer):
+    @memoizedanalysis
     def first_requests(self, n):
         return frozenset(self._get_first_requests(n))
 
@@ -35,10 +51,11 @@ class ExecutionAnalyzer(InterfaceAnalyzer):
 
     def _get_first_requests_Block(self, n):
         for child in n.children:
-            for r in self.first_requests(child):
+            requests = self.first_requests(child)
+            for r in requests:
                 if r is not None:
                     yield r
-            if None not in self.first_requests(child):
+            if None not in requests:
                 break
         else:
             yield None
@@ -68,6 +85,7 @@ class ExecutionAnalyzer(InterfaceAnalyzer):
     def _get_first_requests_object(self, n):
         yield None
 
+    @memoizedanalysis
     def can_be_grouped(self, n):
         return self._can_be_grouped(n)
 
@@ -101,6 +119,7 @@ class ExecutionAnalyzer(InterfaceAnalyzer):
                 return False
         return True
 
+    @memoizedanalysis
     def declaration_directions(self, n):
         return frozenset(self._get_directions(n))
 
@@ -143,3 +162,59 @@ class ExecutionAnalyzer(InterfaceAnalyzer):
             for t in ts:
                 if isinstance(n, t):
                     yield d
+
+    @memoizedanalysis
+    def bulk_reads(self, n):
+        """
+        If the For node n, in the downward phase, only sends elements of arrays indexed by its variable
+        (also in nested For nodes), returns a BulkTransfer with a BulkLine for each Read, otherwise None.
+        """
+        return self._bulk_transfer(n, Read, self.bulk_reads)
+
+    @memoizedanalysis
+    def bulk_writes(self, n):
+        """
+        Same as bulk_reads, for the elements received in the upward phase, without nested For nodes.
+        """
+        return self._bulk_transfer(n, Write, None)
+
+    def _bulk_transfer(self, n, node_type, nested_transfer):
+        variable = n.index.variable
+        items = []
+        for child in self._phase_children(n.body):
+            if isinstance(child, node_type):
+                if not all(
+                        isinstance(a, Subscript)
+                        and a.index == variable
+                        and not _uses_variable(a.array, variable)
+                        for a in child.arguments
+                ):
+                    return None
+                items.append(BulkLine(tuple(a.array for a in child.arguments)))
+            elif isinstance(child, For) and nested_transfer is not None:
+                nested = nested_transfer(child)
+                if nested is None:
+                    return None
+                items.append(nested)
+            elif not any(isinstance(child, t) for t in PASSIVE_NODES):
+                return None
+
+        if not items:
+            return None
+        return BulkTransfer(n.index, tuple(items))
+
+    def _phase_children(self, n):
+        # inside a phase, steps only execute their body
+        if isinstance(n, Block):
+            for child in n.children:
+                yield from self._phase_children(child)
+        elif isinstance(n, Step):
+            yield from self._phase_children(n.body)
+        else:
+            yield n
+
+
+def _uses_variable(e, variable):
+    if isinstance(e, Subscript):
+        return _uses_variable(e.array, variable) or _uses_variable(e.index, variable)
+    return isinstance(e, Variable) and e == variable
@@ -1,5 +1,5 @@
 import logging
-import threading
+import select
 from collections import namedtuple
 from contextlib import contextmanager
 
@@ -7,7 +7,7 @@ from turingarena.driver.client.commands import DriverState, deserialize_data, se
 from turingarena.driver.drive.context import ExecutionContext
 from turingarena.driver.drive.requests import CallRequestSignature, RequestSignature
 
-UPWARD_TIMEOUT = 3.0
+DEFAULT_UPWARD_TIMEOUT = 3.0
 
 SandboxTee = namedtuple("SandboxTee", ["upward_tee", "downward_tee"])
 
@@ -26,6 +26,73 @@ class DriverStop(Exception):
     pass
 
 
+def run_blocking(coroutine):
+    """
+    Runs a coroutine of the driver to completion in the calling thread, and returns its result.
+
+    Coroutines are generators which yield a file whenever they need to read from it
+    and the read would block (see wait_readable), or a BlockingCall (see wait_call).
+    """
+    try:
+        waited = next(coroutine)
+        while True:
+            if isinstance(waited, BlockingCall):
+                waited.run()
+            else:
+                select.select([waited], [], [])
+            waited = coroutine.send(None)
+    except StopIteration as e:
+        return e.value
+
+
+def wait_readable(file, read, *args):
+    """
+    Coroutine which calls the given read method of the file, yielding the file while the read would block.
+
+    Blocking files never raise BlockingIOError, so the coroutine yields only for non-blocking ones,
+    whose reads must not consume anything when they raise it (see turingarena.driver.multiplex).
+    """
+    while True:
+        try:
+            return read(*args)
+        except BlockingIOError:
+            yield file
+
+
+class BlockingCall:
+    """
+    A call of a function which may block (e.g., getting the status of a process),
+    yielded by a coroutine so that whoever runs it can make the call without blocking the other coroutines.
+    """
+
+    def __init__(self, function, *args, **kwargs):
+        self._function = function
+        self._args = args
+        self._kwargs = kwargs
+        self._result = None
+        self._exception = None
+
+    def run(self):
+        try:
+            self._result = self._function(*self._args, **self._kwargs)
+        except BaseException as e:
+            self._exception = e
+
+    def result(self):
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+
+def wait_call(function, *args, **kwargs):
+    """
+    Coroutine which calls the given function, which may block, and returns its result (see BlockingCall).
+    """
+    call = BlockingCall(function, *args, **kwargs)
+    yield call
+    return call.result()
+
+
 class SandboxCommunicator(ExecutionContext):
     def _on_timeout(self):
         try:
@@ -46,35 +113,64 @@ class SandboxCommunicator(ExecutionContext):
             print(*values, file=self.sandbox_connection.downward)
         print(*values, file=self.sandbox_tee.downward_tee)
 
+    def send_downward_lines(self, lines):
+        """
+        Sends many lines at once, with a single write to the process and to the tee.
+        """
+        if not lines:
+            return
+        text = "\n".join(lines) + "\n"
+        with self._check_downward_pipe():
+            self.sandbox_connection.downward.write(text)
+        self.sandbox_tee.downward_tee.write(text)
+
     def receive_upward(self):
+        return run_blocking(self.await_upward())
+
+    def await_upward(self):
+        [data] = yield from self.await_upward_lines(1)
+        return data
+
+    def receive_upward_lines(self, count):
+        return run_blocking(self.await_upward_lines(count))
+
+    def await_upward_lines(self, count):
+        """
+        Coroutine which receives the given number of lines, each as a tuple of integers.
+        The timeout applies to each line.
+        """
         with self._check_downward_pipe():
             self.sandbox_connection.downward.flush()
 
-        timer = threading.Timer(UPWARD_TIMEOUT, self._on_timeout)
-        timer.start()
-
         max_line_size = 256
+        upward = self.sandbox_connection.upward
 
-        line = self.sandbox_connection.upward.readline(max_line_size)
-        if line and line[-1] != "\n":
-            raise CommunicationError(f"line sent by process is too long '{line:50}'...")
-
-        line = line.strip()
+        result = []
+        try:
+            for _ in range(count):
+                self.watchdog.arm(self._on_timeout)
+                line = yield from wait_readable(upward, upward.readline, max_line_size)
 
-        timer.cancel()
-        timer.join()
+                if line and line[-1] != "\n":
+                    raise CommunicationError(f"line sent by process is too long '{line:50}'...")
 
-        if not line:
-            raise CommunicationError(f"process stopped sending data")
+                line = line.strip()
 
-        data = tuple(map(int, line.split()))
+                if not line:
+                    raise CommunicationError(f"process stopped sending data")
 
-        print(*data, file=self.sandbox_tee.upward_tee)
+                try:
+                    result.append(tuple(map(int, line.split())))
+                except ValueError as e:
+                    raise CommunicationError(f"process sent invalid data '{line:50}'") from e
+        finally:
+            self.watchdog.disarm()
+            self.sandbox_tee.upward_tee.write("".join(
+                " ".join(map(str, data)) + "\n"
+                for data in result
+            ))
 
-        try:
-            return data
-        except ValueError as e:
-            raise CommunicationError(f"process sent invalid data '{line:50}'") from e
+        return result
 
 
 class DriverCommunicator(ExecutionContext):
@@ -84,28 +180,33 @@ class DriverCommunicator(ExecutionContext):
     def send_driver_upward(self, item):
         if isinstance(item, bool):
             item = int(item)
-        print(item, file=self.driver_connection.upward)
+        self.driver_channel.send(item)
 
     def receive_driver_downward(self):
-        self.driver_connection.upward.flush()
-        return self.driver_connection.downward.readline().strip()
+        return run_blocking(self.await_driver_downward())
+
+    def await_driver_downward(self):
+        return (yield from wait_readable(self.driver_channel, self.driver_channel.receive))
 
     def report_ready(self):
         self.send_resource_usage_upward()
         self.send_driver_state(DriverState.READY)
 
     def next_request(self):
-        command = self.receive_driver_downward()
+        return run_blocking(self.await_request())
+
+    def await_request(self):
+        command = yield from self.await_driver_downward()
         if command == "stop":
             raise DriverStop
         if command == "call":
-            method_name = self.receive_driver_downward()
+            method_name = yield from self.await_driver_downward()
             return CallRequestSignature(command, method_name)
         else:
             return RequestSignature(command)
 
     def send_resource_usage_upward(self):
-        info = self.process.get_status()
+        info = self.process.get_resource_usage()
         self.send_driver_state(DriverState.RESOURCE_USAGE)
         self.send_driver_upward(info.time_usage)
         self.send_driver_upward(info.peak_memory_usage)
@@ -113,17 +214,19 @@ class DriverCommunicator(ExecutionContext):
         return info
 
     def deserialize_request_data(self):
+        return run_blocking(self.await_request_data())
+
+    def await_request_data(self):
         deserializer = deserialize_data()
         next(deserializer)
-        lines_it = iter(self.receive_driver_downward, None)
-        try:
-            for line in lines_it:
+        while True:
+            line = yield from self.await_driver_downward()
+            if line is None:
+                raise ValueError(f"too few lines")
+            try:
                 deserializer.send(line)
-        except StopIteration as e:
-            result = e.value
-        else:
-            raise ValueError(f"too few lines")
-        return result
+            except StopIteration as e:
+                return e.value
 
     def serialize_response_data(self, value):
         lines = serialize_data(value)
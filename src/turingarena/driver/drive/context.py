@@ -1,20 +1,86 @@
 from collections import namedtuple
 
+# maximum number of scopes to look up, before merging them into one
+MAX_SCOPE_DEPTH = 8
+
+
+class Bindings:
+    """
+    Immutable map from references to their values, as a chain of scopes.
+
+    Extending the bindings only creates a new scope for the new values, without copying the others.
+    When the chain gets too long, its scopes are merged into a single one, which is kept for further extensions.
+    The merge stops at the nearest bindings which were already merged (see compact),
+    e.g., the ones a loop starts from, so that each iteration only merges its own values.
+    """
+
+    __slots__ = ["scope", "parent", "depth", "_merged"]
+
+    def __init__(self, scope=None, parent=None):
+        self.scope = {} if scope is None else scope
+        self.parent = parent
+        self.depth = 0 if parent is None else parent.depth + 1
+        self._merged = None
+
+    def extend(self, assignments):
+        scope = dict(assignments)
+        if not scope:
+            return self
+        if self.depth < MAX_SCOPE_DEPTH:
+            return Bindings(scope, self)
+        return Bindings(scope, self.compact())
+
+    def compact(self):
+        """
+        Returns the same bindings in a short chain, merging the scopes only once.
+        """
+        if self._merged is None:
+            scopes = []
+            bindings = self
+            while bindings is not None and not bindings._is_compact():
+                scopes.append(bindings.scope)
+                bindings = bindings.parent
+            merged = {}
+            for scope in reversed(scopes):
+                merged.update(scope)
+            self._merged = Bindings(merged, None if bindings is None else bindings.compact())
+            self._merged._merged = self._merged
+        return self._merged
+
+    def _is_compact(self):
+        # merging stops here, but not if the chain of the merged scopes would grow too long
+        return self._merged is not None and self._merged.depth < MAX_SCOPE_DEPTH // 2
+
+    def __getitem__(self, key):
+        bindings = self
+        while bindings is not None:
+            try:
+                return bindings.scope[key]
+            except KeyError:
+                bindings = bindings.parent
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        else:
+            return True
+
 
 class ExecutionContext(namedtuple("Executor", [
     "bindings",
     "phase",
     "process",
     "request_lookahead",
-    "driver_connection",
+    "driver_channel",
     "sandbox_connection",
     "sandbox_tee",
+    "watchdog",
 ])):
     def with_assigments(self, assignments):
-        return self._replace(bindings={
-            **self.bindings,
-            **dict(assignments),
-        })
+        return self._replace(bindings=self.bindings.extend(assignments))
 
     def extend(self, execution_result):
         return self.with_assigments(execution_result.assignments)._replace(
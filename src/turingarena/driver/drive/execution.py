@@ -1,12 +1,13 @@
 import logging
 from enum import Enum
+from itertools import chain
 
 from turingarena.driver.common.nodes import Subscript
 
 from turingarena import InterfaceError
 from turingarena.driver.common.description import TreeDumper
 from turingarena.driver.compile.analysis import ReferenceResolution
-from turingarena.driver.drive.analysis import ReferenceDirection
+from turingarena.driver.drive.analysis import BulkLine, ReferenceDirection
 from turingarena.driver.drive.comm import CommunicationError, InterfaceExitReached, SandboxCommunicator, \
     DriverCommunicator
 from turingarena.driver.drive.preprocess import ExecutionPreprocessor
@@ -82,10 +83,20 @@ class Executor(SandboxCommunicator, DriverCommunicator, ExecutionPreprocessor):
         }).execute(main)
 
     def _on_execute_Block(self, n):
-        result = self.result()
-        for n in n.children:
-            result = result.merge(self.extend(result).execute(n))
-        return result
+        context = self
+        assignments = []
+        does_break = False
+        for child in n.children:
+            result = context.execute(child)
+            if result is None:
+                continue
+            assignments.extend(result.assignments)
+            does_break = result.does_break
+            context = context.extend(result)
+        return context.result()._replace(
+            assignments=assignments,
+            does_break=does_break,
+        )
 
     def _on_execute_Step(self, n):
         if self.phase is not None:
@@ -131,23 +142,66 @@ class Executor(SandboxCommunicator, DriverCommunicator, ExecutionPreprocessor):
             # FIXME: determine this situation statically
             return
 
+        if self.phase == ExecutionPhase.DOWNWARD:
+            transfer = self.bulk_reads(n)
+            if transfer is not None:
+                self.send_downward_lines(self._bulk_lines(transfer))
+                return
+        if self.phase == ExecutionPhase.UPWARD:
+            transfer = self.bulk_writes(n)
+            if transfer is not None:
+                return self._receive_bulk(transfer)
+
         for_range = self.evaluate(n.index.range)
+        # merged once, so that the iterations only merge their own values
+        context = self._replace(bindings=self.bindings.compact())
 
-        results_by_iteration = [
-            self.with_assigments(
+        # one list per array resolved in the loop, filled as iterations go
+        outputs = [
+            (a.reference, Subscript(a.reference, n.index.variable), [None] * for_range)
+            for a in self.reference_actions(n)
+            if isinstance(a, ReferenceResolution)
+            if not self.is_resolved(a.reference)
+        ]
+
+        for i in range(for_range):
+            result = context.with_assigments(
                 [(n.index.variable, i)]
             ).execute(n.body)
-            for i in range(for_range)
-        ]
+            if outputs:
+                assignments = dict(result.assignments)
+                for reference, item, values in outputs:
+                    values[i] = assignments[item]
+
+        return self.result()._replace(assignments=[
+            (reference, values)
+            for reference, item, values in outputs
+        ])
+
+    def _bulk_lines(self, transfer):
+        index = transfer.index
+        if not self.is_resolved(index.range):
+            return []
+        for_range = self.evaluate(index.range)
+
+        return merge_rows(transfer.items, [
+            format_rows([self.evaluate(a) for a in item.arrays], for_range)
+            if isinstance(item, BulkLine) else
+            [
+                self.with_assigments([(index.variable, i)])._bulk_lines(item)
+                for i in range(for_range)
+            ]
+            for item in transfer.items
+        ])
+
+    def _receive_bulk(self, transfer):
+        for_range = self.evaluate(transfer.index.range)
+        rows = self.receive_upward_lines(for_range * len(transfer.items))
 
         assignments = [
-            (a.reference, [
-                dict(result.assignments)[Subscript(a.reference, n.index.variable)]
-                for result in results_by_iteration
-            ])
-            for a in self.reference_actions(n)
-            if isinstance(a, ReferenceResolution)
-            if not self.is_resolved(a.reference)
+            (array, values)
+            for array, values in split_rows(transfer.items, rows)
+            if not self.is_resolved(array)
         ]
 
         return self.result()._replace(assignments=assignments)
@@ -362,3 +416,49 @@ class Executor(SandboxCommunicator, DriverCommunicator, ExecutionPreprocessor):
             self.evaluate(a)
             for a in n.arguments
         ])
+
+
+def format_rows(arrays, size):
+    """
+    Formats the first `size` elements of the given arrays, one line per index.
+    """
+    if len(arrays) == 1:
+        [array] = arrays
+        return list(map(str, array[:size]))
+    return [
+        " ".join(map(str, row))
+        for row in zip(*(array[:size] for array in arrays))
+    ]
+
+
+def merge_rows(items, rows_by_item):
+    """
+    Puts the lines of the items of a BulkTransfer in the order they are sent,
+    given the rows of each item, where each row of a nested For is a list of lines.
+    """
+    if len(items) == 1:
+        [item] = items
+        [rows] = rows_by_item
+        if isinstance(item, BulkLine):
+            return rows
+        return list(chain.from_iterable(rows))
+
+    lines = []
+    for row in zip(*rows_by_item):
+        for item, item_row in zip(items, row):
+            if isinstance(item, BulkLine):
+                lines.append(item_row)
+            else:
+                lines.extend(item_row)
+    return lines
+
+
+def split_rows(items, rows):
+    """
+    Inverse of merge_rows, for items without nested For.
+    Yields each array with its values.
+    """
+    for k, item in enumerate(items):
+        item_rows = rows[k::len(items)]
+        for j, array in enumerate(item.arrays):
+            yield array, [row[j] for row in item_rows]
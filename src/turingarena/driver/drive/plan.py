@@ -0,0 +1,690 @@
+import logging
+import os
+from collections import namedtuple
+from inspect import isgeneratorfunction
+from enum import Enum
+
+from turingarena import InterfaceError
+from turingarena.driver.common.description import TreeDumper
+from turingarena.driver.common.nodes import *
+from turingarena.driver.compile.analysis import ReferenceResolution
+from turingarena.driver.drive.analysis import BulkLine, ReferenceDirection
+from turingarena.driver.drive.comm import CommunicationError, InterfaceExitReached
+from turingarena.driver.drive.execution import ExecutionPhase, NotResolved, format_rows, merge_rows, split_rows
+from turingarena.driver.drive.preprocess import ExecutionPreprocessor
+from turingarena.util.visitor import visitormethod
+
+
+class ExecutionMode(Enum):
+    PLAN = "plan"
+    INTERPRETER = "interpreter"
+
+    @classmethod
+    def default(cls):
+        return cls(os.environ.get("TURINGARENA_DRIVER_EXECUTION", cls.PLAN.value))
+
+
+UNRESOLVED = object()
+
+ExecutionPlan = namedtuple("ExecutionPlan", ["slot_count", "run"])
+
+
+class Frame:
+    """
+    Mutable state of a running execution plan.
+
+    Each variable or subscript which can be bound during the execution has its own slot in `values`,
+    which contains UNRESOLVED until a value is assigned.
+    """
+
+    __slots__ = ["context", "values", "request_lookahead"]
+
+    def __init__(self, context, slot_count):
+        self.context = context
+        self.values = [UNRESOLVED] * slot_count
+        self.request_lookahead = None
+
+
+def run_execution_plan(context, plan):
+    """
+    Coroutine which runs the given plan (see turingarena.driver.drive.comm.run_blocking).
+    """
+    yield from plan.run(Frame(context, plan.slot_count))
+
+
+def compile_execution_plan(interface):
+    return ExecutionPlanCompiler.create().compile_interface(interface)
+
+
+class ExecutionPlanCompiler(namedtuple("ExecutionPlanCompiler", [
+    "slots",
+    "assigned",
+]), ExecutionPreprocessor):
+    """
+    Compiles an interface into a tree of closures, which have the same behavior as Executor.
+
+    The scoping rules of the bindings in Executor (which copies them at every node)
+    are obtained by saving and restoring the slots assigned inside For, Loop and callback bodies.
+    Compiled nodes return None if they have no result, or whether they break a loop.
+
+    Nodes which wait for the process or the driver client, and all the nodes with a body,
+    are compiled into coroutines, so that the plan can be suspended while waiting.
+    Only Block, whose children are the other nodes, has to tell the two kinds apart.
+    """
+
+    __slots__ = []
+
+    @classmethod
+    def create(cls):
+        return cls(slots={}, assigned=set())
+
+    def slot(self, e):
+        try:
+            return self.slots[e]
+        except KeyError:
+            slot = self.slots[e] = len(self.slots)
+            return slot
+
+    def assign_slot(self, e):
+        slot = self.slot(e)
+        self.assigned.add(slot)
+        return slot
+
+    def scope(self):
+        return self._replace(assigned=set())
+
+    def compile_interface(self, n):
+        main = self.transform(n.main)
+
+        logging.debug(f"transformed main block: {TreeDumper().dump(main)}")
+
+        constants = [self.compile_value(c.value) for c in n.constants]
+        constant_slots = [self.assign_slot(c.variable) for c in n.constants]
+        run_main = self.compile_node(main, None)
+
+        def run(frame):
+            values = [evaluate(frame) for evaluate in constants]
+            for slot, value in zip(constant_slots, values):
+                frame.values[slot] = value
+            yield from run_main(frame)
+
+        return ExecutionPlan(slot_count=len(self.slots), run=run)
+
+    @visitormethod
+    def compile_expression(self, e):
+        pass
+
+    def compile_expression_IntLiteral(self, e):
+        value = e.value
+
+        def evaluate(frame):
+            return value
+
+        return evaluate
+
+    def compile_expression_Variable(self, e):
+        slot = self.slot(e)
+
+        def evaluate(frame):
+            value = frame.values[slot]
+            if value is UNRESOLVED:
+                raise NotResolved
+            return value
+
+        return evaluate
+
+    def compile_expression_Subscript(self, e):
+        slot = self.slot(e)
+        array = self.compile_expression(e.array)
+        index = self.compile_value(e.index)
+
+        def evaluate(frame):
+            value = frame.values[slot]
+            if value is UNRESOLVED:
+                value = array(frame)[index(frame)]
+            return value
+
+        return evaluate
+
+    def compile_value(self, e):
+        try_evaluate = self.compile_expression(e)
+
+        def evaluate(frame):
+            try:
+                return try_evaluate(frame)
+            except NotResolved:
+                raise ValueError(f"unable to evaluate expression {e}")
+
+        return evaluate
+
+    def compile_is_resolved(self, e):
+        try_evaluate = self.compile_expression(e)
+
+        def is_resolved(frame):
+            try:
+                try_evaluate(frame)
+            except NotResolved:
+                return False
+            else:
+                return True
+
+        return is_resolved
+
+    @visitormethod
+    def compile_node(self, n, phase):
+        pass
+
+    def compile_node_Block(self, n, phase):
+        children = tuple(
+            (c, isgeneratorfunction(c))
+            for c in (self.compile_node(child, phase) for child in n.children)
+            if c is not None
+        )
+
+        def run(frame):
+            does_break = False
+            for child, waits in children:
+                if waits:
+                    result = yield from child(frame)
+                else:
+                    result = child(frame)
+                if result is not None:
+                    does_break = result
+            return does_break
+
+        return run
+
+    def compile_node_Step(self, n, phase):
+        if phase is not None:
+            return self.compile_node(n.body, phase)
+
+        bodies = tuple(
+            self.compile_node(n.body, p)
+            for p in ExecutionPhase
+            if p != ExecutionPhase.UPWARD or n.direction == ReferenceDirection.UPWARD
+        )
+
+        def run(frame):
+            does_break = False
+            for body in bodies:
+                does_break = yield from body(frame)
+            return does_break
+
+        return run
+
+    def compile_node_Checkpoint(self, n, phase):
+        def run(frame):
+            values = yield from frame.context.await_upward()
+            if values != (0,):
+                raise CommunicationError(f"expecting checkpoint, got {values}")
+
+            command = frame.request_lookahead.command
+            if not command == "checkpoint":
+                raise InterfaceError(f"expecting 'checkpoint', got '{command}'")
+            frame.context.report_ready()
+            frame.request_lookahead = None
+            return False
+
+        return run
+
+    def compile_node_Callback(self, n, phase):
+        assert phase is None
+        index = n.index
+        body = self.compile_node(n.body, phase)
+
+        def run(frame):
+            context = frame.context
+            context.report_ready()
+            context.send_driver_upward(1)  # has callbacks
+            context.send_driver_upward(index)
+            yield from body(frame)
+
+        return run
+
+    def compile_node_For(self, n, phase):
+        if phase == ExecutionPhase.DOWNWARD:
+            transfer = self.bulk_reads(n)
+            if transfer is not None:
+                return self._compile_send_bulk(transfer)
+        if phase == ExecutionPhase.UPWARD:
+            transfer = self.bulk_writes(n)
+            if transfer is not None:
+                return self._compile_receive_bulk(transfer)
+
+        range_resolved = self.compile_is_resolved(n.index.range)
+        evaluate_range = self.compile_value(n.index.range)
+
+        inner = self.scope()
+        index_slot = inner.assign_slot(n.index.variable)
+        body = inner.compile_node(n.body, phase)
+        scope_slots = tuple(inner.assigned)
+
+        resolutions = tuple(
+            (
+                a.reference,
+                self.compile_is_resolved(a.reference),
+                self.slot(Subscript(a.reference, n.index.variable)),
+                self.assign_slot(a.reference),
+            )
+            for a in self.reference_actions(n)
+            if isinstance(a, ReferenceResolution)
+        )
+
+        def run(frame):
+            if phase is None:
+                assert frame.request_lookahead is None
+
+            if not range_resolved(frame):
+                # we assume that if the range is not resolved, then the cycle should be skipped
+                return None
+
+            for_range = evaluate_range(frame)
+
+            values = frame.values
+            request_lookahead = frame.request_lookahead
+            saved = [values[s] for s in scope_slots]
+            # one list per array resolved in the loop, filled as iterations go
+            unresolved = [
+                (reference, item_slot, slot, [None] * for_range)
+                for reference, is_resolved, item_slot, slot in resolutions
+                if not is_resolved(frame)
+            ]
+
+            for i in range(for_range):
+                values[index_slot] = i
+                yield from body(frame)
+                for reference, item_slot, slot, items in unresolved:
+                    item = values[item_slot]
+                    if item is UNRESOLVED:
+                        raise KeyError(Subscript(reference, n.index.variable))
+                    items[i] = item
+                for s, value in zip(scope_slots, saved):
+                    values[s] = value
+                frame.request_lookahead = request_lookahead
+
+            for reference, item_slot, slot, items in unresolved:
+                values[slot] = items
+            return False
+
+        return run
+
+    def _compile_send_bulk(self, transfer):
+        range_resolved = self.compile_is_resolved(transfer.index.range)
+        bulk_lines = self._compile_bulk_lines(transfer)
+
+        def run(frame):
+            if not range_resolved(frame):
+                return None
+            frame.context.send_downward_lines(bulk_lines(frame))
+            return False
+
+        return run
+
+    def _compile_bulk_lines(self, transfer):
+        index = transfer.index
+        range_resolved = self.compile_is_resolved(index.range)
+        evaluate_range = self.compile_value(index.range)
+
+        inner = self.scope()
+        index_slot = inner.assign_slot(index.variable)
+        items = tuple(
+            (item, tuple(inner.compile_value(a) for a in item.arrays))
+            if isinstance(item, BulkLine) else
+            (item, inner._compile_bulk_lines(item))
+            for item in transfer.items
+        )
+
+        def bulk_lines(frame):
+            if not range_resolved(frame):
+                return []
+            for_range = evaluate_range(frame)
+
+            values = frame.values
+            saved = values[index_slot]
+            rows_by_item = []
+            for item, compiled in items:
+                if isinstance(item, BulkLine):
+                    rows_by_item.append(format_rows([evaluate(frame) for evaluate in compiled], for_range))
+                else:
+                    rows = []
+                    for i in range(for_range):
+                        values[index_slot] = i
+                        rows.append(compiled(frame))
+                    rows_by_item.append(rows)
+            values[index_slot] = saved
+
+            return merge_rows(transfer.items, rows_by_item)
+
+        return bulk_lines
+
+    def _compile_receive_bulk(self, transfer):
+        range_resolved = self.compile_is_resolved(transfer.index.range)
+        evaluate_range = self.compile_value(transfer.index.range)
+        arrays = tuple(
+            (self.compile_is_resolved(array), self.assign_slot(array))
+            for item in transfer.items
+            for array in item.arrays
+        )
+        line_count = len(transfer.items)
+
+        def run(frame):
+            if not range_resolved(frame):
+                return None
+            for_range = evaluate_range(frame)
+
+            unresolved = [not is_resolved(frame) for is_resolved, slot in arrays]
+            rows = yield from frame.context.await_upward_lines(for_range * line_count)
+
+            values = frame.values
+            for (array, items), (is_resolved, slot), assign in zip(
+                    split_rows(transfer.items, rows), arrays, unresolved,
+            ):
+                if assign:
+                    values[slot] = items
+            return False
+
+        return run
+
+    def compile_node_Loop(self, n, phase):
+        inner = self.scope()
+        body = inner.compile_node(n.body, phase)
+        scope_slots = tuple(inner.assigned)
+        self.assigned.update(inner.assigned)
+
+        def run(frame):
+            values = frame.values
+            saved = [values[s] for s in scope_slots]
+            while True:
+                does_break = yield from body(frame)
+                if does_break:
+                    return does_break
+                for s, value in zip(scope_slots, saved):
+                    values[s] = value
+
+        return run
+
+    def compile_node_Break(self, n, phase):
+        def run(frame):
+            return True
+
+        return run
+
+    def compile_node_If(self, n, phase):
+        condition = self.compile_value(n.condition)
+        then_body = self.compile_node(n.branches.then_body, phase)
+        if n.branches.else_body is not None:
+            else_body = self.compile_node(n.branches.else_body, phase)
+        else:
+            else_body = None
+
+        def run(frame):
+            if condition(frame):
+                return (yield from then_body(frame))
+            elif else_body is not None:
+                return (yield from else_body(frame))
+
+        return run
+
+    def compile_node_Switch(self, n, phase):
+        value = self.compile_value(n.value)
+        bodies_by_label = {}
+        for c in n.cases:
+            body = self.compile_node(c.body, phase)
+            for label in c.labels:
+                bodies_by_label.setdefault(label.value, body)
+
+        def run(frame):
+            try:
+                body = bodies_by_label[value(frame)]
+            except KeyError:
+                raise InterfaceError(f"no case matches in switch")
+            return (yield from body(frame))
+
+        return run
+
+    def compile_node_AcceptCallbacks(self, n, phase):
+        inner = self.scope()
+        callbacks = tuple(inner.compile_node(c, phase) for c in n.callbacks)
+        scope_slots = tuple(inner.assigned)
+
+        def run(frame):
+            values = frame.values
+            request_lookahead = frame.request_lookahead
+            saved = [values[s] for s in scope_slots]
+            while True:
+                [has_callback, callback_index] = yield from frame.context.await_upward()
+                if not has_callback:
+                    break
+                yield from callbacks[callback_index](frame)
+                for s, value in zip(scope_slots, saved):
+                    values[s] = value
+                frame.request_lookahead = request_lookahead
+
+        return run
+
+    def compile_node_object(self, n, phase):
+        if phase is not None:
+            return getattr(self, f"_compile_{phase.name.lower()}")(n)
+
+    @visitormethod
+    def _compile_upward(self, n):
+        pass
+
+    def _compile_upward_object(self, n):
+        return None
+
+    def _compile_upward_Write(self, n):
+        slots = tuple(self.assign_slot(a) for a in n.arguments)
+
+        def run(frame):
+            received = yield from frame.context.await_upward()
+            values = frame.values
+            for slot, value in zip(slots, received):
+                values[slot] = value
+            return False
+
+        return run
+
+    @visitormethod
+    def _compile_request(self, n):
+        pass
+
+    def _compile_request_object(self, n):
+        return None
+
+    def _compile_request_RequestLookahead(self, n):
+        def run(frame):
+            if frame.request_lookahead is not None:
+                return None
+            frame.request_lookahead = yield from frame.context.await_request()
+            return False
+
+        return run
+
+    def _compile_request_CallbackStart(self, n):
+        parameters = tuple(
+            (p.variable, self.slot(p.variable))
+            for p in n.prototype.parameters
+        )
+
+        def run(frame):
+            for variable, slot in parameters:
+                value = frame.values[slot]
+                if value is UNRESOLVED:
+                    raise KeyError(variable)
+                frame.context.send_driver_upward(value)
+
+        return run
+
+    def _compile_request_Return(self, n):
+        slot = self.assign_slot(n.value)
+
+        def run(frame):
+            has_return_value = yield from _expect_callback_return(frame)
+
+            if not has_return_value:
+                raise InterfaceError(
+                    f"callback is a function, "
+                    f"but the provided implementation did not return anything"
+                )
+
+            frame.values[slot] = int((yield from frame.context.await_driver_downward()))
+            return False
+
+        return run
+
+    def _compile_request_CallbackEnd(self, n):
+        def run(frame):
+            has_return_value = yield from _expect_callback_return(frame)
+            if has_return_value:
+                raise InterfaceError(
+                    f"callback is a procedure, "
+                    f"but the provided implementation returned something"
+                )
+
+        return run
+
+    def _compile_request_Exit(self, n):
+        def run(frame):
+            command = frame.request_lookahead.command
+            if command != "exit":
+                raise InterfaceError(f"Expecting exit, got {command}")
+            raise InterfaceExitReached
+
+        return run
+
+    def _compile_request_ValueResolve(self, n):
+        is_resolved = self.compile_is_resolved(n.value)
+        slot = self.assign_slot(n.value)
+        map = dict(n.map)
+
+        def run(frame):
+            if is_resolved(frame):
+                return None
+
+            assert frame.request_lookahead is not None
+            try:
+                value = map[frame.request_lookahead]
+            except KeyError:
+                value = map[None]  # default
+            frame.values[slot] = value
+            return False
+
+        return run
+
+    def _compile_request_CallAccept(self, n):
+        method = n.method
+        arguments = tuple(
+            (p, self.compile_is_resolved(a), self.compile_value(a), self.assign_slot(a))
+            for p, a in zip(method.parameters, n.arguments)
+        )
+        callback_parameter_counts = tuple(
+            (c, len(c.parameters))
+            for c in method.callbacks
+        )
+
+        def run(frame):
+            context = frame.context
+            command = frame.request_lookahead.command
+            if not command == "call":
+                raise InterfaceError(f"expected call to '{method.name}', got {command}")
+
+            method_name = frame.request_lookahead.method_name
+            if not method_name == method.name:
+                raise InterfaceError(f"expected call to '{method.name}', got call to '{method_name}'")
+
+            parameter_count = int((yield from context.await_driver_downward()))
+            if parameter_count != len(method.parameters):
+                raise InterfaceError(
+                    f"'{method.name}' expects {len(method.parameters)} arguments, "
+                    f"got {parameter_count}"
+                )
+
+            assignments = []
+            for p, is_resolved, evaluate, slot in arguments:
+                actual_value = yield from context.await_request_data()
+
+                if is_resolved(frame):
+                    expected_value = evaluate(frame)
+                    if isinstance(expected_value, int) and actual_value != expected_value:
+                        raise InterfaceError(
+                            f"parameter {p.variable.name}: expecting {expected_value}, "
+                            f"got {actual_value}"
+                        )
+                else:
+                    assignments.append((slot, actual_value))
+
+            actual_has_return_value = bool(int((yield from context.await_driver_downward())))
+            expected_has_return_value = method.has_return_value
+            if not actual_has_return_value == expected_has_return_value:
+                names = ["procedure", "function"]
+                raise InterfaceError(
+                    f"'{method.name}' is a {names[expected_has_return_value]}, "
+                    f"got call to {names[actual_has_return_value]}"
+                )
+
+            callback_count = int((yield from context.await_driver_downward()))
+            expected_callback_count = len(method.callbacks)
+            if not callback_count == expected_callback_count:
+                raise InterfaceError(
+                    f"'{method.name}' has a {expected_callback_count} callbacks, "
+                    f"got {callback_count}"
+                )
+
+            for c, expected_parameter_count in callback_parameter_counts:
+                parameter_count = int((yield from context.await_driver_downward()))
+                if not parameter_count == expected_parameter_count:
+                    raise InterfaceError(
+                        f"'{c.name}' has {expected_parameter_count} parameters, "
+                        f"got {parameter_count}"
+                    )
+
+            for slot, value in assignments:
+                frame.values[slot] = value
+            frame.request_lookahead = None
+            return False
+
+        return run
+
+    def _compile_request_CallReturn(self, n):
+        evaluate = self.compile_value(n.return_value)
+
+        def run(frame):
+            return_value = evaluate(frame)
+
+            frame.context.report_ready()
+            frame.context.send_driver_upward(return_value)
+
+        return run
+
+    def _compile_request_CallCompleted(self, n):
+        def run(frame):
+            frame.context.report_ready()
+            frame.context.send_driver_upward(0)  # no more callbacks
+
+        return run
+
+    @visitormethod
+    def _compile_downward(self, n):
+        pass
+
+    def _compile_downward_object(self, n):
+        return None
+
+    def _compile_downward_Read(self, n):
+        arguments = tuple(self.compile_value(a) for a in n.arguments)
+
+        def run(frame):
+            frame.context.send_downward([
+                evaluate(frame)
+                for evaluate in arguments
+            ])
+
+        return run
+
+
+def _expect_callback_return(frame):
+    command = frame.request_lookahead.command
+    if not command == "callback_return":
+        raise InterfaceError(f"expecting 'callback_return', got '{command}'")
+    return bool(int((yield from frame.context.await_driver_downward())))
@@ -82,34 +82,33 @@ class ExecutionPreprocessor(
 
     def group_children(self, children):
         group = []
+        group_directions = frozenset()
         for node in children:
-            can_be_grouped = self.can_be_grouped(node) and len(self._group_directions([node])) <= 1
+            directions = self.declaration_directions(node)
+            can_be_grouped = self.can_be_grouped(node) and len(directions) <= 1
 
-            if can_be_grouped and len(self._group_directions(group + [node])) <= 1:
+            if can_be_grouped and len(group_directions | directions) <= 1:
                 group.append(node)
+                group_directions |= directions
                 continue
 
             if group:
-                yield self._make_step(group)
-                group.clear()
+                yield self._make_step(group, group_directions)
+                group = []
+                group_directions = frozenset()
 
             if not can_be_grouped:
                 yield node
             else:
                 group.append(node)
+                group_directions = directions
 
         if group:
-            yield self._make_step(group)
+            yield self._make_step(group, group_directions)
 
-    def _make_step(self, group):
-        return Step(body=Block(tuple(group)), direction=self._group_direction(group))
-
-    def _group_direction(self, group):
-        directions = self._group_directions(group)
-        if not directions:
-            return None
-        [direction] = directions
-        return direction
-
-    def _group_directions(self, group):
-        return {d for n in group for d in self.declaration_directions(n)}
+    def _make_step(self, group, directions):
+        if directions:
+            [direction] = directions
+        else:
+            direction = None
+        return Step(body=Block(tuple(group)), direction=direction)
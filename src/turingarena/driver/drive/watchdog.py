@@ -0,0 +1,104 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Watchdog:
+    """
+    Calls a function if a deadline expires before being disarmed.
+
+    A single thread serves all the deadlines of a driver server,
+    so arming and disarming is cheap: no thread is created per deadline.
+    """
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self._condition = threading.Condition()
+        self._deadline = None
+        self._callback = None
+        self._idle = True
+        self._closed = False
+        self._thread = None
+
+    def arm(self, callback):
+        with self._condition:
+            self._deadline = time.monotonic() + self.timeout
+            self._callback = callback
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="driver-watchdog", daemon=True)
+                self._thread.start()
+            elif self._idle:
+                # otherwise the thread is sleeping until an earlier deadline, and will check again then
+                self._condition.notify()
+
+    def disarm(self):
+        with self._condition:
+            self._deadline = None
+            self._callback = None
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        with self._condition:
+            while not self._closed:
+                if self._deadline is None:
+                    self._idle = True
+                    self._condition.wait()
+                    continue
+
+                self._idle = False
+                remaining = self._deadline - time.monotonic()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+
+                callback = self._callback
+                self._deadline = None
+                self._callback = None
+
+                self._condition.release()
+                try:
+                    callback()
+                except:
+                    logger.exception(f"exception in watchdog callback")
+                finally:
+                    self._condition.acquire()
+
+
+class PolledWatchdog:
+    """
+    Same as Watchdog, but without a thread: the owner checks the deadline and calls expire.
+
+    Used by the multiplexed server (see turingarena.driver.multiplex), which waits for many processes at once.
+    """
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self.deadline = None
+        self._callback = None
+
+    def arm(self, callback):
+        self.deadline = time.monotonic() + self.timeout
+        self._callback = callback
+
+    def disarm(self):
+        self.deadline = None
+        self._callback = None
+
+    def expire(self):
+        callback = self._callback
+        self.disarm()
+        try:
+            callback()
+        except:
+            logger.exception(f"exception in watchdog callback")
+
+    def close(self):
+        pass
@@ -0,0 +1,132 @@
+import fcntl
+import logging
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+JobStats = namedtuple("JobStats", [
+    "waiting",  # jobs waiting for a slot (i.e., the queue depth)
+    "running",
+    "completed",
+    "wait_time",  # total time spent waiting for a slot
+    "run_time",  # total time spent running jobs (e.g., compiling)
+])
+
+
+def default_jobs_dir():
+    from turingarena.driver.artifacts import default_cache_dir
+    return os.path.join(default_cache_dir(), "jobs")
+
+
+def default_max_jobs():
+    return int(os.environ.get("TURINGARENA_COMPILE_JOBS", os.cpu_count() or 1))
+
+
+class JobServer:
+    """
+    Limits the number of jobs (e.g., compilations) running at once on a host,
+    across all the driver processes which use the same directory.
+
+    Each job holds one of `max_jobs` slots, which are files locked with flock,
+    so a slot is released even if the process holding it dies.
+    """
+
+    def __init__(self, directory, max_jobs):
+        self.directory = directory
+        self.max_jobs = max_jobs
+
+        self._lock = threading.Lock()
+        self._stats = JobStats(waiting=0, running=0, completed=0, wait_time=0.0, run_time=0.0)
+
+    def stats(self):
+        """
+        Returns the statistics of the jobs run by this process.
+        """
+        with self._lock:
+            return self._stats
+
+    def _update_stats(self, **deltas):
+        with self._lock:
+            self._stats = self._stats._replace(**{
+                name: getattr(self._stats, name) + delta
+                for name, delta in deltas.items()
+            })
+
+    @contextmanager
+    def job(self, description):
+        self._update_stats(waiting=+1)
+        wait_start = time.monotonic()
+        try:
+            fd = self._acquire_slot()
+        finally:
+            self._update_stats(waiting=-1)
+
+        run_start = time.monotonic()
+        wait_time = run_start - wait_start
+        self._update_stats(running=+1, wait_time=wait_time)
+        try:
+            yield
+        finally:
+            if fd is not None:
+                os.close(fd)
+            run_time = time.monotonic() - run_start
+            self._update_stats(running=-1, completed=+1, run_time=run_time)
+            logger.debug(f"job {description}: waited {wait_time:.3f}s, ran {run_time:.3f}s, {self.stats()}")
+
+    def _acquire_slot(self):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+        except OSError as e:
+            # e.g., read-only cache directory, jobs are not limited
+            logger.warning(f"cannot create job server directory {self.directory} ({e})")
+            return None
+        slots = list(range(self.max_jobs))
+        random.shuffle(slots)
+
+        for slot in slots:
+            fd = self._open_slot(slot)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                os.close(fd)
+
+        # all slots are busy, wait for one of them
+        fd = self._open_slot(slots[0])
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        except:
+            os.close(fd)
+            raise
+        return fd
+
+    def _open_slot(self, slot):
+        # each open file has its own lock, so threads of the same process compete as well
+        return os.open(os.path.join(self.directory, f"slot-{slot}"), os.O_RDWR | os.O_CREAT, 0o666)
+
+
+_job_servers = {}
+_job_servers_lock = threading.Lock()
+
+
+def get_job_server():
+    key = (default_jobs_dir(), default_max_jobs())
+    with _job_servers_lock:
+        if key not in _job_servers:
+            _job_servers[key] = JobServer(*key)
+        return _job_servers[key]
+
+
+@contextmanager
+def compile_job(description):
+    """
+    Runs a compilation as a job, waiting if too many are already running on this host.
+    The number of compilations is given by TURINGARENA_COMPILE_JOBS, and defaults to the number of CPUs.
+    """
+    with get_job_server().job(description):
+        yield
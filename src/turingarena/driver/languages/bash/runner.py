@@ -1,6 +1,5 @@
 import os
 import shutil
-from contextlib import contextmanager
 
 from turingarena.driver.sandbox.popen import create_popen_process_connection
 from turingarena.driver.sandbox.rlimits import set_rlimits
@@ -12,14 +11,14 @@ class BashProgramRunner(ProgramRunner):
     def skeleton_path(self):
         return os.path.join(self.temp_dir, "skeleton.sh")
 
-    @contextmanager
-    def run_in_process(self):
+    def compile(self):
         shutil.copy(self.program.source_path, os.path.join(self.temp_dir, "solution.sh"))
 
         with open(self.skeleton_path, "w") as f:
             self.language.Generator().generate_to_file(self.interface, f)
 
-        yield create_popen_process_connection(
+    def start(self):
+        return create_popen_process_connection(
             ["bash", self.skeleton_path],
             cwd=self.temp_dir,
             preexec_fn=set_rlimits,
@@ -6,6 +6,7 @@ class CCodeGen(CppCodeGen):
         self.line("#include <stdio.h>")
         self.line("#include <stdlib.h>")
         self.line()
+        self.generate_io_functions()
         for c in n.constants:
             self.visit(c)
             self.line()
@@ -16,6 +17,7 @@ class CCodeGen(CppCodeGen):
         self.line()
         self.line("int main() {")
         with self.indent():
+            self.generate_io_setup()
             self.visit(n.main)
         self.line("}")
 
@@ -10,6 +10,7 @@ class CppCodeGen(InterfaceCodeGen):
         self.line("#include <cstdio>")
         self.line("#include <cstdlib>")
         self.line()
+        self.generate_io_functions()
         for c in n.constants:
             self.visit(c)
             self.line()
@@ -18,9 +19,178 @@ class CppCodeGen(InterfaceCodeGen):
             self.line()
         self.line("int main() {")
         with self.indent():
+            self.generate_io_setup()
             self.visit(n.main)
         self.line("}")
 
+    def generate_io_functions(self):
+        self.line("#include <linux/futex.h>")
+        self.line("#include <sys/mman.h>")
+        self.line("#include <sys/stat.h>")
+        self.line("#include <sys/syscall.h>")
+        self.line("#include <time.h>")
+        self.line("#include <unistd.h>")
+        self.line()
+        # shared memory transport, see turingarena.driver.sandbox.shm
+        self.line("struct ring {")
+        with self.indent():
+            self.line("volatile long long *head, *tail, *data;")
+            self.line("long long capacity, position, limit;")
+        self.line("};")
+        self.line()
+        self.line("static int shm_enabled;")
+        self.line("static struct ring down_ring, up_ring;")
+        self.line("static long long record_start, record_length, flushed_position;")
+        self.line("static int line_started;")
+        self.line()
+        self.line("static void init_ring(struct ring *r, char *base, long long size) {")
+        with self.indent():
+            self.line("r->head = (volatile long long *) base;")
+            self.line("r->tail = (volatile long long *) (base + 64);")
+            self.line("r->data = (volatile long long *) (base + 128);")
+            self.line("r->capacity = (size - 128) / 8;")
+            self.line("r->position = r->limit = 0;")
+        self.line("}")
+        self.line()
+        self.line("static void init_io() {")
+        with self.indent():
+            self.line('const char *shm_fd = getenv("TURINGARENA_SHM_FD");')
+            self.line("if (shm_fd) {")
+            with self.indent():
+                self.line("int fd = atoi(shm_fd);")
+                self.line("struct stat st;")
+                self.line("if (fstat(fd, &st) != 0) exit(1);")
+                self.line("char *base = (char *) mmap(NULL, st.st_size, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);")
+                self.line("if (base == MAP_FAILED) exit(1);")
+                self.line("close(fd);")
+                self.line("init_ring(&down_ring, base, st.st_size / 2);")
+                self.line("init_ring(&up_ring, base + st.st_size / 2, st.st_size / 2);")
+                self.line("shm_enabled = 1;")
+            self.line("} else {")
+            with self.indent():
+                self.line("setvbuf(stdin, NULL, _IOFBF, 1 << 16);")
+                self.line("setvbuf(stdout, NULL, _IOFBF, 1 << 16);")
+            self.line("}")
+        self.line("}")
+        self.line()
+        self.line("static int read_int() {")
+        with self.indent():
+            self.line("if (shm_enabled) {")
+            with self.indent():
+                self.line("struct ring *r = &down_ring;")
+                self.line("while (r->position == r->limit) {")
+                with self.indent():
+                    self.line("r->limit = __atomic_load_n(r->head, __ATOMIC_ACQUIRE);")
+                    self.line("if (r->position == r->limit) {")
+                    with self.indent():
+                        self.line("// wait for the driver to write in stdin")
+                        self.line("char wakeups[4096];")
+                        self.line("if (read(0, wakeups, sizeof wakeups) <= 0) exit(0);")
+                    self.line("}")
+                self.line("}")
+                self.line("int value = (int) r->data[r->position % r->capacity];")
+                self.line("__atomic_store_n(r->tail, ++r->position, __ATOMIC_RELEASE);")
+                self.line("return value;")
+            self.line("}")
+            # much faster than scanf, while still going through the stdio buffers
+            self.line("int c = getchar_unlocked();")
+            self.line("while (c == ' ' || c == '\\n' || c == '\\r' || c == '\\t') c = getchar_unlocked();")
+            self.line("int negative = c == '-';")
+            self.line("if (negative) c = getchar_unlocked();")
+            self.line("unsigned x = 0;")
+            self.line("for (; c >= '0' && c <= '9'; c = getchar_unlocked()) x = 10 * x + (c - '0');")
+            self.line("return negative ? -x : x;")
+        self.line("}")
+        self.line()
+        self.line("static void wake_up_driver(long long position) {")
+        with self.indent():
+            self.line("// if it is waiting for something new")
+            self.line("if (position != flushed_position) {")
+            with self.indent():
+                self.line("char wakeup = 0;")
+                self.line("write(1, &wakeup, 1);")
+                self.line("flushed_position = position;")
+            self.line("}")
+        self.line("}")
+        self.line()
+        self.line("static void put_value(long long value) {")
+        with self.indent():
+            self.line("struct ring *r = &up_ring;")
+            self.line("if (r->position - r->limit == r->capacity) {")
+            with self.indent():
+                self.line("// the driver may be waiting for the complete records, which are published")
+                self.line("wake_up_driver(*r->head);")
+            self.line("}")
+            self.line("while (r->position - r->limit == r->capacity) {")
+            with self.indent():
+                self.line("r->limit = __atomic_load_n(r->tail, __ATOMIC_ACQUIRE);")
+                self.line("if (r->position - r->limit == r->capacity) {")
+                with self.indent():
+                    self.line("// wait for the driver to read, or 100us")
+                    self.line("struct timespec timeout = {0, 100000};")
+                    self.line("syscall(SYS_futex, r->tail, FUTEX_WAIT, (int) r->limit, &timeout, NULL, 0);")
+                self.line("}")
+            self.line("}")
+            self.line("r->data[r->position++ % r->capacity] = value;")
+        self.line("}")
+        self.line()
+        self.line("static void write_int(int value) {")
+        with self.indent():
+            self.line("if (shm_enabled) {")
+            with self.indent():
+                self.line("// each line is a record, starting with the number of values")
+                self.line("if (record_length++ == 0) {")
+                with self.indent():
+                    self.line("record_start = up_ring.position;")
+                    self.line("put_value(0);")
+                self.line("}")
+                self.line("put_value(value);")
+                self.line("return;")
+            self.line("}")
+            # much faster than printf
+            self.line("if (line_started) putchar_unlocked(' ');")
+            self.line("line_started = 1;")
+            self.line("char digits[10];")
+            self.line("int n = 0;")
+            self.line("unsigned x = value;")
+            self.line("if (value < 0) {")
+            with self.indent():
+                self.line("putchar_unlocked('-');")
+                self.line("x = -x;")
+            self.line("}")
+            self.line("do digits[n++] = '0' + x % 10; while (x /= 10);")
+            self.line("while (n > 0) putchar_unlocked(digits[--n]);")
+        self.line("}")
+        self.line()
+        self.line("static void end_line() {")
+        with self.indent():
+            self.line("if (shm_enabled) {")
+            with self.indent():
+                self.line("up_ring.data[record_start % up_ring.capacity] = record_length;")
+                self.line("record_length = 0;")
+                self.line("__atomic_store_n(up_ring.head, up_ring.position, __ATOMIC_RELEASE);")
+                self.line("return;")
+            self.line("}")
+            self.line("putchar_unlocked('\\n');")
+            self.line("line_started = 0;")
+        self.line("}")
+        self.line()
+        self.line("static void flush_output() {")
+        with self.indent():
+            self.line("if (shm_enabled) {")
+            with self.indent():
+                self.line("wake_up_driver(up_ring.position);")
+            self.line("} else {")
+            with self.indent():
+                self.line("fflush(stdout);")
+            self.line("}")
+        self.line("}")
+        self.line()
+
+    def generate_io_setup(self):
+        self.line("init_io();")
+        self.line()
+
     def visit_InterfaceTemplate(self, n):
         for c in n.constants:
             self.visit(c)
@@ -90,14 +260,13 @@ class CppCodeGen(InterfaceCodeGen):
         self.line(f"{return_value}{method.name}({parameters});")
 
     def visit_Print(self, write_statement):
-        format_string = " ".join("%d" for _ in write_statement.arguments) + r"\n"
-        args = ", ".join(self.visit(v) for v in write_statement.arguments)
-        self.line(f"""printf("{format_string}", {args});""")
+        for v in write_statement.arguments:
+            self.line(f"write_int({self.visit(v)});")
+        self.line("end_line();")
 
     def visit_Read(self, n):
-        format_string = "".join("%d" for _ in n.arguments)
-        scanf_args = ", ".join("&" + self.visit(v) for v in n.arguments)
-        self.line(f"""scanf("{format_string}", {scanf_args});""")
+        for v in n.arguments:
+            self.line(f"{self.visit(v)} = read_int();")
 
     def visit_If(self, n):
         condition = self.visit(n.condition)
@@ -150,4 +319,4 @@ class CppCodeGen(InterfaceCodeGen):
         self.line("break;")
 
     def visit_Flush(self, n):
-        self.line("fflush(stdout);")
+        self.line("flush_output();")
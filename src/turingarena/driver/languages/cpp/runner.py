@@ -1,37 +1,72 @@
+import errno
 import logging
 import os
 import shutil
 import subprocess
-from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
-from subprocess import CalledProcessError
 
-import pkg_resources
-from turingarena.driver.sandbox.connection import create_failed_connection
+from turingarena.driver.artifacts import ArtifactCache, artifact_key
+from turingarena.driver.sandbox.connection import SandboxTransport
 from turingarena.driver.sandbox.popen import create_popen_process_connection
 from turingarena.driver.sandbox.rlimits import set_rlimits
 from turingarena.driver.sandbox.runner import ProgramRunner
+from turingarena.driver.sandbox.seccomp import ALLOW, ERRNO, TRAP, Arg, SeccompFilter, SeccompRule
+from turingarena.version import VERSION
+
+SANDBOX_FILTER = SeccompFilter(
+    default_action=TRAP,
+    rules=(
+        # no need to specify arguments of read/write (there should not be any other readable/writable fd)
+        *(SeccompRule(ALLOW, syscall, ()) for syscall in [
+            "read", "write", "readv", "writev",  # base I/O
+            "lseek", "ioctl", "fstat", "newfstatat",
+            "exit", "exit_group", "rt_sigreturn",
+            "mmap", "munmap", "mremap", "brk", "mprotect",
+            "execve",
+            "arch_prctl", "uname", "set_tid_address", "set_robust_list", "rseq", "getrandom", "futex",
+            "time",
+            # used to close inherited file descriptors, after the filter is loaded
+            "close", "close_range",
+        ]),
+        # only to get resource limits, not to set them
+        SeccompRule(ALLOW, "prlimit64", (Arg(index=2, value=0),)),
+        *(SeccompRule(ERRNO(errno.EACCES), syscall, ()) for syscall in [
+            "access", "madvise", "readlink", "readlinkat",
+        ]),
+    ),
+)
 
 
 class CppProgramRunner(ProgramRunner):
-    @contextmanager
-    def run_in_process(self):
+    compiler = "g++"
+    source_options = ("-O2", "-std=c++17", "-Wall")
+    skeleton_options = ("-O2", "-std=c++17", "-Wno-unused-result")
+    link_options = ("-static",)
+
+    @property
+    def build_options(self):
+        return (self.compiler, *self.source_options, *self.skeleton_options, *self.link_options)
+
+    def compile(self):
         with open(self._skeleton_path, "w") as f:
             self.language.Generator().generate_to_file(self.interface, f)
 
-        try:
+        # the skeleton only depends on the interface, so its object is usually cached,
+        # otherwise it is compiled while the source is
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            skeleton_object = executor.submit(self._skeleton_object_path)
             self._compile_source()
-            self._compile_skeleton()
-            self._link_executable()
-        except CalledProcessError:
-            yield create_failed_connection("Compilation failed.")
-        else:
-            sandbox_path = pkg_resources.resource_filename(__name__, "sandbox.py")
-
-            yield create_popen_process_connection(
-                ["python3", sandbox_path, self.executable_path],
-                preexec_fn=set_rlimits,
-            )
+            self._link_executable(skeleton_object.result())
+
+    def start(self):
+        return create_popen_process_connection(
+            [self.executable_path],
+            env={},
+            preexec_fn=set_rlimits,
+            seccomp_filter=SANDBOX_FILTER,
+            transport=SandboxTransport.default(),
+        )
 
     @staticmethod
     @lru_cache()
@@ -43,7 +78,7 @@ class CppProgramRunner(ProgramRunner):
 
     def _compile_source(self):
         cli = [
-            *self._ccache(), "g++", "-c", "-O2", "-std=c++17", "-Wall",
+            *self._ccache(), self.compiler, "-c", *self.source_options,
             "-o", self._source_object_path,
             self.program.source_path
         ]
@@ -51,21 +86,37 @@ class CppProgramRunner(ProgramRunner):
         logging.debug("Compiling source: " + " ".join(cli))
         subprocess.run(cli, universal_newlines=True, check=True)
 
-    def _compile_skeleton(self):
+    def _skeleton_object_path(self):
+        """
+        Returns the path of the compiled skeleton, compiling it only once per interface.
+        """
+        with open(self._skeleton_path) as f:
+            skeleton_text = f.read()
+
+        def build(build_dir):
+            self._compile_skeleton(os.path.join(build_dir, "skeleton.o"))
+
+        skeleton_dir = ArtifactCache.default("skeletons").get_or_build(
+            artifact_key(VERSION, self.compiler, *self.skeleton_options, skeleton_text),
+            build,
+        )
+        return os.path.join(skeleton_dir, "skeleton.o")
+
+    def _compile_skeleton(self, object_path):
         cli = [
-            *self._ccache(), "g++", "-c", "-O2", "-std=c++17", "-Wno-unused-result",
-            "-o", self._skeleton_object_path,
+            *self._ccache(), self.compiler, "-c", *self.skeleton_options,
+            "-o", object_path,
             self._skeleton_path,
         ]
 
         logging.debug("Compiling skeleton: " + " ".join(cli))
         subprocess.run(cli, universal_newlines=True, check=True)
 
-    def _link_executable(self):
+    def _link_executable(self, skeleton_object_path):
         cli = [
-            *self._ccache(), "g++", "-static",
+            *self._ccache(), self.compiler, *self.link_options,
             "-o", self.executable_path,
-            self._skeleton_object_path,
+            skeleton_object_path,
             self._source_object_path
         ]
 
@@ -80,10 +131,6 @@ class CppProgramRunner(ProgramRunner):
     def _skeleton_path(self):
         return os.path.join(self.temp_dir, "skeleton.cpp")
 
-    @property
-    def _skeleton_object_path(self):
-        return os.path.join(self.temp_dir, "skeleton.o")
-
     @property
     def _source_object_path(self):
         return os.path.join(self.temp_dir, "source.o")
@@ -1,5 +1,40 @@
 from turingarena.driver.gen.generator import InterfaceCodeGen
 
+io_functions = r"""
+var reader = bufio.NewReaderSize(os.Stdin, 1<<16)
+var writer = bufio.NewWriterSize(os.Stdout, 1<<16)
+
+func readInt() int {
+    c, _ := reader.ReadByte()
+    for c == ' ' || c == '\n' || c == '\r' || c == '\t' {
+        c, _ = reader.ReadByte()
+    }
+    negative := c == '-'
+    if negative {
+        c, _ = reader.ReadByte()
+    }
+    x := 0
+    for c >= '0' && c <= '9' {
+        x = 10*x + int(c-'0')
+        c, _ = reader.ReadByte()
+    }
+    if negative {
+        return -x
+    }
+    return x
+}
+
+func writeInts(values ...int) {
+    for i, value := range values {
+        if i > 0 {
+            writer.WriteByte(' ')
+        }
+        writer.WriteString(strconv.Itoa(value))
+    }
+    writer.WriteByte('\n')
+}
+"""
+
 
 class GoCodeGen(InterfaceCodeGen):
     def visit_Parameter(self, d):
@@ -28,9 +63,10 @@ class GoCodeGen(InterfaceCodeGen):
     def generate_header(self, interface):
         self.line("package main")
         self.line()
-        self.line('import "fmt"')
+        self.line('import "bufio"')
         self.line('import "os"')
-        self.line()
+        self.line('import "strconv"')
+        self.line(io_functions)
 
     def visit_VariableDeclaration(self, d):
         self.line(f"var {d.variable.name} {'[]' * d.dimensions + 'int'}")
@@ -95,14 +131,12 @@ class GoCodeGen(InterfaceCodeGen):
             self.call_statement_body(call_statement)
 
     def visit_Print(self, write_statement):
-        format_string = " ".join("%d" for _ in write_statement.arguments) + r"\n"
         args = ", ".join(self.visit(v) for v in write_statement.arguments)
-        self.line(f'fmt.Printf("{format_string}", {args})')
+        self.line(f"writeInts({args})")
 
     def visit_Read(self, statement):
-        format_string = "".join("%d" for _ in statement.arguments)
-        scanf_args = ", ".join("&" + self.visit(v) for v in statement.arguments)
-        self.line(f'fmt.Scanf("{format_string}", {scanf_args});')
+        for v in statement.arguments:
+            self.line(f"{self.visit(v)} = readInt()")
 
     def visit_If(self, statement):
         condition = self.visit(statement.condition)
@@ -142,6 +176,7 @@ class GoCodeGen(InterfaceCodeGen):
         self.line("}")
 
     def visit_Exit(self, statement):
+        self.line("writer.Flush()")
         self.line("os.Exit(0)")
 
     def visit_Return(self, statement):
@@ -151,7 +186,7 @@ class GoCodeGen(InterfaceCodeGen):
         self.line("break")
 
     def visit_Flush(self, n):
-        self.line("os.Stdout.Sync()")
+        self.line("writer.Flush()")
 
     def visit_Constant(self, m):
         self.line(f"const {m.variable.name} = {self.visit(m.value)}")
@@ -2,9 +2,8 @@ import logging
 import os
 import shutil
 import subprocess
-from contextlib import contextmanager
 
-from turingarena.driver.sandbox.connection import create_failed_connection
+from turingarena.driver.artifacts import tool_cache_dir
 from turingarena.driver.sandbox.popen import create_popen_process_connection
 from turingarena.driver.sandbox.rlimits import set_rlimits
 from turingarena.driver.sandbox.runner import ProgramRunner
@@ -17,8 +16,11 @@ class GoProgramRunner(ProgramRunner):
     def executable_path(self):
         return os.path.join(self.temp_dir, "algorithm")
 
-    @contextmanager
-    def run_in_process(self):
+    @property
+    def build_options(self):
+        return ("go", "build")
+
+    def compile(self):
         with open(os.path.join(self.temp_dir, "skeleton.go"), "w") as f:
             self.language.Generator().generate_to_file(self.interface, f)
 
@@ -27,22 +29,25 @@ class GoProgramRunner(ProgramRunner):
         cli = [
             "go",
             "build",
+            # builds happen in different directories, which must not end up in the binary
+            "-trimpath",
             "-o", self.executable_path,
             os.path.join(self.temp_dir, "skeleton.go"),
             os.path.join(self.temp_dir, "solution.go"),
         ]
         logger.debug(f"Running {' '.join(cli)}")
-        try:
+        # the default GOCACHE is per user, and may not be writable
+        with tool_cache_dir("go-build") as go_cache:
             subprocess.run(
                 cli,
+                env=dict(os.environ, GOCACHE=go_cache),
                 universal_newlines=True,
                 check=True,
             )
-        except subprocess.CalledProcessError:
-            yield create_failed_connection("Compilation failed.")
-        else:
-            # sandbox_path = pkg_resources.resource_filename(__name__, "sandbox.py")
-            yield create_popen_process_connection(
-                [self.executable_path],
-                preexec_fn=set_rlimits,
-            )
+
+    def start(self):
+        # sandbox_path = pkg_resources.resource_filename(__name__, "sandbox.py")
+        return create_popen_process_connection(
+            [self.executable_path],
+            preexec_fn=set_rlimits,
+        )
@@ -1,14 +1,76 @@
 from turingarena.driver.gen.generator import InterfaceCodeGen
 
+# buffered integer I/O, much faster than Scanner and printf (which flushes at each line)
+io_methods = r"""
+private static final byte[] inBuffer = new byte[1 << 16];
+private static int inLength = 0;
+private static int inPosition = 0;
+
+private static final byte[] outBuffer = new byte[1 << 16];
+private static int outLength = 0;
+
+private static int readByte() {
+    if (inPosition == inLength) {
+        try {
+            inLength = System.in.read(inBuffer, 0, inBuffer.length);
+        } catch (IOException e) {
+            throw new UncheckedIOException(e);
+        }
+        inPosition = 0;
+        if (inLength <= 0) {
+            inLength = 0;
+            return -1;
+        }
+    }
+    return inBuffer[inPosition++];
+}
+
+private static int readInt() {
+    int c = readByte();
+    while (c == ' ' || c == '\n' || c == '\r' || c == '\t') c = readByte();
+    boolean negative = c == '-';
+    if (negative) c = readByte();
+    int x = 0;
+    for (; c >= '0' && c <= '9'; c = readByte()) x = 10 * x + (c - '0');
+    return negative ? -x : x;
+}
+
+private static void writeByte(int c) {
+    if (outLength == outBuffer.length) flush();
+    outBuffer[outLength++] = (byte) c;
+}
+
+private static void writeInt(int value) {
+    long x = value;
+    if (x < 0) {
+        writeByte('-');
+        x = -x;
+    }
+    byte[] digits = new byte[10];
+    int n = 0;
+    do digits[n++] = (byte) ('0' + x % 10); while ((x /= 10) > 0);
+    while (n > 0) writeByte(digits[--n]);
+}
+
+private static void flush() {
+    if (outLength == 0) return;
+    System.out.write(outBuffer, 0, outLength);
+    System.out.flush();
+    outLength = 0;
+}
+"""
+
 
 class JavaCodeGen(InterfaceCodeGen):
 
     def visit_Interface(self, n):
-        self.line("import java.util.Scanner;")
+        self.line("import java.io.IOException;")
+        self.line("import java.io.UncheckedIOException;")
         self.line()
         self.line("abstract class Skeleton {")
         with self.indent():
-            self.line("private static final Scanner in = new Scanner(System.in);")
+            for l in io_methods.strip().splitlines():
+                self.line(l or None)
             self.line()
             for c in n.constants:
                 self.visit(c)
@@ -114,13 +176,15 @@ class JavaCodeGen(InterfaceCodeGen):
         self.line(f"{return_value}__solution.{method.name}({parameters});")
 
     def visit_Print(self, statement):
-        format_string = " ".join("%d" for _ in statement.arguments) + r"\n"
-        args = ", ".join(self.visit(v) for v in statement.arguments)
-        self.line(f'System.out.printf("{format_string}", {args});')
+        for i, v in enumerate(statement.arguments):
+            if i > 0:
+                self.line("writeByte(' ');")
+            self.line(f"writeInt({self.visit(v)});")
+        self.line("writeByte('\\n');")
 
     def visit_Read(self, statement):
         for arg in statement.arguments:
-            self.line(f"{self.visit(arg)} = in.nextInt();")
+            self.line(f"{self.visit(arg)} = readInt();")
 
     def visit_If(self, statement):
         condition = self.visit(statement.condition)
@@ -163,9 +227,10 @@ class JavaCodeGen(InterfaceCodeGen):
         self.line("}")
 
     def visit_Flush(self, n):
-        self.line("System.out.flush();")
+        self.line("flush();")
 
     def visit_Exit(self, exit_statement):
+        self.line("flush();")
         self.line("System.exit(0);")
 
     def visit_Return(self, return_statement):
@@ -2,61 +2,147 @@ import logging
 import os
 import shutil
 import subprocess
-from contextlib import contextmanager
-from subprocess import CalledProcessError
+import tempfile
+import zipfile
 
 import pkg_resources
-from turingarena.driver.sandbox.connection import create_failed_connection
+from turingarena.driver.artifacts import ArtifactCache, artifact_key
 from turingarena.driver.sandbox.popen import create_popen_process_connection
 from turingarena.driver.sandbox.runner import ProgramRunner
+from turingarena.version import VERSION
 
 logger = logging.getLogger(__name__)
 
+SKELETON_JAR = "skeleton.jar"
+SHARED_ARCHIVE = "skeleton.jsa"
+
+# JVM logs (e.g., about an unusable shared archive) go to stdout by default, which is the pipe to the driver
+LOG_OPTIONS = ("-Xlog:disable", "-Xlog:all=warning:stderr")
+
+
+def cds_enabled():
+    return os.environ.get("TURINGARENA_JAVA_CDS", "1") != "0"
+
 
 class JavaProgramRunner(ProgramRunner):
+    """
+    Runs Java programs.
+
+    The skeleton is compiled once per interface (against the template solution)
+    into a jar in the artifact cache, and only the solution is compiled for each program.
+    Next to the jar, an AppCDS archive keeps the classes loaded at startup already parsed,
+    which saves a good part of the JVM startup time.
+    The archive is created while compiling, so that starting a program never builds anything.
+    """
+
     __slots__ = []
 
     @property
     def skeleton_path(self):
         return os.path.join(self.temp_dir, "Skeleton.java")
 
-    @contextmanager
-    def run_in_process(self):
-        # rename files because javac will complain if the file doesn't have
-        # the same name of the class defined in it.
-        solution_path = os.path.join(self.temp_dir, "Solution.java")
-        shutil.copy(self.program.source_path, solution_path)
+    @property
+    def solution_path(self):
+        # javac complains if the file is not named after the class defined in it
+        return os.path.join(self.temp_dir, "Solution.java")
+
+    @property
+    def build_options(self):
+        # whether compile() creates the shared archive
+        return ("javac", f"cds={int(cds_enabled())}")
+
+    def compile(self):
+        shutil.copy(self.program.source_path, self.solution_path)
 
         with open(self.skeleton_path, "w") as f:
             self.language.Generator().generate_to_file(self.interface, f)
 
-        try:
-            subprocess.run(
-                [
-                    "javac",
-                    self.skeleton_path,
-                    solution_path,
-                ],
-                universal_newlines=True,
-                bufsize=1,
-                check=True,
-            )
-        except CalledProcessError:
-            yield create_failed_connection("Compilation failed.")
-        else:
-            security_policy_path = pkg_resources.resource_filename(__name__, "security.policy")
-            cli = [
-                "java",
-                "-cp", self.temp_dir,
-                "-Djava.security.manager",
-                f"-Djava.security.policy=={security_policy_path}",
-                "Skeleton",
-            ]
-
-            yield create_popen_process_connection(
-                cli,
-                # preexec_fn=set_rlimits(),
-            )
+        skeleton_dir = self._skeleton_dir()
+        skeleton_jar = os.path.join(skeleton_dir, SKELETON_JAR)
+
+        subprocess.run(
+            [
+                "javac",
+                "-cp", skeleton_jar,
+                "-d", self.temp_dir,
+                self.solution_path,
+            ],
+            universal_newlines=True,
+            bufsize=1,
+            check=True,
+        )
+
+        if cds_enabled():
+            self._build_shared_archive(skeleton_dir)
+
+    def start(self):
+        skeleton_dir = self._skeleton_dir()
+        skeleton_jar = os.path.join(skeleton_dir, SKELETON_JAR)
+
+        options = [*self._security_options()]
+        if cds_enabled():
+            shared_archive = self._shared_archive(skeleton_dir)
+            if shared_archive is not None:
+                options.append(f"-XX:SharedArchiveFile={shared_archive}")
+
+        cli = [
+            "java",
+            *LOG_OPTIONS,
+            *options,
+            # the archive is only used if its class path is a prefix of this one
+            "-cp", os.pathsep.join([skeleton_jar, self.temp_dir]),
+            "Skeleton",
+        ]
+
+        return create_popen_process_connection(
+            cli,
+            # preexec_fn=set_rlimits(),
+        )
+
+    def _security_options(self):
+        security_policy_path = pkg_resources.resource_filename(__name__, "security.policy")
+        return (
+            "-Djava.security.manager",
+            f"-Djava.security.policy=={security_policy_path}",
+        )
+
+    def _skeleton_dir(self):
+        with open(self.skeleton_path) as f:
+            skeleton_text = f.read()
+
+        def build(build_dir):
+            _build_skeleton_jar(self.language, self.interface, skeleton_text, build_dir)
+
+        return ArtifactCache.default("java-skeletons").get_or_build(
+            artifact_key(VERSION, "javac", skeleton_text),
+            build,
+        )
+
+    def _shared_archive_key(self, skeleton_dir):
+        skeleton_jar = os.path.join(skeleton_dir, SKELETON_JAR)
+        # the archive records the path and the modification time of the jar
+        return artifact_key(VERSION, "cds", skeleton_jar, str(os.stat(skeleton_jar).st_mtime_ns))
+
+    def _build_shared_archive(self, skeleton_dir):
+        skeleton_jar = os.path.join(skeleton_dir, SKELETON_JAR)
+
+        def build(build_dir):
+            _build_shared_archive(skeleton_jar, self._security_options(), build_dir)
+
+        ArtifactCache.default("java-skeletons").get_or_build(self._shared_archive_key(skeleton_dir), build)
+
+    def _shared_archive(self, skeleton_dir):
+        """
+        Returns the path of the AppCDS archive for the skeleton,
+        or None if it was not created while compiling (e.g., the JVM cannot create it) or it was evicted.
+        """
+        archive_dir = ArtifactCache.default("java-skeletons").lookup(self._shared_archive_key(skeleton_dir))
+        if archive_dir is None:
+            return None
+        archive_path = os.path.join(archive_dir, SHARED_ARCHIVE)
+        if not os.path.exists(archive_path):
+            return None
+        return archive_path
 
     def get_memory_usage(self, process):
         # FIXME: unused
@@ -70,3 +156,52 @@ class JavaProgramRunner(ProgramRunner):
             memory_utilization = 0
         logger.debug(f"memory usage : {memory_utilization / 1000000}Mb")
         return memory_utilization
+
+
+def _build_skeleton_jar(language, interface, skeleton_text, build_dir):
+    with tempfile.TemporaryDirectory() as source_dir:
+        skeleton_path = os.path.join(source_dir, "Skeleton.java")
+        with open(skeleton_path, "w") as f:
+            f.write(skeleton_text)
+
+        # the skeleton refers to Solution, so it is compiled together with the template,
+        # whose class is then left out of the jar
+        template_path = os.path.join(source_dir, "Solution.java")
+        with open(template_path, "w") as f:
+            language.Generator().generate_template_to_file(interface, None, f)
+
+        classes_dir = os.path.join(source_dir, "classes")
+        subprocess.run(
+            ["javac", "-d", classes_dir, skeleton_path, template_path],
+            universal_newlines=True,
+            check=True,
+        )
+
+        # AppCDS only archives classes loaded from jars
+        with zipfile.ZipFile(os.path.join(build_dir, SKELETON_JAR), "w") as jar:
+            for name in sorted(os.listdir(classes_dir)):
+                if name.startswith("Skeleton"):
+                    jar.write(os.path.join(classes_dir, name), name)
+
+
+def _build_shared_archive(skeleton_jar, options, build_dir):
+    # a dynamic archive of the classes loaded by a run of the skeleton alone, which stops
+    # as soon as it looks for Solution, after loading the JDK classes used at startup;
+    # the JVM writes it at exit (JDK 13 or later, otherwise no archive is created)
+    archive_path = os.path.join(build_dir, SHARED_ARCHIVE)
+    result = subprocess.run(
+        [
+            "java",
+            *LOG_OPTIONS,
+            *options,
+            f"-XX:ArchiveClassesAtExit={archive_path}",
+            "-cp", skeleton_jar,
+            "Skeleton",
+        ],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    if not os.path.exists(archive_path):
+        logger.info(f"cannot create AppCDS archive for {skeleton_jar}: {result.stderr}")
@@ -1,4 +1,26 @@
+from turingarena.driver.common.nodes import Read, Subscript, Variable
 from turingarena.driver.gen.generator import InterfaceCodeGen
+from turingarena.driver.gen.nodes import Comment, Flush
+
+# integers are read from a token iterator over the lines of binary stdin,
+# and written to binary stdout, which is flushed only when needed
+SKELETON_IO = r"""
+import sys as _sys
+from itertools import islice as _islice
+
+_stdin = _sys.stdin.buffer
+_stdout = _sys.stdout.buffer
+_write = _stdout.write
+
+
+def _tokens():
+    for line in _stdin:
+        yield from line.split()
+
+
+_ints = map(int, _tokens())
+_read = _ints.__next__
+"""
 
 SKELETON_REAL_MAIN = r"""
 if __name__ == '__main__':
@@ -18,6 +40,7 @@ if __name__ == '__main__':
 class PythonCodeGen(InterfaceCodeGen):
     def visit_Interface(self, n):
         self.line('import os as _os')
+        self.line(SKELETON_IO)
         self.line()
         for c in n.constants:
             self.visit(c)
@@ -55,7 +78,7 @@ class PythonCodeGen(InterfaceCodeGen):
         self.line(f'return {self.visit(n.value)}')
 
     def visit_Flush(self, n):
-        self.line(f'print(end="", flush=True)')
+        self.line('_stdout.flush()')
 
     def visit_Alloc(self, n):
         size = self.visit(n.size)
@@ -90,12 +113,15 @@ class PythonCodeGen(InterfaceCodeGen):
             self.line(call_expr)
 
     def visit_Print(self, n):
+        format_string = " ".join("%d" for _ in n.arguments)
         args = ', '.join(self.visit(arg) for arg in n.arguments)
-        self.line(f'print({args})')
+        if len(n.arguments) == 1:
+            args += ','
+        self.line(f'_write(b"{format_string}\\n" % ({args}))')
 
     def visit_Read(self, n):
-        arguments = ", ".join(self.visit(arg) for arg in n.arguments)
-        self.line(f'[{arguments}] = map(int, input().split())')
+        for arg in n.arguments:
+            self.line(f'{self.visit(arg)} = _read()')
 
     def visit_If(self, n):
         condition = self.visit(n.condition)
@@ -112,10 +138,36 @@ class PythonCodeGen(InterfaceCodeGen):
     def visit_For(self, n):
         index_name = n.index.variable.name
         size = self.visit(n.index.range)
+
+        array = self._bulk_read_array(n)
+        if array is not None:
+            self.line(f'# read {self.visit(array)}[{index_name}] in bulk')
+            self.visit_Flush(None)
+            self.line(f'{self.visit(array)}[:] = _islice(_ints, {size})')
+            return
+
         self.line(f'for {index_name} in range({size}):')
         with self.indent():
             self.visit(n.body)
 
+    @staticmethod
+    def _bulk_read_array(n):
+        """
+        If the for loop only reads each item of an array, returns the array, otherwise None.
+        """
+        statements = [
+            c for c in n.body.children
+            if not isinstance(c, (Comment, Flush))
+        ]
+        if len(statements) != 1 or not isinstance(statements[0], Read):
+            return None
+        arguments = statements[0].arguments
+        if len(arguments) != 1 or not isinstance(arguments[0], Subscript):
+            return None
+        if arguments[0].index != Variable(n.index.variable.name):
+            return None
+        return arguments[0].array
+
     def visit_Loop(self, n):
         self.line('while True:')
         with self.indent():
@@ -1,11 +1,20 @@
+import logging
 import os
 import shutil
-from contextlib import contextmanager
 
 import pkg_resources
+from turingarena.driver.artifacts import artifact_key
+from turingarena.driver.sandbox import rlimits
 from turingarena.driver.sandbox.popen import create_popen_process_connection
 from turingarena.driver.sandbox.rlimits import set_rlimits
 from turingarena.driver.sandbox.runner import ProgramRunner
+from turingarena.driver.sandbox.zygote import create_zygote_process_connection, get_zygote
+
+INTERPRETER = "python3"
+
+
+def zygote_enabled():
+    return os.environ.get("TURINGARENA_PYTHON_ZYGOTE", "1") != "0"
 
 
 class PythonProgramRunner(ProgramRunner):
@@ -15,16 +24,38 @@ class PythonProgramRunner(ProgramRunner):
     def skeleton_path(self):
         return os.path.join(self.temp_dir, "skeleton.py")
 
-    @contextmanager
-    def run_in_process(self):
-        shutil.copy(self.program.source_path, self.temp_dir)
+    @property
+    def source_path(self):
+        return os.path.join(self.temp_dir, "solution.py")
+
+    def compile(self):
+        shutil.copy(self.program.source_path, self.source_path)
 
         with open(self.skeleton_path, "w") as f:
             self.language.Generator().generate_to_file(self.interface, f)
 
+    def start(self):
+        if zygote_enabled():
+            try:
+                return self._start_in_zygote()
+            except OSError:
+                logging.warning("cannot start process in zygote, starting a new interpreter", exc_info=True)
+
         sandbox_path = pkg_resources.resource_filename(__name__, "sandbox.py")
 
-        yield create_popen_process_connection(
-            ["python3", sandbox_path, self.program.source_path, self.skeleton_path],
+        return create_popen_process_connection(
+            [INTERPRETER, sandbox_path, self.source_path, self.skeleton_path],
             preexec_fn=set_rlimits,
         )
+
+    def _start_in_zygote(self):
+        # one zygote for each skeleton (i.e., interface), which keeps it already compiled
+        with open(self.skeleton_path) as f:
+            skeleton_text = f.read()
+
+        zygote_path = pkg_resources.resource_filename(__name__, "zygote.py")
+        zygote = get_zygote(
+            key=(INTERPRETER, artifact_key(skeleton_text)),
+            cli=[INTERPRETER, zygote_path, rlimits.__file__, self.skeleton_path],
+        )
+        return create_zygote_process_connection(zygote, dict(source_path=self.source_path))
@@ -22,29 +22,36 @@ def init_sandbox():
     filter.load()
 
 
-def main():
-    source_path, skeleton_path = sys.argv[1:]
-
-    with open(source_path) as source_file:
-        source_string = source_file.read()
-    with open(skeleton_path) as skeleton_file:
-        skeleton_string = skeleton_file.read()
-
-    os.environ.clear()
+def compile_program(path):
+    with open(path) as f:
+        return compile(f.read(), path, "exec")
 
-    init_sandbox()
 
+def run_program(source_code, skeleton_code):
     class Wrapper: pass
 
     skeleton = Wrapper()
     source = Wrapper()
 
     # run skeleton and source
-    exec(source_string, source.__dict__)
-    exec(skeleton_string, skeleton.__dict__)
+    exec(source_code, source.__dict__)
+    exec(skeleton_code, skeleton.__dict__)
 
     skeleton.main(source)
 
 
+def main():
+    source_path, skeleton_path = sys.argv[1:]
+
+    source_code = compile_program(source_path)
+    skeleton_code = compile_program(skeleton_path)
+
+    os.environ.clear()
+
+    init_sandbox()
+
+    run_program(source_code, skeleton_code)
+
+
 if __name__ == "__main__":
     main()
@@ -1,3 +1,14 @@
+import os
+import time
+from tempfile import TemporaryDirectory
+
+import pkg_resources
+import pytest
+
+from turingarena.driver.languages.python import runner
+from turingarena.driver.sandbox import rlimits
+from turingarena.driver.sandbox.rlimits import DEFAULT_MEMORY_LIMIT
+from turingarena.driver.sandbox.zygote import Zygote
 from turingarena.driver.tests.test_utils import define_algorithm
 
 
@@ -10,7 +21,9 @@ interface_text = """
 """
 
 
-def test_sandbox_smoke():
+@pytest.mark.parametrize("zygote", ["1", "0"])
+def test_sandbox_smoke(monkeypatch, zygote):
+    monkeypatch.setenv("TURINGARENA_PYTHON_ZYGOTE", zygote)
     with define_algorithm(
             interface_text=interface_text,
             language_name="Python",
@@ -21,3 +34,103 @@ def test_sandbox_smoke():
     ) as algo:
         with algo.run() as p:
             assert p.functions.test() == 3
+
+
+def test_zygote_reused():
+    with define_algorithm(
+            interface_text=interface_text,
+            language_name="Python",
+            source_text="""if True:
+                counter = [0]
+                def test():
+                    counter[0] += 1
+                    return counter[0]
+            """,
+    ) as algo:
+        # each run starts from a clean state, even if forked from the same zygote
+        for _ in range(3):
+            with algo.run() as p:
+                assert p.functions.test() == 1
+
+
+def test_zygote_does_not_leak_programs():
+    sources = [
+        """if True:
+            def secret_marker():
+                pass
+
+            def test():
+                return 0
+        """,
+        """if True:
+            def test():
+                import gc
+                code_type = type(test.__code__)
+                for o in gc.get_objects():
+                    for r in gc.get_referents(o):
+                        if isinstance(r, code_type) and "secret_marker" in r.co_names:
+                            return 1
+                return 0
+        """,
+    ]
+    for source_text in sources:
+        with define_algorithm(
+                interface_text=interface_text,
+                language_name="Python",
+                source_text=source_text,
+        ) as algo:
+            # forked from the same zygote, since the skeleton is the same
+            with algo.run() as p:
+                assert p.functions.test() == 0
+
+
+def _proc_state(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(") ", 1)[1].split()[0]
+    except FileNotFoundError:
+        return None
+
+
+def _wait_for_state(pid, state):
+    for _ in range(100):
+        if _proc_state(pid) == state:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_zygote_reaps_after_wait():
+    with TemporaryDirectory() as temp_dir:
+        skeleton_path = os.path.join(temp_dir, "skeleton.py")
+        source_path = os.path.join(temp_dir, "solution.py")
+        with open(skeleton_path, "w") as f:
+            print("def main(source): pass", file=f)
+        with open(source_path, "w") as f:
+            print("pass", file=f)
+
+        zygote = Zygote([
+            runner.INTERPRETER,
+            pkg_resources.resource_filename(runner.__name__, "zygote.py"),
+            rlimits.__file__,
+            skeleton_path,
+        ])
+        try:
+            process = zygote.spawn(dict(
+                source_path=source_path,
+                cgroup_procs=None,
+                memory_limit=DEFAULT_MEMORY_LIMIT,
+            ))
+            process.stdin.close()
+
+            # the PID is not reused while the driver may still use it
+            assert _wait_for_state(process.pid, "Z")
+            time.sleep(0.1)
+            assert _proc_state(process.pid) == "Z"
+
+            _, status, _ = process.wait4(process.pid, 0)
+            assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+            assert _wait_for_state(process.pid, None)
+            process.stdout.close()
+        finally:
+            zygote.close()
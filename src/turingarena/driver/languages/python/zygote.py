@@ -0,0 +1,134 @@
+import importlib.util
+import json
+import os
+import signal
+import socket
+import sys
+import traceback
+
+from sandbox import compile_program, init_sandbox, run_program
+
+
+def main():
+    rlimits_path, skeleton_path, control_fd = sys.argv[1:]
+
+    rlimits = load_module("rlimits", rlimits_path)
+    control = socket.socket(fileno=int(control_fd))
+    # the zygote is shared by all the programs with the same skeleton, so it must not hold anything of a program,
+    # which the following ones could find in their memory: each program is compiled by its own child
+    skeleton_code = compile_program(skeleton_path)
+
+    # waiters are reaped automatically
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    control.send(b"ready")
+
+    while True:
+        message, fds, _, _ = socket.recv_fds(control, 4096, 3)
+        if not message:
+            # the driver has gone away
+            break
+
+        request = json.loads(message)
+
+        if os.fork() == 0:
+            control.close()
+            try:
+                run_waiter(request, fds, skeleton_code, rlimits)
+            finally:
+                os._exit(1)
+
+        for fd in fds:
+            os.close(fd)
+
+
+def load_module(name, path):
+    # the driver package may not be importable by this interpreter, nor it should be loaded in the sandbox
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_waiter(request, fds, skeleton_code, rlimits):
+    """
+    Forks the child which runs the program, and sends its status changes to the driver,
+    which cannot wait for a process it did not fork.
+
+    When the child terminates, it is reaped only after the driver acknowledges it,
+    since until then the driver may still use its PID (to signal it, or read its statistics),
+    which may be reused as soon as the child is reaped.
+    """
+
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+
+    stdin_fd, stdout_fd, channel_fd = fds
+    channel = socket.socket(fileno=channel_fd)
+
+    pid = os.fork()
+    if pid == 0:
+        channel.close()
+        try:
+            run_child(request, stdin_fd, stdout_fd, skeleton_code, rlimits)
+        finally:
+            os._exit(1)
+
+    os.close(stdin_fd)
+    os.close(stdout_fd)
+
+    channel.send(f"{pid}".encode())
+    while True:
+        result = os.waitid(os.P_PID, pid, os.WEXITED | os.WSTOPPED | os.WNOWAIT)
+        if result.si_code != os.CLD_STOPPED:
+            channel.send(b"exited")
+            # the driver closes the channel if it goes away
+            channel.recv(16)
+        _, status, rusage = os.wait4(pid, os.WUNTRACED)
+        channel.send(f"{status} {rusage.ru_utime} {rusage.ru_stime} {rusage.ru_maxrss}".encode())
+        if not os.WIFSTOPPED(status):
+            break
+    os._exit(0)
+
+
+def run_child(request, stdin_fd, stdout_fd, skeleton_code, rlimits):
+    os.dup2(stdin_fd, 0)
+    os.dup2(stdout_fd, 1)
+    os.closerange(3, os.sysconf("SC_OPEN_MAX"))
+
+    if request["cgroup_procs"] is not None:
+        with open(request["cgroup_procs"], "w") as f:
+            f.write("0")
+
+    rlimits.set_rlimits(memory_limit=request["memory_limit"])
+
+    sys.stdin = os.fdopen(0, "r")
+    sys.stdout = os.fdopen(1, "w")
+
+    exit_code = 0
+    try:
+        source_code = compile_program(request["source_path"])
+
+        os.environ.clear()
+
+        init_sandbox()
+
+        run_program(source_code, skeleton_code)
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            exit_code = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException:
+        traceback.print_exc()
+        exit_code = 1
+
+    try:
+        sys.stdout.flush()
+    except BaseException:
+        exit_code = 1
+    os._exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
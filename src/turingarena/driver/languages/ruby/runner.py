@@ -1,6 +1,5 @@
 import os
 import shutil
-from contextlib import contextmanager
 
 import pkg_resources
 from turingarena.driver.sandbox.popen import create_popen_process_connection
@@ -14,16 +13,16 @@ class RubyProgramRunner(ProgramRunner):
     def skeleton_path(self):
         return os.path.join(self.temp_dir, "skeleton.rb")
 
-    @contextmanager
-    def run_in_process(self):
+    def compile(self):
         shutil.copy(self.program.source_path, self.temp_dir)
 
         with open(self.skeleton_path, "w") as f:
             self.language.Generator().generate_to_file(self.interface, f)
 
+    def start(self):
         sandbox_path = pkg_resources.resource_filename(__name__, "sandbox.rb")
 
-        yield create_popen_process_connection(
+        return create_popen_process_connection(
             ["ruby", sandbox_path, self.skeleton_path],
             preexec_fn=set_rlimits,
         )
@@ -1,20 +1,60 @@
 from turingarena.driver.gen.generator import InterfaceCodeGen
 
 
-read_macro = r"""
-macro_rules! readln {
-    ($($var:expr),*) => {{
-        let mut buf = String::new();
-        std::io::stdin().read_line(&mut buf).unwrap();
-        let parts: Vec<&str> = buf.trim().split(" ").collect();
-        let mut i: usize = 0;
-        $(
-            assert!(i < parts.len(), "input format incorrect: too few values on this line"); 
-            $var = parts[i].parse().unwrap();
-            i += 1;
-        )*
-        assert!(i == parts.len(), "input format incorrect: too many values on the line")
-    }};
+io_functions = r"""
+thread_local! {
+    static OUTPUT: std::cell::RefCell<std::io::BufWriter<std::io::Stdout>> =
+        std::cell::RefCell::new(std::io::BufWriter::with_capacity(1 << 16, std::io::stdout()));
+}
+
+fn read_int() -> i64 {
+    let stdin = std::io::stdin();
+    let mut input = stdin.lock();
+    let mut negative = false;
+    let mut started = false;
+    let mut value: i64 = 0;
+    loop {
+        let buf = input.fill_buf().unwrap();
+        if buf.is_empty() {
+            break;
+        }
+        let mut used = 0;
+        let mut done = false;
+        for &c in buf {
+            if c.is_ascii_digit() {
+                value = 10 * value + (c - b'0') as i64;
+                started = true;
+            } else if c == b'-' && !started && !negative {
+                negative = true;
+            } else if started {
+                done = true;
+                break;
+            }
+            used += 1;
+        }
+        input.consume(used);
+        if done {
+            break;
+        }
+    }
+    if negative { -value } else { value }
+}
+
+fn write_ints(values: &[i64]) {
+    OUTPUT.with(|output| {
+        let mut output = output.borrow_mut();
+        for (i, value) in values.iter().enumerate() {
+            if i > 0 {
+                output.write_all(b" ").unwrap();
+            }
+            write!(output, "{}", value).unwrap();
+        }
+        output.write_all(b"\n").unwrap();
+    });
+}
+
+fn flush() {
+    OUTPUT.with(|output| output.borrow_mut().flush().unwrap());
 }
 """
 
@@ -40,8 +80,8 @@ class RustCodeGen(InterfaceCodeGen):
 
     def visit_Interface(self, n):
         self.line("mod solution;")
-        self.line("use std::io::Write;")
-        self.line(read_macro)
+        self.line("use std::io::{BufRead, Write};")
+        self.line(io_functions)
         for c in n.constants:
             self.visit(c)
         self.line()
@@ -123,13 +163,12 @@ class RustCodeGen(InterfaceCodeGen):
         self.line(f"{return_value}solution::{method.name}({parameters});")
 
     def visit_Print(self, write_statement):
-        format_string = " ".join("{}" for _ in write_statement.arguments)
         args = ", ".join(self.visit(v) for v in write_statement.arguments)
-        self.line(f"println!(\"{format_string}\", {args});")
+        self.line(f"write_ints(&[{args}]);")
 
     def visit_Read(self, n):
-        args = ", ".join(self.visit(v) for v in n.arguments)
-        self.line(f"readln!({args});")
+        for v in n.arguments:
+            self.line(f"{self.visit(v)} = read_int();")
 
     def visit_If(self, n):
         condition = self.visit(n.condition)
@@ -173,6 +212,8 @@ class RustCodeGen(InterfaceCodeGen):
         self.line("}")
 
     def visit_Exit(self, n):
+        # exit does not run destructors, which would flush
+        self.line("flush();")
         self.line("std::process::exit(0);")
 
     def visit_Return(self, n):
@@ -182,4 +223,4 @@ class RustCodeGen(InterfaceCodeGen):
         self.line("break;")
 
     def visit_Flush(self, n):
-        self.line("std::io::stdout().flush().unwrap();")
+        self.line("flush();")
@@ -3,41 +3,57 @@ import os
 import shutil
 import subprocess
 
-from contextlib import contextmanager
-
-from turingarena.driver.sandbox.connection import create_failed_connection
+from turingarena.driver.artifacts import artifact_key, tool_cache_dir
 from turingarena.driver.sandbox.popen import create_popen_process_connection
 from turingarena.driver.sandbox.rlimits import set_rlimits
 from turingarena.driver.sandbox.runner import ProgramRunner
+from turingarena.version import VERSION
 
 
 class RustProgramRunner(ProgramRunner):
-    @contextmanager
-    def run_in_process(self):
+    @property
+    def build_options(self):
+        return ("rustc",)
+
+    def compile(self):
         with open(self._skeleton_path, "w") as f:
             self.language.Generator().generate_to_file(self.interface, f)
 
         shutil.copy(self.program.source_path, self._source_path)
 
-        try:
-            self._compile()
-        except subprocess.CalledProcessError:
-            yield create_failed_connection("Compilation failed.")
-        else:
-            yield create_popen_process_connection(
-                [self.executable_path],
-                preexec_fn=set_rlimits,
-            )
+        self._compile()
+
+    def start(self):
+        return create_popen_process_connection(
+            [self.executable_path],
+            preexec_fn=set_rlimits,
+        )
 
     def _compile(self):
-        cli = [
-            "rustc",
-            "-o", self.executable_path,
-            self._skeleton_path
-        ]
-
-        logging.debug("Compiling source: " + " ".join(cli))
-        subprocess.run(cli, universal_newlines=True, check=True)
+        with tool_cache_dir("rust-incremental") as incremental_cache:
+            cli = [
+                "rustc",
+                "-C", f"incremental={self._incremental_dir(incremental_cache)}",
+                # builds happen in different directories, which must not invalidate the incremental cache
+                f"--remap-path-prefix={self.temp_dir}=.",
+                "-o", self.executable_path,
+                self._skeleton_path
+            ]
+
+            logging.debug("Compiling source: " + " ".join(cli))
+            subprocess.run(cli, universal_newlines=True, check=True)
+
+    def _incremental_dir(self, incremental_cache):
+        # one for each interface, so that the skeleton is not compiled again
+        # and a changed solution only rebuilds what changed
+        with open(self._skeleton_path) as f:
+            skeleton_text = f.read()
+
+        path = os.path.join(incremental_cache, artifact_key(VERSION, skeleton_text))
+        os.makedirs(path, exist_ok=True)
+        # mark as recently used
+        os.utime(path)
+        return path
 
     @property
     def executable_path(self):
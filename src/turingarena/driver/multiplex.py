@@ -0,0 +1,354 @@
+import io
+import logging
+import os
+import selectors
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from turingarena.driver.drive.comm import BlockingCall
+from turingarena.driver.sandbox.shm import SharedMemoryUpward
+
+logger = logging.getLogger(__name__)
+
+# how much to read from a file at once, and how much output to buffer before trying to write it
+CHUNK_SIZE = 1 << 16
+# threads making the blocking calls of the coroutines (e.g., stopping or killing a process)
+BLOCKING_CALL_WORKERS = 4
+
+
+class NonBlockingReader:
+    """
+    Reads from a non-blocking file descriptor, with the interface of the files used by the driver
+    (text lines with readline, bytes with read, also through `buffer`).
+
+    Reads which cannot be completed without waiting raise BlockingIOError, and consume nothing.
+    """
+
+    def __init__(self, fd):
+        os.set_blocking(fd, False)
+        self._fd = fd
+        self._data = bytearray()
+        self._eof = False
+
+    @property
+    def buffer(self):
+        return self
+
+    def fileno(self):
+        return self._fd
+
+    def close(self):
+        os.close(self._fd)
+
+    def _fill(self):
+        """
+        Reads some more data, and returns whether there was any (i.e., not the end of file).
+        """
+        if self._eof:
+            return False
+        data = os.read(self._fd, CHUNK_SIZE)
+        if not data:
+            self._eof = True
+            return False
+        self._data += data
+        return True
+
+    def read(self, size):
+        while len(self._data) < size and self._fill():
+            pass
+        data = bytes(self._data[:size])
+        del self._data[:size]
+        return data
+
+    def readline(self, size=-1):
+        start = 0
+        while True:
+            end = self._data.find(b"\n", start) + 1
+            if end:
+                break
+            if 0 <= size <= len(self._data):
+                end = size
+                break
+            start = len(self._data)
+            if not self._fill():
+                end = len(self._data)
+                break
+        if size >= 0:
+            end = min(end, size)
+        line = self._data[:end].decode()
+        del self._data[:end]
+        return line
+
+
+class NonBlockingWriter:
+    """
+    Writes to a non-blocking file descriptor, with the interface of the files used by the driver.
+
+    Writes never wait: the data which does not fit in the pipe is kept,
+    and written by the multiplexed server as soon as the pipe has room.
+    """
+
+    def __init__(self, fd):
+        os.set_blocking(fd, False)
+        self._fd = fd
+        self._pending = bytearray()
+        self._broken = False
+
+    @property
+    def buffer(self):
+        return self
+
+    def fileno(self):
+        return self._fd
+
+    def pending(self):
+        return bool(self._pending)
+
+    def close(self):
+        os.close(self._fd)
+
+    def write(self, data):
+        if self._broken:
+            raise BrokenPipeError
+        if isinstance(data, str):
+            self._pending += data.encode()
+        else:
+            self._pending += data
+        if len(self._pending) >= CHUNK_SIZE:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        """
+        Writes as much of the kept data as possible without waiting.
+        """
+        if self._broken:
+            raise BrokenPipeError
+        while self._pending:
+            try:
+                written = os.write(self._fd, self._pending)
+            except BlockingIOError:
+                return
+            except BrokenPipeError:
+                self._broken = True
+                self._pending.clear()
+                raise
+            del self._pending[:written]
+
+
+def make_nonblocking_connection(connection):
+    """
+    Returns a connection with the same process as the given one, whose reads and writes never wait.
+    """
+    if isinstance(connection.upward, io.StringIO):
+        # no process (see create_failed_connection)
+        return connection
+    if isinstance(connection.upward, SharedMemoryUpward):
+        # only the reads of the wake-ups may wait
+        os.set_blocking(connection.upward.fileno(), False)
+        return connection
+    return connection._replace(
+        downward=NonBlockingWriter(connection.downward.fileno()),
+        upward=NonBlockingReader(connection.upward.fileno()),
+    )
+
+
+class MultiplexedTask(namedtuple("MultiplexedTask", [
+    "coroutine",
+    "watchdog",
+    "writers",
+    "closing",
+    "done",
+])):
+    __slots__ = []
+
+    def pending_writers(self):
+        return [w for w in self.writers if w.pending()]
+
+
+class MultiplexedServer:
+    """
+    Runs the coroutines of many driver sessions (see turingarena.driver.server.DriverSession)
+    in a single thread, which waits for all the processes and clients at once with a selector.
+
+    Each coroutine yields the file it is waiting for, and is resumed when the file is readable,
+    or when the deadline of its watchdog expires (in which case the watchdog kills the process).
+    The output that does not fit in the pipes is written as they get room.
+
+    Blocking calls (yielded as BlockingCall, and the watchdog callbacks) are made by a pool of worker threads,
+    and the coroutine is resumed when they are done.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resumed = []
+        self._thread = None
+        self._workers = ThreadPoolExecutor(
+            max_workers=BLOCKING_CALL_WORKERS,
+            thread_name_prefix="driver-multiplexed-worker",
+        )
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+        os.set_blocking(self._wakeup_write, False)
+
+    def submit(self, coroutine, watchdog, writers, closing=()):
+        """
+        Starts running the given coroutine, whose non-blocking output files are in `writers`.
+        The files in `closing` are closed when the coroutine has terminated and its output is written,
+        then the returned event is set.
+        """
+        task = MultiplexedTask(
+            coroutine=coroutine,
+            watchdog=watchdog,
+            writers=tuple(w for w in writers if isinstance(w, NonBlockingWriter)),
+            closing=tuple(closing),
+            done=threading.Event(),
+        )
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="driver-multiplexed-server", daemon=True)
+                self._thread.start()
+        self._resume(task)
+        return task.done
+
+    def _resume(self, task):
+        # called by any thread
+        with self._lock:
+            self._resumed.append(task)
+        try:
+            os.write(self._wakeup_write, b"\0")
+        except BlockingIOError:
+            # the thread has wake-ups to read already
+            pass
+
+    def _call_in_worker(self, task, call):
+        def run():
+            call.run()
+            self._resume(task)
+
+        self._workers.submit(run)
+
+    def _run(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self._wakeup_read, selectors.EVENT_READ)
+        registered = {}  # file descriptor -> (events, task)
+
+        runnable = []
+        waiting = {}  # task -> file it is waiting for
+        terminated = []  # tasks whose output is still to be written
+        while True:
+            with self._lock:
+                runnable.extend(self._resumed)
+                self._resumed.clear()
+
+            for task in runnable:
+                try:
+                    waited = task.coroutine.send(None)
+                    if isinstance(waited, BlockingCall):
+                        self._call_in_worker(task, waited)
+                    else:
+                        waiting[task] = waited
+                except StopIteration:
+                    terminated.append(task)
+                except:
+                    logger.exception(f"driver session terminated with exception")
+                    terminated.append(task)
+            runnable.clear()
+
+            for task in list(terminated):
+                if not task.pending_writers():
+                    terminated.remove(task)
+                    self._finish(selector, registered, task)
+
+            wanted = {}
+            for task, waited in waiting.items():
+                wanted[waited.fileno()] = (selectors.EVENT_READ, task)
+            for task in [*waiting, *terminated]:
+                for w in task.pending_writers():
+                    wanted[w.fileno()] = (selectors.EVENT_WRITE, task)
+            self._update_registrations(selector, registered, wanted)
+
+            deadlines = [
+                task.watchdog.deadline
+                for task in waiting
+                if task.watchdog.deadline is not None
+            ]
+            timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+
+            for key, events in selector.select(timeout):
+                if key.fd == self._wakeup_read:
+                    self._drain_wakeups()
+                    continue
+                _, task = key.data
+                if events & selectors.EVENT_WRITE:
+                    self._flush_writer(task, key.fd)
+                if events & selectors.EVENT_READ:
+                    waited = waiting.get(task)
+                    if waited is not None and waited.fileno() == key.fd:
+                        del waiting[task]
+                        runnable.append(task)
+                    else:
+                        # not waited for now, registered again when it is
+                        selector.unregister(key.fd)
+                        del registered[key.fd]
+
+            now = time.monotonic()
+            for task in list(waiting):
+                deadline = task.watchdog.deadline
+                if deadline is not None and deadline <= now:
+                    del waiting[task]
+                    self._call_in_worker(task, BlockingCall(task.watchdog.expire))
+
+    def _drain_wakeups(self):
+        try:
+            while os.read(self._wakeup_read, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _flush_writer(self, task, fd):
+        for w in task.writers:
+            if w.fileno() == fd:
+                try:
+                    w.flush()
+                except BrokenPipeError:
+                    # reported to the session by its next write, if any
+                    pass
+
+    def _update_registrations(self, selector, registered, wanted):
+        # the files which are read stay registered, since a session usually waits alternately
+        # for the process and the client, and only one of them sends data at a time
+        for fd, (events, task) in list(registered.items()):
+            if fd not in wanted and events == selectors.EVENT_WRITE:
+                selector.unregister(fd)
+                del registered[fd]
+        for fd, data in wanted.items():
+            if fd not in registered:
+                selector.register(fd, data[0], data)
+            elif registered[fd] != data:
+                selector.modify(fd, data[0], data)
+            registered[fd] = data
+
+    def _finish(self, selector, registered, task):
+        # file descriptors are unregistered before they are closed, and possibly reused
+        for fd, (events, owner) in list(registered.items()):
+            if owner is task:
+                selector.unregister(fd)
+                del registered[fd]
+        for file in task.closing:
+            file.close()
+        task.done.set()
+
+
+_multiplexed_server = None
+_multiplexed_server_lock = threading.Lock()
+
+
+def get_multiplexed_server():
+    global _multiplexed_server
+    with _multiplexed_server_lock:
+        if _multiplexed_server is None:
+            _multiplexed_server = MultiplexedServer()
+        return _multiplexed_server
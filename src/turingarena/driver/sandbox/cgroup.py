@@ -0,0 +1,161 @@
+import logging
+import os
+import signal
+import tempfile
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+from turingarena.driver.sandbox.rlimits import DEFAULT_MEMORY_LIMIT
+
+DEFAULT_CGROUP_ROOT = "/sys/fs/cgroup/turingarena"
+CONTROLLERS = ("cpu", "memory", "pids")
+
+DEFAULT_PIDS_LIMIT = 128
+
+
+def get_cgroup_root():
+    """
+    Returns the cgroup v2 directory where a leaf cgroup is created for each sandbox,
+    or None if cgroups cannot be used, in which case processes are only limited with rlimits.
+
+    The directory is given by TURINGARENA_CGROUP_ROOT (set it to an empty string to disable cgroups),
+    and must be delegated to the user running the driver.
+    """
+    root = os.environ.get("TURINGARENA_CGROUP_ROOT", DEFAULT_CGROUP_ROOT)
+    if not root:
+        return None
+    return _prepare_cgroup_root(root)
+
+
+def create_sandbox_cgroup():
+    """
+    Creates a cgroup for a new sandboxed process, or returns None if cgroups are not available.
+    """
+    root = get_cgroup_root()
+    if root is None:
+        return None
+    return Cgroup.create(root, memory_limit=DEFAULT_MEMORY_LIMIT)
+
+
+@lru_cache()
+def _prepare_cgroup_root(root):
+    try:
+        if not os.path.exists(root) and os.path.exists(os.path.join(os.path.dirname(root), "cgroup.controllers")):
+            os.mkdir(root)
+        with open(os.path.join(root, "cgroup.controllers")) as f:
+            available = f.read().split()
+        missing = [c for c in CONTROLLERS if c not in available]
+        if missing:
+            logging.debug(f"cgroup {root} lacks controllers {missing}, not using cgroups")
+            return None
+        with open(os.path.join(root, "cgroup.subtree_control"), "w") as f:
+            f.write(" ".join(f"+{c}" for c in CONTROLLERS))
+    except OSError as e:
+        logging.debug(f"cannot use cgroup {root}: {e}")
+        return None
+    return root
+
+
+class Cgroup(namedtuple("Cgroup", ["path"])):
+    __slots__ = []
+
+    @classmethod
+    def create(cls, root, *, memory_limit, pids_limit=DEFAULT_PIDS_LIMIT):
+        cgroup = cls(tempfile.mkdtemp(prefix="sandbox-", dir=root))
+        cgroup.write("memory.max", memory_limit)
+        cgroup.write("memory.swap.max", 0)
+        cgroup.write("pids.max", pids_limit)
+        return cgroup
+
+    def file_path(self, name):
+        return os.path.join(self.path, name)
+
+    def read(self, name):
+        with open(self.file_path(name)) as f:
+            return f.read()
+
+    def write(self, name, value):
+        with open(self.file_path(name), "w") as f:
+            f.write(str(value))
+
+    def read_keys(self, name):
+        return {
+            key: int(value)
+            for key, value in (line.split() for line in self.read(name).splitlines())
+        }
+
+    def enter(self):
+        """
+        Moves the calling process into this cgroup.
+        To be called in the child process, before exec.
+        """
+        self.write("cgroup.procs", 0)
+
+    def cpu_time(self):
+        # user and system time of all the processes ever in this cgroup
+        return self.read_keys("cpu.stat")["usage_usec"] / 1e6
+
+    def current_memory(self):
+        return int(self.read("memory.current"))
+
+    def oom_killed(self):
+        return self.read_keys("memory.events")["oom_kill"] > 0
+
+    def kill(self):
+        try:
+            self.write("cgroup.kill", 1)
+        except FileNotFoundError:
+            # cgroup.kill requires Linux 5.14
+            for pid in self.read("cgroup.procs").split():
+                os.kill(int(pid), signal.SIGKILL)
+
+    def populated(self):
+        return self.read_keys("cgroup.events")["populated"] > 0
+
+    def remove(self, timeout=1.0):
+        # killed processes leave the cgroup asynchronously
+        deadline = time.monotonic() + timeout
+        while self.populated() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        try:
+            os.rmdir(self.path)
+        except OSError as e:
+            logging.warning(f"cannot remove cgroup {self.path}: {e}")
+
+
+class PeakMemoryReader:
+    """
+    Reads memory.peak of a cgroup, resetting it after each read,
+    so that each read gives the peak since the previous one.
+
+    Resetting requires Linux 6.12, otherwise `resettable` is False,
+    and the peak is the one since the creation of the cgroup.
+    memory.peak requires Linux 5.19, otherwise `fd` is None, and nothing can be read.
+    """
+
+    def __init__(self, cgroup):
+        path = cgroup.file_path("memory.peak")
+        self.resettable = True
+        try:
+            self.fd = os.open(path, os.O_RDWR)
+        except FileNotFoundError:
+            self.fd = None
+            self.resettable = False
+        except OSError:
+            # read-only before Linux 6.12
+            self.fd = os.open(path, os.O_RDONLY)
+            self.resettable = False
+
+    def read_and_reset(self):
+        peak = int(os.pread(self.fd, 64, 0))
+        if self.resettable:
+            try:
+                os.write(self.fd, b"reset")
+            except OSError:
+                self.resettable = False
+        return peak
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
@@ -1,6 +1,8 @@
 import io
+import os
 from abc import abstractmethod
 from collections import namedtuple
+from enum import Enum
 
 from turingarena.driver.client.processinfo import SandboxProcessInfo
 
@@ -11,14 +13,47 @@ SandboxProcessConnection = namedtuple("SandboxProcessConnection", [
 ])
 
 
+class ResourceAccounting(Enum):
+    # read the counters of the process while it keeps running
+    PROC = "proc"
+    # stop the process and collect its usage with wait4, at every report
+    STOP = "stop"
+
+    @classmethod
+    def default(cls):
+        return cls(os.environ.get("TURINGARENA_DRIVER_RESOURCE_ACCOUNTING", cls.PROC.value))
+
+
+class SandboxTransport(Enum):
+    # values as text through stdin and stdout
+    PIPE = "pipe"
+    # values as integers through shared memory (see turingarena.driver.sandbox.shm),
+    # only for the languages whose skeletons support it
+    SHARED_MEMORY = "shm"
+
+    @classmethod
+    def default(cls):
+        return cls(os.environ.get("TURINGARENA_SANDBOX_TRANSPORT", cls.PIPE.value))
+
+
 class ProcessManager:
     def get_status(self, kill_reason=None) -> SandboxProcessInfo:
         return self._do_get_status(kill_reason)
 
+    def get_resource_usage(self) -> SandboxProcessInfo:
+        """
+        Measures the resources used so far, to be reported while the process is running.
+        Unlike get_status, it should be cheap, as it is called after every call and checkpoint.
+        """
+        return self._do_get_resource_usage()
+
     @abstractmethod
     def _do_get_status(self, kill_reason):
         pass
 
+    def _do_get_resource_usage(self):
+        return self.get_status()
+
 
 class FailedProcessManager(ProcessManager):
     def __init__(self, reason):
@@ -1,33 +1,140 @@
 import logging
 import os
+import platform
+import resource
 import signal
 import subprocess
+import threading
 import time
+from functools import partial
 
 from turingarena.driver.client.processinfo import SandboxProcessInfo
-from turingarena.driver.sandbox.connection import SandboxProcessConnection, ProcessManager
+from turingarena.driver.sandbox.cgroup import PeakMemoryReader, create_sandbox_cgroup
+from turingarena.driver.sandbox.connection import SandboxProcessConnection, ProcessManager, ResourceAccounting, \
+    SandboxTransport
+from turingarena.driver.sandbox.seccomp import get_seccomp_program
+from turingarena.driver.sandbox.shm import SHM_FD_VARIABLE, SharedMemory, SharedMemoryDownward, SharedMemoryUpward
 
+# see clock_getcpuclockid(3) and CPUCLOCK_SCHED in linux/posix-timers.h
+CPUCLOCK_SCHED = 2
 
-def create_popen_process_connection(*args, **kwargs):
-    p = subprocess.Popen(
+
+def create_popen_process_connection(
         *args,
+        preexec_fn=None,
+        seccomp_filter=None,
+        transport=SandboxTransport.PIPE,
         **kwargs,
-        universal_newlines=True,
-        stdin=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        bufsize=1,
-    )
+):
+    """
+    Starts a process with the given Popen arguments.
+
+    Functions to run in the child before exec are, in order:
+    the given preexec_fn, moving to a cgroup (if cgroups are available),
+    and loading the given seccomp filter (if any), which is compiled only once.
+
+    With the shared memory transport, the process inherits the file descriptor of the memory,
+    whose number is in the environment variable TURINGARENA_SHM_FD.
+    """
+
+    preexec_steps = []
+    if preexec_fn is not None:
+        preexec_steps.append(preexec_fn)
+
+    cgroup = create_sandbox_cgroup()
+    if cgroup is not None:
+        preexec_steps.append(partial(_enter_cgroup, cgroup))
+
+    if seccomp_filter is not None:
+        program = get_seccomp_program(seccomp_filter)
+        if program is None:
+            raise NotImplementedError(f"seccomp filters not supported on {platform.machine()}")
+        preexec_steps.append(program.load)
+
+    if preexec_steps:
+        preexec_fn = partial(_run_preexec_steps, preexec_steps)
+
+    shared_memory = None
+    if transport is SandboxTransport.SHARED_MEMORY:
+        shared_memory = SharedMemory()
+        kwargs["pass_fds"] = (*kwargs.get("pass_fds", ()), shared_memory.fd)
+        kwargs["env"] = {
+            **kwargs.get("env", os.environ),
+            SHM_FD_VARIABLE: str(shared_memory.fd),
+        }
+
+    try:
+        p = subprocess.Popen(
+            *args,
+            **kwargs,
+            preexec_fn=preexec_fn,
+            universal_newlines=True,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            bufsize=1,
+        )
+    except:
+        if cgroup is not None:
+            cgroup.remove()
+        raise
+    finally:
+        if shared_memory is not None:
+            shared_memory.close_fd()
+
+    if shared_memory is None:
+        downward, upward = p.stdin, p.stdout
+    else:
+        # stdin and stdout only carry the wake-ups
+        downward = SharedMemoryDownward(shared_memory.downward_ring, p.stdin.fileno())
+        upward = SharedMemoryUpward(shared_memory.upward_ring, p.stdout.fileno())
+
     return SandboxProcessConnection(
-        downward=p.stdin,
-        upward=p.stdout,
-        manager=PopenProcessManager(p),
+        downward=downward,
+        upward=upward,
+        manager=create_process_manager(p, cgroup),
     )
 
 
+def create_process_manager(os_process, cgroup, wait4=os.wait4):
+    """
+    Creates the manager of a process, which is in the given cgroup (if not None),
+    and whose status changes can be waited with the given replacement of os.wait4.
+    """
+    if cgroup is None:
+        return PopenProcessManager(os_process, wait4=wait4)
+
+    try:
+        return CgroupProcessManager(os_process, cgroup, wait4=wait4)
+    except:
+        # the process is already running, possibly not yet in the cgroup
+        os.kill(os_process.pid, signal.SIGKILL)
+        wait4(os_process.pid, 0)
+        cgroup.kill()
+        cgroup.remove()
+        raise
+
+
+def _run_preexec_steps(steps):
+    for step in steps:
+        step()
+
+
+def _enter_cgroup(cgroup):
+    # memory is limited by the cgroup, which (unlike RLIMIT_AS) does not count reserved address space
+    resource.setrlimit(resource.RLIMIT_AS, (resource.RLIM_INFINITY, resource.RLIM_INFINITY))
+    cgroup.enter()
+
+
 class PopenProcessManager(ProcessManager):
-    def __init__(self, os_process):
+    def __init__(self, os_process, accounting=None, wait4=os.wait4):
+        if accounting is None:
+            accounting = ResourceAccounting.default()
         self.os_process = os_process
+        self.accounting = accounting
+        self.wait4 = wait4
         self.termination_info = None
+        # the watchdog may kill the process while the driver is getting its status
+        self._status_lock = threading.RLock()
 
     def get_connection(self):
         return
@@ -75,7 +182,11 @@ class PopenProcessManager(ProcessManager):
         timeout = 0.5
         trials = 10
         for trial in range(trials):
-            status = self._read_proc_stat()[2]
+            try:
+                status = self._read_proc_stat()[2]
+            except FileNotFoundError:
+                # already terminated and waited for, e.g., by a zygote
+                break
             if status in ("S", "Z"):
                 break
             time.sleep(timeout / trials)
@@ -89,6 +200,30 @@ class PopenProcessManager(ProcessManager):
 
         return rss
 
+    def _read_proc_status(self):
+        fields = {}
+        with open(f"/proc/{self.os_process.pid}/status") as f:
+            for line in f:
+                key, value = line.split(":", maxsplit=1)
+                fields[key] = value.split()
+        return fields
+
+    def _read_cpu_time(self):
+        # CPU time of all the threads of the process, with nanosecond precision
+        clock_id = (~self.os_process.pid << 3) | CPUCLOCK_SCHED
+        return time.clock_gettime(clock_id)
+
+    def _read_memory_usage(self):
+        """
+        Returns the peak memory usage since the previous call, and the current one.
+        """
+        fields = self._read_proc_status()
+        # see man 5 proc, values are in kB
+        maxrss = int(fields["VmHWM"][0]) * 1024
+        rss = int(fields["VmRSS"][0]) * 1024
+        self._reset_maxrss()
+        return maxrss, rss
+
     def _reset_maxrss(self):
         fd = os.open(f"/proc/{self.os_process.pid}/clear_refs", os.O_WRONLY)
         try:
@@ -96,7 +231,35 @@ class PopenProcessManager(ProcessManager):
         finally:
             os.close(fd)
 
+    def _do_get_resource_usage(self):
+        if self.accounting is ResourceAccounting.STOP:
+            return self.get_status()
+
+        # the process is not reaped (and its PID reused) by the watchdog while reading its statistics
+        with self._status_lock:
+            if self.termination_info is not None:
+                return self.termination_info
+
+            try:
+                time_usage = self._read_cpu_time()
+                maxrss, rss = self._read_memory_usage()
+            except (OSError, KeyError):
+                # the process has terminated (zombies have no memory statistics),
+                # get its status the usual way
+                return self.get_status()
+
+        return SandboxProcessInfo(
+            peak_memory_usage=maxrss,
+            current_memory_usage=rss,
+            time_usage=time_usage,
+            error=f"running normally",
+        )
+
     def _do_get_status(self, kill_reason):
+        with self._status_lock:
+            return self._do_get_status_locked(kill_reason)
+
+    def _do_get_status_locked(self, kill_reason):
         # if the process is already terminated, return the cached info
         if self.termination_info is not None:
             return self.termination_info
@@ -104,10 +267,14 @@ class PopenProcessManager(ProcessManager):
         self._wait_for_interruptible()
 
         # first send SIGSTOP to stop the process
-        self.os_process.send_signal(signal.SIGSTOP)
+        try:
+            os.kill(self.os_process.pid, signal.SIGSTOP)
+        except ProcessLookupError:
+            # already terminated, wait will report it
+            pass
 
         # then, use wait to get rusage struct (see man getrusage(2))
-        _, exit_status, rusage = os.wait4(self.os_process.pid, os.WUNTRACED)
+        _, exit_status, rusage = self.wait4(self.os_process.pid, os.WUNTRACED)
 
         maxrss = rusage.ru_maxrss * 1024
 
@@ -130,20 +297,68 @@ class PopenProcessManager(ProcessManager):
         info = SandboxProcessInfo(
             peak_memory_usage=maxrss,
             current_memory_usage=rss,
-            time_usage=rusage.ru_utime,
+            # same as _read_cpu_time, which counts both user and system time
+            time_usage=rusage.ru_utime + rusage.ru_stime,
             error=error,
         )
 
         if running:
             if kill_reason is not None:
                 logging.debug(f"killing process because {kill_reason}")
-                self.os_process.send_signal(signal.SIGKILL)
-                os.wait4(self.os_process.pid, 0)
+                os.kill(self.os_process.pid, signal.SIGKILL)
+                self.wait4(self.os_process.pid, 0)
                 self.termination_info = info
             else:
                 # if process is not terminated, restart it with a SIGCONT
-                self.os_process.send_signal(signal.SIGCONT)
+                os.kill(self.os_process.pid, signal.SIGCONT)
         else:
             self.termination_info = info
 
         return info
+
+
+class CgroupProcessManager(PopenProcessManager):
+    """
+    Manages a process running in its own cgroup,
+    which accounts for the time and memory of all its threads and children, and enforces limits.
+    """
+
+    def __init__(self, os_process, cgroup, wait4=os.wait4):
+        super().__init__(os_process, accounting=ResourceAccounting.PROC, wait4=wait4)
+        self.cgroup = cgroup
+        self.peak_memory_reader = PeakMemoryReader(cgroup)
+
+    def _read_cpu_time(self):
+        return self.cgroup.cpu_time()
+
+    def _read_memory_usage(self):
+        if not self.peak_memory_reader.resettable:
+            return super()._read_memory_usage()
+        return self.peak_memory_reader.read_and_reset(), self.cgroup.current_memory()
+
+    def _do_get_status(self, kill_reason):
+        if self.termination_info is not None:
+            return self.termination_info
+
+        info = super()._do_get_status(kill_reason)
+        if self.termination_info is None:
+            return info
+
+        # the process is terminated, but it may have left children behind
+        self.cgroup.kill()
+
+        error = info.error
+        if self.cgroup.oom_killed():
+            error += ", memory limit exceeded"
+
+        if self.peak_memory_reader.fd is not None:
+            info = info._replace(peak_memory_usage=self.peak_memory_reader.read_and_reset())
+
+        self.termination_info = info._replace(
+            time_usage=self.cgroup.cpu_time(),
+            error=error,
+        )
+
+        self.peak_memory_reader.close()
+        self.cgroup.remove()
+        return self.termination_info
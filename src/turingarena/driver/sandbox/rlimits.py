@@ -1,8 +1,10 @@
 import resource
 
+DEFAULT_MEMORY_LIMIT = 256 * 1024 * 1024
+
 
 def set_rlimits(
-        memory_limit=256 * 1024 * 1024,
+        memory_limit=DEFAULT_MEMORY_LIMIT,
 ):
     resource.setrlimit(
         resource.RLIMIT_CORE,
@@ -1,8 +1,10 @@
 from abc import abstractmethod
 from collections import namedtuple
+from contextlib import contextmanager
+from subprocess import CalledProcessError
 from typing import ContextManager
 
-from turingarena.driver.sandbox.connection import SandboxProcessConnection
+from turingarena.driver.sandbox.connection import SandboxProcessConnection, create_failed_connection
 
 
 class ProgramRunner(namedtuple("ProgramRunner", [
@@ -13,6 +15,30 @@ class ProgramRunner(namedtuple("ProgramRunner", [
 ])):
     __slots__ = []
 
+    @property
+    def build_options(self):
+        """
+        Options (other than source and interface) which affect the result of compile().
+        """
+        return ()
+
+    def compile(self):
+        """
+        Prepares everything needed to run the program in temp_dir.
+
+        Raises CalledProcessError if the compilation fails.
+        Once compiled, temp_dir is never modified, so it can be reused by many runs.
+        """
+
     @abstractmethod
-    def run_in_process(self) -> ContextManager[SandboxProcessConnection]:
+    def start(self) -> SandboxProcessConnection:
         pass
+
+    @contextmanager
+    def run_in_process(self) -> ContextManager[SandboxProcessConnection]:
+        try:
+            self.compile()
+        except CalledProcessError:
+            yield create_failed_connection("Compilation failed.")
+        else:
+            yield self.start()
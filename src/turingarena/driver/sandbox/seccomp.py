@@ -0,0 +1,178 @@
+import ctypes
+import platform
+import struct
+from collections import namedtuple
+from functools import lru_cache
+
+# see linux/seccomp.h
+KILL = 0x00000000
+TRAP = 0x00030000
+ALLOW = 0x7fff0000
+
+
+def ERRNO(errno):
+    return 0x00050000 | errno
+
+
+SeccompRule = namedtuple("SeccompRule", ["action", "syscall", "args"])
+
+# the syscall argument `index` must be equal to `value`
+Arg = namedtuple("Arg", ["index", "value"])
+
+SeccompFilter = namedtuple("SeccompFilter", ["default_action", "rules"])
+
+Architecture = namedtuple("Architecture", ["audit_arch", "syscalls", "max_syscall"])
+
+ARCHITECTURES = {
+    "x86_64": Architecture(
+        audit_arch=0xc000003e,
+        # x32 syscalls have the same audit arch, and numbers starting from 0x40000000
+        max_syscall=0x40000000,
+        syscalls=dict(
+            read=0,
+            write=1,
+            close=3,
+            fstat=5,
+            lseek=8,
+            mmap=9,
+            mprotect=10,
+            munmap=11,
+            brk=12,
+            rt_sigreturn=15,
+            ioctl=16,
+            readv=19,
+            writev=20,
+            access=21,
+            mremap=25,
+            madvise=28,
+            execve=59,
+            exit=60,
+            uname=63,
+            readlink=89,
+            arch_prctl=158,
+            time=201,
+            futex=202,
+            set_tid_address=218,
+            exit_group=231,
+            newfstatat=262,
+            readlinkat=267,
+            set_robust_list=273,
+            prlimit64=302,
+            getrandom=318,
+            rseq=334,
+            close_range=436,
+        ),
+    ),
+}
+
+# see linux/filter.h and linux/bpf_common.h
+BPF_LD_W_ABS = 0x20
+BPF_JMP_JEQ_K = 0x15
+BPF_JMP_JGE_K = 0x35
+BPF_RET_K = 0x06
+
+# offsets in struct seccomp_data
+NR_OFFSET = 0
+ARCH_OFFSET = 4
+ARGS_OFFSET = 16
+
+
+def _statement(code, k):
+    return code, 0, 0, k
+
+
+def _jump(code, k, jt, jf):
+    return code, jt, jf, k
+
+
+def _compile_rule(rule, number):
+    checks = []
+    for arg in rule.args:
+        # arguments are 64-bit, and BPF words 32-bit (little endian)
+        offset = ARGS_OFFSET + 8 * arg.index
+        checks.append((offset, arg.value & 0xffffffff))
+        checks.append((offset + 4, arg.value >> 32))
+
+    # each check is two instructions, then there is the return and, if needed, the reload of the number
+    body_size = 2 * len(checks) + 1 + bool(checks)
+
+    instructions = [_jump(BPF_JMP_JEQ_K, number, 0, body_size)]
+    for i, (offset, value) in enumerate(checks):
+        # on mismatch, jump to the reload
+        remaining = 2 * (len(checks) - i) - 2 + 1
+        instructions.append(_statement(BPF_LD_W_ABS, offset))
+        instructions.append(_jump(BPF_JMP_JEQ_K, value, 0, remaining))
+    instructions.append(_statement(BPF_RET_K, rule.action))
+    if checks:
+        instructions.append(_statement(BPF_LD_W_ABS, NR_OFFSET))
+    return instructions
+
+
+def compile_filter(seccomp_filter, architecture):
+    instructions = [
+        _statement(BPF_LD_W_ABS, ARCH_OFFSET),
+        _jump(BPF_JMP_JEQ_K, architecture.audit_arch, 1, 0),
+        _statement(BPF_RET_K, KILL),
+        _statement(BPF_LD_W_ABS, NR_OFFSET),
+        _jump(BPF_JMP_JGE_K, architecture.max_syscall, 0, 1),
+        _statement(BPF_RET_K, KILL),
+    ]
+    for rule in seccomp_filter.rules:
+        instructions.extend(_compile_rule(rule, architecture.syscalls[rule.syscall]))
+    instructions.append(_statement(BPF_RET_K, seccomp_filter.default_action))
+    return instructions
+
+
+class _SockFprog(ctypes.Structure):
+    _fields_ = [
+        ("len", ctypes.c_ushort),
+        ("filter", ctypes.c_void_p),
+    ]
+
+
+PR_SET_NO_NEW_PRIVS = 38
+PR_SET_SECCOMP = 22
+SECCOMP_MODE_FILTER = 2
+
+
+class SeccompProgram:
+    """
+    A filter compiled to BPF, ready to be loaded in the current process.
+
+    The filter is compiled once in the driver, then loaded in the forked child before exec,
+    so no interpreter has to be started just to install it.
+    Loading only makes two prctl calls, so it is safe to do in a preexec_fn.
+    """
+
+    def __init__(self, instructions):
+        self._code = ctypes.create_string_buffer(b"".join(
+            struct.pack("HBBI", *instruction)
+            for instruction in instructions
+        ))
+        self._prog = _SockFprog(len(instructions), ctypes.addressof(self._code))
+        self._prog_address = ctypes.addressof(self._prog)
+
+        self._prctl = ctypes.CDLL(None, use_errno=True).prctl
+        self._prctl.argtypes = [ctypes.c_int, ctypes.c_ulong, ctypes.c_ulong, ctypes.c_ulong, ctypes.c_ulong]
+
+    def load(self):
+        if self._prctl(PR_SET_NO_NEW_PRIVS, 1, 0, 0, 0) != 0:
+            raise OSError(ctypes.get_errno(), "cannot set no_new_privs")
+        if self._prctl(PR_SET_SECCOMP, SECCOMP_MODE_FILTER, self._prog_address, 0, 0) != 0:
+            raise OSError(ctypes.get_errno(), "cannot load seccomp filter")
+
+
+def get_architecture():
+    return ARCHITECTURES.get(platform.machine())
+
+
+@lru_cache()
+def get_seccomp_program(seccomp_filter):
+    """
+    Returns the compiled filter, compiling it only the first time,
+    or None if the architecture is not supported.
+    """
+    architecture = get_architecture()
+    if architecture is None:
+        return None
+    return SeccompProgram(compile_filter(seccomp_filter, architecture))
@@ -0,0 +1,181 @@
+import mmap
+import os
+import select
+import time
+from array import array
+
+# layout of the shared memory, which must match the skeletons (see CppCodeGen.generate_io_functions):
+# one ring for each direction (downward first), each made of a header with the head and tail counters
+# (on separate cache lines) followed by the values, as 64-bit integers
+RING_SIZE = 1 << 20
+RING_HEADER_SIZE = 128
+HEAD = 0
+TAIL = 8
+
+# environment variable with the file descriptor of the shared memory, in the sandboxed process
+SHM_FD_VARIABLE = "TURINGARENA_SHM_FD"
+
+# how long to sleep while waiting for the process to make room in a full ring
+SPIN_INTERVAL = 0.0001
+
+
+class Ring:
+    """
+    A single-producer, single-consumer queue of 64-bit integers in shared memory.
+
+    The writer publishes how many values it has written so far in the head counter,
+    and the reader how many it has read in the tail counter.
+    Each side keeps its own counter in `position`.
+    """
+
+    def __init__(self, buffer):
+        self._header = buffer[:RING_HEADER_SIZE].cast("q")
+        self._data = buffer[RING_HEADER_SIZE:].cast("q")
+        self.capacity = len(self._data)
+        self.position = 0
+
+    def free_space(self):
+        return self.capacity - (self.position - self._header[TAIL])
+
+    def available(self):
+        return self._header[HEAD] - self.position
+
+    def put(self, values):
+        """
+        Writes as many of the given values (an array of type "q") as fit, and returns how many.
+        """
+        start = self.position % self.capacity
+        count = min(self.free_space(), len(values), self.capacity - start)
+        self._data[start:start + count] = values[:count]
+        self.position += count
+        self._header[HEAD] = self.position
+        return count
+
+    def peek(self):
+        """
+        Returns the next value, which must be available, without reading it.
+        """
+        return self._data[self.position % self.capacity]
+
+    def get(self, count):
+        """
+        Reads the given number of values, which must be available.
+        """
+        start = self.position % self.capacity
+        end = start + count
+        if end <= self.capacity:
+            values = self._data[start:end].tolist()
+        else:
+            values = self._data[start:].tolist() + self._data[:end - self.capacity].tolist()
+        self.position += count
+        self._header[TAIL] = self.position
+        return values
+
+
+class SharedMemoryDownward:
+    """
+    Writes the text sent to the process (as by `print`) as integers in the downward ring.
+
+    Every write which completes a line also writes a byte in the stdin of the process,
+    which waits on it when the ring is empty.
+    """
+
+    def __init__(self, ring, doorbell_fd):
+        self._ring = ring
+        self._doorbell_fd = doorbell_fd
+        self._pending = ""
+
+        # if the pipe is full, the process has many wake-ups still to read
+        os.set_blocking(doorbell_fd, False)
+
+    def write(self, text):
+        line = self._pending + text
+        # a number may be split among writes
+        end = max(line.rfind(" "), line.rfind("\n")) + 1
+        self._pending = line[end:]
+
+        values = array("q", map(int, line[:end].split()))
+        while values:
+            count = self._ring.put(values)
+            if not count:
+                self._wait_for_space()
+            values = values[count:]
+
+        if "\n" in text:
+            self._ring_doorbell()
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def _ring_doorbell(self):
+        try:
+            os.write(self._doorbell_fd, b"\0")
+        except BlockingIOError:
+            pass
+
+    def _wait_for_space(self):
+        self._ring_doorbell()
+        poll = select.poll()
+        poll.register(self._doorbell_fd, 0)
+        if poll.poll(0):
+            # the process closed stdin, e.g., it terminated
+            raise BrokenPipeError
+        time.sleep(SPIN_INTERVAL)
+
+
+class SharedMemoryUpward:
+    """
+    Reads the records sent by the process in the upward ring, returning them as lines of text.
+
+    Each record is its number of values followed by the values.
+    The process writes a byte in its stdout when it flushes, which is waited on when the ring is empty.
+    """
+
+    def __init__(self, ring, doorbell_fd):
+        self._ring = ring
+        self._doorbell_fd = doorbell_fd
+
+    def fileno(self):
+        return self._doorbell_fd
+
+    def readline(self, size):
+        # if the doorbell is non-blocking, reading it may raise BlockingIOError:
+        # nothing is read from the ring until the whole record is available, so that readline can be retried
+        if not self._wait_for(1):
+            return ""
+        length = self._ring.peek()
+        if not 0 <= length < size:
+            self._ring.get(1)
+            return "invalid record\n"
+        if not self._wait_for(1 + length):
+            return ""
+        [_, *values] = self._ring.get(1 + length)
+        line = " ".join(map(str, values)) + "\n"
+        return line[:size]
+
+    def _wait_for(self, count):
+        while self._ring.available() < count:
+            if not os.read(self._doorbell_fd, 4096):
+                # no more wake-ups: the process has terminated, possibly after writing the values
+                return self._ring.available() >= count
+        return True
+
+
+class SharedMemory:
+    """
+    The shared memory of a process, with a ring for each direction.
+    """
+
+    def __init__(self):
+        self.fd = os.memfd_create("turingarena")
+        os.ftruncate(self.fd, 2 * RING_SIZE)
+        buffer = memoryview(mmap.mmap(self.fd, 2 * RING_SIZE))
+        self.downward_ring = Ring(buffer[:RING_SIZE])
+        self.upward_ring = Ring(buffer[RING_SIZE:])
+
+    def close_fd(self):
+        """
+        Closes the file descriptor, once it is inherited by the process (the memory stays mapped).
+        """
+        os.close(self.fd)
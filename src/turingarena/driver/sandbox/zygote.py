@@ -0,0 +1,183 @@
+import atexit
+import json
+import os
+import select
+import socket
+import subprocess
+import threading
+from collections import namedtuple, OrderedDict
+
+from turingarena.driver.sandbox.cgroup import create_sandbox_cgroup
+from turingarena.driver.sandbox.connection import SandboxProcessConnection
+from turingarena.driver.sandbox.popen import create_process_manager
+from turingarena.driver.sandbox.rlimits import DEFAULT_MEMORY_LIMIT
+
+MAX_ZYGOTES = 8
+
+# how often to check that the zygote is still alive, while waiting for it
+POLL_INTERVAL = 1.0
+
+ZygoteRusage = namedtuple("ZygoteRusage", ["ru_utime", "ru_stime", "ru_maxrss"])
+
+
+class Zygote:
+    """
+    A process which forks sandboxed processes, so that they do not pay the startup of an interpreter.
+
+    The zygote is started with the given command line, followed by the file descriptor of a control socket,
+    where it sends a message as soon as it is ready to accept requests.
+    Each request on the socket is a JSON object, and carries stdin and stdout of the new process,
+    and a socket where the zygote sends the PID of the process and then its status changes,
+    since only the parent of a process can wait for it.
+    A terminated process is reaped (and its PID can be reused) only after its status is requested with wait4.
+    """
+
+    def __init__(self, cli):
+        self._control, zygote_control = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        with zygote_control:
+            self.os_process = subprocess.Popen(
+                [*cli, str(zygote_control.fileno())],
+                pass_fds=[zygote_control.fileno()],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+            )
+        self._lock = threading.Lock()
+
+        try:
+            self._receive(self._control)
+        except:
+            self.close()
+            raise
+
+    def is_alive(self):
+        return self.os_process.poll() is None
+
+    def spawn(self, request):
+        stdin_read, stdin_write = os.pipe()
+        stdout_read, stdout_write = os.pipe()
+        channel, zygote_channel = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+
+        try:
+            with self._lock:
+                socket.send_fds(
+                    self._control,
+                    [json.dumps(request).encode()],
+                    [stdin_read, stdout_write, zygote_channel.fileno()],
+                )
+            message = self._receive(channel)
+        except:
+            os.close(stdin_write)
+            os.close(stdout_read)
+            channel.close()
+            raise
+        finally:
+            os.close(stdin_read)
+            os.close(stdout_write)
+            zygote_channel.close()
+
+        return ZygoteProcess(
+            pid=int(message),
+            channel=channel,
+            stdin=open(stdin_write, "w", buffering=1),
+            stdout=open(stdout_read),
+        )
+
+    def _receive(self, sock):
+        # the zygote may die at any time (e.g., failing to start), without closing the socket for us,
+        # since the socket is kept alive by the file descriptors we sent and it never received
+        while not select.select([sock], [], [], POLL_INTERVAL)[0]:
+            if not self.is_alive():
+                raise ChildProcessError(f"zygote exited with code {self.os_process.returncode}")
+        message = sock.recv(64)
+        if not message:
+            raise ChildProcessError("zygote closed the connection")
+        return message
+
+    def close(self):
+        self._control.close()
+        self.os_process.wait()
+
+
+class ZygoteProcess:
+    def __init__(self, pid, channel, stdin, stdout):
+        self.pid = pid
+        self.channel = channel
+        self.stdin = stdin
+        self.stdout = stdout
+
+    def wait4(self, pid, options):
+        """
+        Same as os.wait4, for a process forked by the zygote.
+        """
+        assert pid == self.pid
+        while True:
+            message = self.channel.recv(256)
+            if not message:
+                raise ChildProcessError(f"lost status of process {pid}")
+            if message == b"exited":
+                # the PID is not used anymore, let the zygote reap the process and send its status
+                self.channel.send(b"reap")
+                continue
+            status, utime, stime, maxrss = message.split()
+            status = int(status)
+            if not os.WIFSTOPPED(status):
+                self.channel.close()
+            elif not options & os.WUNTRACED:
+                continue
+            return pid, status, ZygoteRusage(
+                ru_utime=float(utime),
+                ru_stime=float(stime),
+                ru_maxrss=int(maxrss),
+            )
+
+
+def create_zygote_process_connection(zygote, request):
+    cgroup = create_sandbox_cgroup()
+    if cgroup is None:
+        request = dict(request, cgroup_procs=None, memory_limit=DEFAULT_MEMORY_LIMIT)
+    else:
+        # memory is limited by the cgroup
+        request = dict(request, cgroup_procs=cgroup.file_path("cgroup.procs"), memory_limit=None)
+
+    try:
+        process = zygote.spawn(request)
+    except:
+        if cgroup is not None:
+            cgroup.remove()
+        raise
+
+    return SandboxProcessConnection(
+        downward=process.stdin,
+        upward=process.stdout,
+        manager=create_process_manager(process, cgroup, wait4=process.wait4),
+    )
+
+
+_zygotes = OrderedDict()
+_zygotes_lock = threading.Lock()
+
+
+def get_zygote(key, cli):
+    """
+    Returns a running zygote for the given key, starting it with the given command line if needed.
+    At most MAX_ZYGOTES are kept, closing the least recently used.
+    """
+    with _zygotes_lock:
+        zygote = _zygotes.pop(key, None)
+        if zygote is None or not zygote.is_alive():
+            zygote = Zygote(cli)
+        _zygotes[key] = zygote
+
+        while len(_zygotes) > MAX_ZYGOTES:
+            _, oldest = _zygotes.popitem(last=False)
+            oldest.close()
+
+    return zygote
+
+
+@atexit.register
+def close_zygotes():
+    with _zygotes_lock:
+        while _zygotes:
+            _, zygote = _zygotes.popitem()
+            zygote.close()
@@ -1,19 +1,30 @@
 import logging
+import os
 import sys
 from contextlib import ExitStack
-from tempfile import TemporaryDirectory
 
 from turingarena.logging_helper import init_logger
+from turingarena.driver.artifacts import compile_program
+from turingarena.driver.client.channel import accept_server_channel
 from turingarena.driver.client.commands import DriverState
 from turingarena.driver.client.connection import DriverProcessConnection
 from turingarena.driver.client.program import Program
 from turingarena.driver.compile.compile import load_interface
-from turingarena.driver.drive.comm import CommunicationError, DriverStop, InterfaceExitReached, SandboxTee
+from turingarena.driver.drive.comm import DEFAULT_UPWARD_TIMEOUT, CommunicationError, DriverStop, InterfaceExitReached, \
+    SandboxTee, run_blocking, wait_call
+from turingarena.driver.drive.context import Bindings
 from turingarena.driver.drive.execution import Executor
+from turingarena.driver.drive.plan import ExecutionMode, compile_execution_plan, run_execution_plan
+from turingarena.driver.drive.watchdog import PolledWatchdog, Watchdog
 from turingarena.driver.language import Language
+from turingarena.driver.multiplex import make_nonblocking_connection
+from turingarena.driver.sandbox.connection import ResourceAccounting, create_failed_connection
+from turingarena.evallib.metadata import load_metadata
 
 logger = logging.getLogger(__name__)
 
+KILL_REASON_END = "still running after communication end"
+
 
 def main():
     _, source_path, interface_path, downward_tee, upward_tee = sys.argv
@@ -26,58 +37,124 @@ def main():
     ), source_path, interface_path, downward_tee, upward_tee)
 
 
-def run_server(driver_connection, source_path, interface_path, downward_tee, upward_tee):
-    program = Program(source_path=source_path, interface_path=interface_path)
-    language = Language.from_source_path(program.source_path)
-    interface = load_interface(program.interface_path)
-
-    with ExitStack() as stack:
-        temp_dir = stack.enter_context(TemporaryDirectory())
-
-        runner = language.ProgramRunner(
-            program=program,
-            language=language,
-            interface=interface,
-            temp_dir=temp_dir,
-        )
-
-        connection = stack.enter_context(runner.run_in_process())
-
-        sandbox_tee = SandboxTee(
-            downward_tee=stack.enter_context(open(downward_tee, "w")),
-            upward_tee=stack.enter_context(open(upward_tee, "w")),
-        )
-
-        stack.callback(lambda: connection.manager.get_status(
-            kill_reason="still running after communication end",
-        ))
-
-        context = Executor(
-            bindings={},
-            phase=None,
-            process=connection.manager,
-            request_lookahead=None,
-            driver_connection=driver_connection,
-            sandbox_connection=connection,
-            sandbox_tee=sandbox_tee,
-        )
-
-        try:
+def load_upward_timeout(interface_path):
+    """
+    Reads the timeout for the process to send data from the Turingfile of the problem,
+    e.g., `upward_timeout = 10.0` in section `[driver]`.
+    """
+    metadata = load_metadata(os.path.dirname(os.path.abspath(interface_path)))
+    return float(metadata.get("driver", {}).get("upward_timeout", DEFAULT_UPWARD_TIMEOUT))
+
+
+def run_server(driver_connection, source_path, interface_path, downward_tee, upward_tee, execution_mode=None):
+    driver_channel = accept_server_channel(driver_connection)
+    session = DriverSession(driver_channel, source_path, interface_path, downward_tee, upward_tee, execution_mode)
+    run_blocking(session.run())
+
+
+class DriverSession:
+    """
+    Drives a single process on behalf of a driver client.
+
+    The program is compiled and started when the session is created,
+    then `run` returns a coroutine (see turingarena.driver.drive.comm.run_blocking)
+    which only waits for the process and the client.
+
+    A multiplexed session uses non-blocking files and a PolledWatchdog,
+    so that its coroutine can be run by the multiplexed server (see turingarena.driver.multiplex).
+    Its resource usage is measured by the coroutine itself, so it cannot stop the process (see ResourceAccounting).
+    """
+
+    def __init__(self, driver_channel, source_path, interface_path, downward_tee, upward_tee, execution_mode=None,
+                 multiplexed=False):
+        if execution_mode is None:
+            execution_mode = ExecutionMode.default()
+        if multiplexed:
+            # the interpreter cannot be suspended
+            execution_mode = ExecutionMode.PLAN
+            if ResourceAccounting.default() is ResourceAccounting.STOP:
+                raise ValueError("the multiplexed driver server does not support stop resource accounting")
+
+        program = Program(source_path=source_path, interface_path=interface_path)
+        language = Language.from_source_path(program.source_path)
+        self.interface = load_interface(program.interface_path)
+        self.execution_mode = execution_mode
+        self.driver_channel = driver_channel
+
+        artifact_dir = compile_program(program, language, self.interface)
+
+        with ExitStack() as stack:
+            if artifact_dir is None:
+                connection = create_failed_connection("Compilation failed.")
+            else:
+                connection = language.ProgramRunner(
+                    program=program,
+                    language=language,
+                    interface=self.interface,
+                    temp_dir=artifact_dir,
+                ).start()
+
+            timeout = load_upward_timeout(interface_path)
+            if multiplexed:
+                connection = make_nonblocking_connection(connection)
+                self.watchdog = PolledWatchdog(timeout=timeout)
+            else:
+                self.watchdog = Watchdog(timeout=timeout)
+            stack.callback(self.watchdog.close)
+
+            sandbox_tee = SandboxTee(
+                downward_tee=stack.enter_context(open(downward_tee, "w")),
+                upward_tee=stack.enter_context(open(upward_tee, "w")),
+            )
+
+            # usually done by run, without blocking
+            stack.callback(lambda: connection.manager.get_status(
+                kill_reason=KILL_REASON_END,
+            ))
+
+            self.context = Executor(
+                bindings=Bindings(),
+                phase=None,
+                process=connection.manager,
+                request_lookahead=None,
+                driver_channel=driver_channel,
+                sandbox_connection=connection,
+                sandbox_tee=sandbox_tee,
+                watchdog=self.watchdog,
+            )
+
+            # released by run
+            self._stack = stack.pop_all()
+
+    @property
+    def sandbox_downward(self):
+        return self.context.sandbox_connection.downward
+
+    def run(self):
+        context = self.context
+        with self._stack:
             try:
-                context.execute(interface)
-            except InterfaceExitReached:
-                pass
-            context.report_ready()
-            request = context.next_request()
-            assert False, f"driver was not explicitly stopped, got {request}"
-        except CommunicationError as e:
-            logging.debug(f"communication error", exc_info=True)
-            context.send_driver_state(DriverState.ERROR)  # error
-            info = connection.manager.get_status(kill_reason="communication error")
-            message, = e.args
-            context.send_driver_upward(f"{message} (process {info.error})")
-        except DriverStop:
-            context.send_driver_state(DriverState.READY)  # ok, no errors
+                try:
+                    if self.execution_mode is ExecutionMode.INTERPRETER:
+                        context.execute(self.interface)
+                    else:
+                        yield from run_execution_plan(context, compile_execution_plan(self.interface))
+                except InterfaceExitReached:
+                    pass
+                context.report_ready()
+                request = yield from context.await_request()
+                assert False, f"driver was not explicitly stopped, got {request}"
+            except CommunicationError as e:
+                logging.debug(f"communication error", exc_info=True)
+                context.send_driver_state(DriverState.ERROR)  # error
+                info = yield from wait_call(context.process.get_status, kill_reason="communication error")
+                message, = e.args
+                context.send_driver_upward(f"{message} (process {info.error})")
+            except DriverStop:
+                context.send_driver_state(DriverState.READY)  # ok, no errors
+
+            self.driver_channel.flush()
+            yield from wait_call(context.process.get_status, kill_reason=KILL_REASON_END)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,166 @@
+import os
+import shutil
+import threading
+import time
+from tempfile import TemporaryDirectory
+
+from turingarena.driver.artifacts import LOCK_PREFIX, ArtifactCache, artifact_key, tool_cache_dir
+from turingarena.driver.tests.test_utils import define_algorithm
+
+
+def test_artifact_key():
+    assert artifact_key("a", "bc") != artifact_key("ab", "c")
+    assert artifact_key("a", b"b") == artifact_key(b"a", "b")
+
+
+def test_artifact_cache_hit():
+    builds = []
+
+    def build(build_dir):
+        builds.append(build_dir)
+        with open(os.path.join(build_dir, "artifact"), "w") as f:
+            f.write("x")
+
+    with TemporaryDirectory() as cache_dir:
+        cache = ArtifactCache(directory=cache_dir, max_size=1024)
+        path = cache.get_or_build("key", build)
+        assert cache.get_or_build("key", build) == path
+        assert len(builds) == 1
+        assert os.path.exists(os.path.join(path, "artifact"))
+
+
+def test_artifact_cache_eviction():
+    def build(build_dir):
+        with open(os.path.join(build_dir, "artifact"), "w") as f:
+            f.write("x" * 10)
+
+    with TemporaryDirectory() as cache_dir:
+        cache = ArtifactCache(directory=cache_dir, max_size=15)
+        old_path = cache.get_or_build("old", build)
+        os.utime(old_path, (1, 1))
+        cache.get_or_build("new", build)
+        assert cache.lookup("old") is None
+        assert cache.lookup("new") is not None
+        assert os.listdir(cache_dir) == ["new"]
+
+
+def test_artifact_cache_eviction_spares_recently_used():
+    def build(build_dir):
+        with open(os.path.join(build_dir, "artifact"), "w") as f:
+            f.write("x" * 10)
+
+    with TemporaryDirectory() as cache_dir:
+        cache = ArtifactCache(directory=cache_dir, max_size=15)
+        old_path = cache.get_or_build("old", build)
+        os.utime(old_path, (1, 1))
+        # e.g., looked up by another process, which is about to use it
+        assert cache.lookup("old") == old_path
+        cache.get_or_build("new", build)
+        assert cache.lookup("old") is not None
+        assert cache.lookup("new") is not None
+
+
+def test_artifact_cache_not_writable():
+    builds = []
+
+    def build(build_dir):
+        builds.append(build_dir)
+        with open(os.path.join(build_dir, "artifact"), "w") as f:
+            f.write("x")
+
+    with TemporaryDirectory() as temp_dir:
+        not_a_dir = os.path.join(temp_dir, "file")
+        open(not_a_dir, "w").close()
+
+        cache = ArtifactCache(directory=os.path.join(not_a_dir, "cache"), max_size=1024)
+        paths = [cache.get_or_build("key", build) for _ in range(2)]
+        try:
+            assert len(builds) == 2
+            assert all(os.path.exists(os.path.join(path, "artifact")) for path in paths)
+        finally:
+            for path in paths:
+                shutil.rmtree(path)
+
+
+def test_artifact_cache_concurrent_build():
+    builds = []
+
+    def build(build_dir):
+        builds.append(build_dir)
+        time.sleep(0.05)
+
+    with TemporaryDirectory() as cache_dir:
+        cache = ArtifactCache(directory=cache_dir, max_size=1024)
+        paths = []
+        threads = [
+            threading.Thread(target=lambda: paths.append(cache.get_or_build("key", build)))
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(builds) == 1
+        assert len(set(paths)) == 1
+
+
+def _write_tool_cache_entries(path):
+    for name, mtime in [("old", 1), ("new", 2)]:
+        with open(os.path.join(path, name), "w") as f:
+            f.write("x" * 10)
+        os.utime(os.path.join(path, name), (mtime, mtime))
+
+
+def _tool_cache_entries(path):
+    return [name for name in os.listdir(path) if not name.startswith(LOCK_PREFIX)]
+
+
+def test_tool_cache_dir(monkeypatch):
+    with TemporaryDirectory() as cache_dir:
+        monkeypatch.setenv("TURINGARENA_CACHE_DIR", cache_dir)
+        monkeypatch.setenv("TURINGARENA_CACHE_MAX_SIZE", "15")
+
+        with tool_cache_dir("tool") as path:
+            _write_tool_cache_entries(path)
+
+        with tool_cache_dir("tool") as other_path:
+            assert other_path == path
+        assert _tool_cache_entries(path) == ["new"]
+
+
+def test_tool_cache_dir_not_evicted_while_used(monkeypatch):
+    with TemporaryDirectory() as cache_dir:
+        monkeypatch.setenv("TURINGARENA_CACHE_DIR", cache_dir)
+        monkeypatch.setenv("TURINGARENA_CACHE_MAX_SIZE", "15")
+
+        with tool_cache_dir("tool") as path:
+            _write_tool_cache_entries(path)
+            # e.g., another build, running concurrently
+            with tool_cache_dir("tool"):
+                assert sorted(_tool_cache_entries(path)) == ["new", "old"]
+
+
+def test_skeleton_object_shared(monkeypatch):
+    interface_text = """
+        function f(x);
+        main {
+            read x;
+            call y = f(x);
+            write y;
+        }
+    """
+
+    with TemporaryDirectory() as cache_dir:
+        monkeypatch.setenv("TURINGARENA_CACHE_DIR", cache_dir)
+        for k in range(2):
+            with define_algorithm(
+                    interface_text=interface_text,
+                    language_name="C++",
+                    source_text=f"int f(int x) {{ return x + {k}; }}",
+            ) as algo:
+                with algo.run() as p:
+                    assert p.functions.f(1) == 1 + k
+
+        # one skeleton, compiled only for the first program
+        assert len(os.listdir(os.path.join(cache_dir, "skeletons"))) == 1
@@ -0,0 +1,108 @@
+import pytest
+
+from turingarena import AlgorithmRuntimeError
+from turingarena.driver.tests.test_utils import define_algorithm
+
+interface_text = """
+    procedure set(n, a[]);
+    function get(i);
+    procedure nop();
+    main {
+        read n;
+        for i to n {
+            read a[i];
+        }
+        call set(n, a);
+        loop {
+            read c;
+            switch c {
+                case 1 {
+                    read i;
+                    call r = get(i);
+                    write r;
+                }
+                case 2 {
+                    call nop();
+                }
+                case 0 {
+                    break;
+                }
+            }
+        }
+    }
+"""
+
+source_text = """
+    #include <cstdlib>
+    int *A;
+    void set(int n, int *a) { A = a; }
+    int get(int i) { if (i < 0) abort(); return A[i]; }
+    void nop() {}
+"""
+
+
+def test_map():
+    with define_algorithm(
+            interface_text=interface_text,
+            language_name="C++",
+            source_text=source_text,
+    ) as algo:
+        with algo.run() as p:
+            a = [3, 1, 4, 1, 5, 9, 2, 6]
+            p.procedures.set(len(a), a)
+            assert p.map("get", range(len(a)), has_return_value=True) == a
+
+
+def test_batch():
+    with define_algorithm(
+            interface_text=interface_text,
+            language_name="C++",
+            source_text=source_text,
+    ) as algo:
+        with algo.run() as p:
+            a = list(range(1000))
+            p.procedures.set(len(a), a)
+            with p.batch() as batch:
+                futures = []
+                for i in range(len(a)):
+                    futures.append(batch.functions.get(i))
+                    batch.procedures.nop()
+            assert [f.result() for f in futures] == a
+            assert p.functions.get(42) == 42
+
+
+def test_batch_stops_at_first_error():
+    with define_algorithm(
+            interface_text=interface_text,
+            language_name="C++",
+            source_text=source_text,
+    ) as algo:
+        with pytest.raises(AlgorithmRuntimeError):
+            with algo.run() as p:
+                p.procedures.set(1, [0])
+                p.map("get", [0, -1, 0], has_return_value=True)
+
+
+def test_batch_error_in_body():
+    with define_algorithm(
+            interface_text=interface_text,
+            language_name="C++",
+            source_text=source_text,
+    ) as algo:
+        with algo.run() as p:
+            p.procedures.set(1, [7])
+            with pytest.raises(ZeroDivisionError):
+                with p.batch() as batch:
+                    future = batch.functions.get(0)
+                    1 / 0
+            assert future.cancelled()
+            # the process is still usable
+            assert p.functions.get(0) == 7
+
+        with pytest.raises(ZeroDivisionError):
+            with algo.run() as p:
+                p.procedures.set(1, [7])
+                with p.batch() as batch:
+                    # its error is not raised
+                    batch.functions.get(-1)
+                    1 / 0
@@ -1,3 +1,18 @@
+import io
+import shutil
+import time
+
+import pytest
+
+from turingarena.driver.common.nodes import For, Variable
+from turingarena.driver.compile.compile import compile_interface
+from turingarena.driver.drive.comm import SandboxTee, run_blocking
+from turingarena.driver.drive.context import Bindings
+from turingarena.driver.drive.execution import ExecutionPhase, Executor
+from turingarena.driver.drive.nodes import Step
+from turingarena.driver.drive.plan import ExecutionMode, ExecutionPlanCompiler, Frame
+from turingarena.driver.drive.watchdog import Watchdog
+from turingarena.driver.sandbox.connection import SandboxProcessConnection
 from turingarena.driver.tests.test_utils import define_algorithm
 
 
@@ -46,3 +61,124 @@ def test_multiple_calls():
             p.procedures.p(N)
             for i in range(N):
                 p.procedures.p(0)
+
+
+def _receive_nested_writes(n, mode):
+    """
+    Runs the upward phase of a loop which writes n x 2 values, in the given execution mode,
+    and returns the time it takes.
+    """
+
+    interface = compile_interface("""
+        function g(i, j);
+        main {
+            read n;
+            for i to n {
+                for j to 2 {
+                    call b[i][j] = g(i, j);
+                    write b[i][j];
+                }
+            }
+        }
+    """)
+
+    watchdog = Watchdog(timeout=60.0)
+    executor = Executor(
+        bindings=Bindings({Variable("n"): n}),
+        phase=ExecutionPhase.UPWARD,
+        process=None,
+        request_lookahead=None,
+        driver_channel=None,
+        sandbox_connection=SandboxProcessConnection(
+            downward=io.StringIO(),
+            upward=io.StringIO("".join(f"{i}\n" for i in range(2 * n))),
+            manager=None,
+        ),
+        sandbox_tee=SandboxTee(upward_tee=io.StringIO(), downward_tee=io.StringIO()),
+        watchdog=watchdog,
+    )
+
+    [loop] = [
+        c
+        for step in executor.transform(interface.main).children
+        if isinstance(step, Step)
+        for c in step.body.children
+        if isinstance(c, For)
+    ]
+
+    if mode is ExecutionMode.PLAN:
+        compiler = ExecutionPlanCompiler.create()
+        run = compiler.compile_node(loop, ExecutionPhase.UPWARD)
+        frame = Frame(executor, len(compiler.slots))
+        frame.values[compiler.slot(Variable("n"))] = n
+
+    try:
+        start = time.perf_counter()
+        if mode is ExecutionMode.PLAN:
+            run_blocking(run(frame))
+            values = frame.values[compiler.slot(Variable("b"))]
+        else:
+            [(reference, values)] = executor.execute(loop).assignments
+            assert reference == Variable("b")
+        elapsed = time.perf_counter() - start
+    finally:
+        watchdog.close()
+
+    assert values[-1] == [2 * n - 2, 2 * n - 1]
+    return elapsed
+
+
+@pytest.mark.parametrize("mode", list(ExecutionMode))
+def test_receive_array_scaling(mode):
+    times = {n: _receive_nested_writes(n, mode) for n in [10 ** 4, 10 ** 5]}
+    for n, t in times.items():
+        print(f"Receiving {2 * n} elements ({mode.value}): {t:.2f}s ({t / n * 1e6:.2f}us per iteration)")
+
+    # linear, with a wide margin (quadratic would be 100 times slower)
+    assert times[10 ** 5] < 20 * times[10 ** 4]
+
+
+def _java_start_time(monkeypatch, cds):
+    """
+    Returns the average time of a run of a trivial Java program, once compiled.
+    """
+    monkeypatch.setenv("TURINGARENA_JAVA_CDS", cds)
+    with define_algorithm(
+            interface_text="""
+                function f(x);
+
+                main {
+                    read x;
+                    call y = f(x);
+                    write y;
+                }
+            """,
+            language_name="Java",
+            source_text="""
+                class Solution extends Skeleton {
+                    int f(int x) {
+                        return x;
+                    }
+                }
+            """,
+    ) as algo:
+        # the first run also compiles the program, and the skeleton with its shared archive
+        with algo.run() as p:
+            assert p.functions.f(1) == 1
+
+        N = 10
+        start = time.perf_counter()
+        for i in range(N):
+            with algo.run() as p:
+                assert p.functions.f(i) == i
+        return (time.perf_counter() - start) / N
+
+
+@pytest.mark.skipif(shutil.which("javac") is None, reason="Java not available")
+def test_java_start(monkeypatch):
+    times = {cds: _java_start_time(monkeypatch, cds) for cds in ["0", "1"]}
+    for cds, t in times.items():
+        print(f"Java run with CDS={cds}: {t * 1000:.1f}ms")
+
+    # the JVM starts faster with the classes of the shared archive already parsed
+    assert times["1"] < times["0"]
@@ -0,0 +1,42 @@
+from turingarena.driver.drive.context import MAX_SCOPE_DEPTH, Bindings
+
+
+def test_bindings_extend():
+    root = Bindings({"a": 1})
+    bindings = root
+    for i in range(3 * MAX_SCOPE_DEPTH):
+        bindings = bindings.extend([("i", i), (f"x{i}", i)])
+
+    assert bindings.depth <= MAX_SCOPE_DEPTH
+    assert bindings["a"] == 1
+    assert bindings["i"] == 3 * MAX_SCOPE_DEPTH - 1
+    assert all(bindings[f"x{i}"] == i for i in range(3 * MAX_SCOPE_DEPTH))
+    assert "b" not in bindings
+
+    # extensions do not change the bindings they come from
+    assert "i" not in root
+    assert root.extend([("a", 2)])["a"] == 2
+    assert root["a"] == 1
+
+
+def test_bindings_loop_iterations_do_not_merge_entry():
+    entry = Bindings({f"y{j}": j for j in range(1000)})
+    for i in range(3):
+        entry = entry.extend([(f"z{i}", i)])
+    entry = entry.compact()
+
+    for i in range(10):
+        bindings = entry.extend([("i", i)])
+        for j in range(3 * MAX_SCOPE_DEPTH):
+            bindings = bindings.extend([(f"x{j}", i + j)])
+
+        assert bindings["y999"] == 999
+        assert bindings["z2"] == 2
+        assert bindings["x0"] == i
+        assert bindings.depth <= MAX_SCOPE_DEPTH
+
+        # the values of the entry are never copied again
+        scope = bindings
+        while scope is not entry:
+            assert len(scope.scope) <= 4 * MAX_SCOPE_DEPTH
+            scope = scope.parent
@@ -0,0 +1,106 @@
+import os
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from turingarena import AlgorithmRuntimeError
+from turingarena.driver.sandbox.cgroup import Cgroup, PeakMemoryReader, get_cgroup_root
+from turingarena.driver.sandbox.popen import PopenProcessManager, create_popen_process_connection
+from turingarena.driver.tests.test_utils import define_algorithm
+
+requires_cgroup = pytest.mark.skipif(get_cgroup_root() is None, reason="cgroup v2 not available")
+
+
+def test_popen_fallback(monkeypatch):
+    monkeypatch.setenv("TURINGARENA_CGROUP_ROOT", "")
+    connection = create_popen_process_connection(["cat"])
+    assert type(connection.manager) is PopenProcessManager
+    info = connection.manager.get_status(kill_reason="test")
+    assert "killed because: test" in info.error
+
+
+def test_peak_memory_reader_missing():
+    # before Linux 5.19
+    with TemporaryDirectory() as path:
+        reader = PeakMemoryReader(Cgroup(path))
+        assert reader.fd is None
+        assert not reader.resettable
+        reader.close()
+
+
+def test_peak_memory_reader_read_only(monkeypatch):
+    # before Linux 6.12
+    real_open = os.open
+
+    def open_read_only(path, flags, *args, **kwargs):
+        if flags & os.O_RDWR:
+            raise PermissionError(path)
+        return real_open(path, flags, *args, **kwargs)
+
+    with TemporaryDirectory() as path:
+        with open(os.path.join(path, "memory.peak"), "w") as f:
+            print(1024, file=f)
+        monkeypatch.setattr(os, "open", open_read_only)
+        reader = PeakMemoryReader(Cgroup(path))
+        assert not reader.resettable
+        assert reader.read_and_reset() == 1024
+        reader.close()
+
+
+@requires_cgroup
+def test_cgroup_accounting():
+    with define_algorithm(
+            interface_text="""
+                procedure p(n);
+                main {
+                    read n;
+                    call p(n);
+                    checkpoint;
+                }
+            """,
+            language_name="C++",
+            # a single process, since the sandbox does not allow creating more
+            source_text="""
+                #include <cstring>
+                void p(int n) {
+                    char *a = new char[n];
+                    memset(a, 1, n);
+                    volatile long x = 0;
+                    for (long i = 0; i < 100000000; i++) x += a[i % n];
+                }
+            """,
+    ) as algo:
+        with algo.run() as p:
+            with p.section() as section:
+                p.procedures.p(64 * 1024 * 1024)
+                p.checkpoint()
+            assert section.time_usage > 0.01
+            assert section.peak_memory_usage > 64 * 1024 * 1024
+
+
+@requires_cgroup
+def test_cgroup_memory_limit():
+    with define_algorithm(
+            interface_text="""
+                procedure p();
+                main {
+                    call p();
+                    checkpoint;
+                }
+            """,
+            language_name="C++",
+            source_text="""
+                #include <cstring>
+                void p() {
+                    int N = 512 * 1024 * 1024;
+                    char *a = new char[N];
+                    memset(a, 1, N);
+                }
+            """,
+    ) as algo:
+        with pytest.raises(AlgorithmRuntimeError) as exc_info:
+            with algo.run() as p:
+                p.procedures.p()
+                p.checkpoint()
+        assert "memory limit exceeded" in exc_info.value.message
+
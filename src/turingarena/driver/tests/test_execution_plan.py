@@ -0,0 +1,177 @@
+import os
+from tempfile import TemporaryDirectory
+
+from turingarena.driver.drive.plan import ExecutionMode
+from turingarena.driver.tests.test_utils import define_algorithm
+
+
+def run_in_all_modes(algo, scenario):
+    """
+    Runs the given scenario with each execution mode,
+    and checks that results and communication with the process are the same.
+    """
+
+    outcomes = []
+    for mode in ExecutionMode:
+        with TemporaryDirectory() as tmp_dir:
+            downward_tee = os.path.join(tmp_dir, "downward.txt")
+            upward_tee = os.path.join(tmp_dir, "upward.txt")
+            try:
+                with algo.run(downward_tee=downward_tee, upward_tee=upward_tee, execution_mode=mode) as p:
+                    result = scenario(p)
+            except Exception as e:
+                result = (type(e), str(e))
+            with open(downward_tee) as f, open(upward_tee) as g:
+                outcomes.append((result, f.read(), g.read()))
+
+    plan_outcome, interpreter_outcome = outcomes
+    assert plan_outcome == interpreter_outcome
+    return plan_outcome[0]
+
+
+def test_nested_for_and_callbacks():
+    with define_algorithm(
+            interface_text="""
+                const K = 3;
+                function f(n, a[][]) callbacks {
+                    function c(x);
+                }
+                function g(i);
+                main {
+                    read n;
+                    for i to n {
+                        for j to K {
+                            read a[i][j];
+                        }
+                    }
+                    call s = f(n, a) callbacks {
+                        function c(x) {
+                            write x;
+                            read y;
+                            return y;
+                        }
+                    }
+                    write s;
+                    for i to n {
+                        call b = g(i);
+                        write b;
+                    }
+                }
+            """,
+            language_name="C++",
+            source_text="""
+                int f(int n, int **a, int c(int)) {
+                    int s = 0;
+                    for (int i = 0; i < n; i++) for (int j = 0; j < 3; j++) s += c(a[i][j]);
+                    return s;
+                }
+                int g(int i) { return i * i; }
+            """,
+    ) as algo:
+        def scenario(p):
+            s = p.functions.f(2, [[1, 2, 3], [4, 5, 6]], callbacks=[lambda x: x + 1])
+            return s, [p.functions.g(i) for i in range(2)]
+
+        assert run_in_all_modes(algo, scenario) == (27, [0, 1])
+
+
+def test_loop_switch_if():
+    with define_algorithm(
+            interface_text="""
+                function f(x);
+                procedure p();
+                main {
+                    loop {
+                        read op;
+                        switch op {
+                            case 1 {
+                                read x;
+                                call r = f(x);
+                                write r;
+                                if r {
+                                    call p();
+                                }
+                            }
+                            case 2 {
+                                break;
+                            }
+                        }
+                    }
+                    checkpoint;
+                }
+            """,
+            language_name="C++",
+            source_text="""
+                int f(int x) { return x % 2; }
+                void p() {}
+            """,
+    ) as algo:
+        def scenario(p):
+            results = []
+            for x in range(5):
+                results.append(p.functions.f(x))
+                if results[-1]:
+                    p.procedures.p()
+            p.checkpoint()
+            return results
+
+        assert run_in_all_modes(algo, scenario) == [0, 1, 0, 1, 0]
+
+
+def test_interface_error():
+    with define_algorithm(
+            interface_text="""
+                function f(x);
+                main {
+                    read x;
+                    call r = f(x);
+                    write r;
+                }
+            """,
+            language_name="C++",
+            source_text="int f(int x) { return x; }",
+    ) as algo:
+        run_in_all_modes(algo, lambda p: p.procedures.f(1))
+
+
+def test_bulk_transfer():
+    # arrays are sent and received at once
+    with define_algorithm(
+            interface_text="""
+                const K = 2;
+                function f(n, a[], b[], c[][]);
+                function g(i);
+                main {
+                    read n;
+                    for i to n {
+                        read a[i], b[i];
+                        for j to K {
+                            read c[i][j];
+                        }
+                    }
+                    call s = f(n, a, b, c);
+                    write s;
+                    for i to n {
+                        call d[i] = g(i);
+                        write d[i];
+                    }
+                    checkpoint;
+                }
+            """,
+            language_name="C++",
+            source_text="""
+                int n, *a, *b, **c;
+                int f(int n_, int *a_, int *b_, int **c_) { n = n_; a = a_; b = b_; c = c_; return 0; }
+                int g(int i) { return a[i] * b[i] + c[i][0] - c[i][1]; }
+            """,
+    ) as algo:
+        def scenario(p):
+            a = [1, 2, 3]
+            b = [4, 5, 6]
+            c = [[7, 8], [9, 10], [11, 12]]
+            p.functions.f(3, a, b, c)
+            d = [p.functions.g(i) for i in range(3)]
+            p.checkpoint()
+            return d
+
+        assert run_in_all_modes(algo, scenario) == [3, 9, 17]
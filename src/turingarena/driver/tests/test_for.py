@@ -74,4 +74,49 @@ def test_double_for():
             assert p.functions.f(n, m, a) == 42
             for i in range(n):
                 for j in range(m):
-                    assert p.functions.g(i, j) == i * j
\ No newline at end of file
+                    assert p.functions.g(i, j) == i * j
+
+def test_double_for_python():
+    # the Python skeleton reads the innermost loop in bulk
+    with define_algorithm(
+            interface_text="""
+            function f(n, m, a[][]);
+            function g(i, j);
+
+            main {
+                read n, m;
+                for i to n {
+                    for j to m {
+                        read a[i][j];
+                    }
+                }
+
+                call r = f(n, m, a);
+                write r;
+
+                for i to n {
+                    for j to m {
+                        call s = g(i, j);
+                        write s;
+                    }
+                }
+            }
+        """,
+            language_name="Python",
+            source_text="""if True:
+            def f(n, m, a):
+                global A
+                A = a
+                return sum(map(len, a))
+
+            def g(i, j):
+                return A[i][j]
+        """,
+    ) as algorithm:
+        with algorithm.run() as p:
+            n, m = 3, 4
+            a = [[i * j - 5 for j in range(m)] for i in range(n)]
+            assert p.functions.f(n, m, a) == n * m
+            for i in range(n):
+                for j in range(m):
+                    assert p.functions.g(i, j) == i * j - 5
@@ -0,0 +1,30 @@
+from tempfile import TemporaryDirectory
+
+from turingarena.driver.artifacts import ArtifactCache
+from turingarena.driver.compile import compile as compile_module
+from turingarena.driver.compile.compile import compile_interface
+
+INTERFACE_TEXT = """
+    function f(a[]);
+    main {
+        read n;
+        for i to n {
+            read a[i];
+        }
+        call r = f(a);
+        write r;
+    }
+"""
+
+
+def test_interface_cache():
+    with TemporaryDirectory() as cache_dir:
+        cache = ArtifactCache(directory=cache_dir, max_size=1024 ** 2)
+        compile_module._compiled_interfaces.clear()
+
+        interface = compile_interface(INTERFACE_TEXT, cache=cache)
+        assert compile_interface(INTERFACE_TEXT, cache=cache) is interface
+
+        # simulate a new process, which finds the interface on disk
+        compile_module._compiled_interfaces.clear()
+        assert compile_interface(INTERFACE_TEXT, cache=cache) == interface
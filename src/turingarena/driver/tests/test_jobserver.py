@@ -0,0 +1,39 @@
+import threading
+import time
+from tempfile import TemporaryDirectory
+
+from turingarena.driver.jobserver import JobServer
+
+
+def test_max_jobs():
+    running = []
+    max_running = []
+    lock = threading.Lock()
+
+    with TemporaryDirectory() as jobs_dir:
+        job_server = JobServer(jobs_dir, max_jobs=2)
+
+        def job():
+            with job_server.job("test"):
+                with lock:
+                    running.append(None)
+                    max_running.append(len(running))
+                time.sleep(0.05)
+                with lock:
+                    running.pop()
+
+        threads = [threading.Thread(target=job) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert max(max_running) == 2
+
+        stats = job_server.stats()
+        assert stats.waiting == 0
+        assert stats.running == 0
+        assert stats.completed == 6
+        assert stats.run_time >= 6 * 0.05
+        # at least two rounds of jobs waited for the first one
+        assert stats.wait_time >= 0.05
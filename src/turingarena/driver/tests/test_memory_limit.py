@@ -1,6 +1,9 @@
+import pytest
 from pytest import raises
 
 from turingarena import MemoryLimitExceeded
+from turingarena.driver.client.program import ServerMode
+from turingarena.driver.sandbox.connection import ResourceAccounting
 from turingarena.driver.tests.test_utils import define_algorithm
 
 
@@ -46,7 +49,12 @@ def my_algo():
     )
 
 
-def test_memory_usage():
+@pytest.mark.parametrize("accounting", ResourceAccounting)
+def test_memory_usage(monkeypatch, accounting):
+    monkeypatch.setenv("TURINGARENA_DRIVER_RESOURCE_ACCOUNTING", accounting.value)
+    if accounting is ResourceAccounting.STOP:
+        # not supported by the multiplexed server
+        monkeypatch.setenv("TURINGARENA_DRIVER_SERVER", ServerMode.THREAD.value)
     with my_algo() as algo:
         with algo.run() as p:
             with p.section() as s1:
@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+from contextlib import ExitStack
+
+import pytest
+
+from turingarena.driver.client.exceptions import AlgorithmRuntimeError
+from turingarena.driver.client.program import ServerMode
+from turingarena.driver.tests.test_utils import define_algorithm
+
+INTERFACE_TEXT = """
+    function f(x) callbacks {
+        function c(y);
+    }
+    main {
+        loop {
+            read a;
+            switch a {
+                case 1 {
+                    read x;
+                    call r = f(x) callbacks {
+                        function c(y) {
+                            write y;
+                            read z;
+                            return z;
+                        }
+                    }
+                    write r;
+                }
+                case 2 {
+                    break;
+                }
+            }
+        }
+        checkpoint;
+    }
+"""
+
+
+def test_many_processes_in_one_thread():
+    with define_algorithm(
+            interface_text=INTERFACE_TEXT,
+            language_name="C++",
+            source_text="""
+                int f(int x, int c(int)) { return c(x) + 1; }
+            """,
+    ) as algo, ExitStack() as stack:
+        threads = threading.active_count()
+
+        processes = [
+            stack.enter_context(algo.run(server_mode=ServerMode.MULTIPLEXED))
+            for _ in range(16)
+        ]
+        # at most the thread of the multiplexed server, if not started yet
+        assert threading.active_count() <= threads + 1
+
+        for k in range(3):
+            results = [
+                p.functions.f(i + k, callbacks=[lambda y: 2 * y])
+                for i, p in enumerate(processes)
+            ]
+            assert results == [2 * (i + k) + 1 for i in range(16)]
+
+        for p in processes:
+            p.checkpoint()
+
+
+def test_timeout_does_not_block_other_processes():
+    with define_algorithm(
+            interface_text=INTERFACE_TEXT,
+            language_name="C++",
+            source_text="""
+                int f(int x, int c(int)) { if (x < 0) for(;;); return c(x) + 1; }
+            """,
+    ) as algo:
+        with open(os.path.join(os.path.dirname(algo.interface_path), "Turingfile"), "w") as f:
+            print("[driver]", file=f)
+            print("upward_timeout = 0.5", file=f)
+
+        errors = []
+        with algo.run(server_mode=ServerMode.MULTIPLEXED) as p:
+            blocked = threading.Thread(target=_call_blocked, args=(algo, errors))
+            blocked.start()
+            call_times = []
+            try:
+                while blocked.is_alive():
+                    start = time.monotonic()
+                    assert p.functions.f(1, callbacks=[lambda y: y]) == 2
+                    call_times.append(time.monotonic() - start)
+            finally:
+                blocked.join()
+            p.checkpoint()
+
+        # the server kept serving this process while waiting for the other one, and while killing it
+        assert len(call_times) > 10
+        assert max(call_times) < 0.25
+        [error] = errors
+        assert "timeout expired" in error.message
+
+
+def _call_blocked(algo, errors):
+    try:
+        with algo.run(server_mode=ServerMode.MULTIPLEXED) as p:
+            p.functions.f(-1, callbacks=[lambda y: y])
+    except AlgorithmRuntimeError as e:
+        errors.append(e)
+
+
+def test_stop_accounting_refused(monkeypatch):
+    monkeypatch.setenv("TURINGARENA_DRIVER_RESOURCE_ACCOUNTING", "stop")
+    with define_algorithm(
+            interface_text=INTERFACE_TEXT,
+            language_name="C++",
+            source_text="int f(int x, int c(int)) { return x; }",
+    ) as algo:
+        with pytest.raises(ValueError):
+            with algo.run(server_mode=ServerMode.MULTIPLEXED):
+                pass
@@ -1,3 +1,6 @@
+import types
+
+from turingarena.driver.compile.parser import create_static_parser, generate_static_parser_source, get_grammar
 from .test_utils import assert_no_interface_errors
 
 interface = '''
@@ -55,3 +58,22 @@ interface = '''
 
 def test_parsing():
     assert_no_interface_errors(interface)
+
+
+def test_static_parser():
+    static_parser = types.ModuleType("static_parser")
+    exec(generate_static_parser_source(), static_parser.__dict__)
+
+    def parse(parser):
+        ast = parser.parse(interface, start="interface", asmodel=False, parseinfo=True)
+        return strip_parseinfo(ast)
+
+    assert parse(create_static_parser(static_parser)) == parse(get_grammar())
+
+
+def strip_parseinfo(ast):
+    if isinstance(ast, dict):
+        return {k: strip_parseinfo(v) for k, v in ast.items() if k != "parseinfo"}
+    if isinstance(ast, (list, tuple)):
+        return [strip_parseinfo(v) for v in ast]
+    return ast
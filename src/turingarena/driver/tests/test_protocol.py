@@ -0,0 +1,46 @@
+from turingarena.driver.client.channel import DriverProtocol, decode_frame, encode_frame
+from turingarena.driver.tests.test_utils import define_algorithm
+
+
+def test_frame_round_trip():
+    items = ["call", "f", 2, 0, -5, 1, 3, 0, 1, 2, 1.5, "message with spaces", 0]
+    assert decode_frame(encode_frame(items)) == items
+
+
+def test_frame_empty():
+    assert decode_frame(encode_frame([])) == []
+
+
+def test_protocols():
+    with define_algorithm(
+            interface_text="""
+                function f(n, a[]) callbacks {
+                    function c(x);
+                }
+                main {
+                    read n;
+                    for i to n {
+                        read a[i];
+                    }
+                    call r = f(n, a) callbacks {
+                        function c(x) {
+                            write x;
+                            read y;
+                            return y;
+                        }
+                    }
+                    write r;
+                }
+            """,
+            language_name="C++",
+            source_text="""
+                int f(int n, int a[], int c(int)) {
+                    int s = 0;
+                    for (int i = 0; i < n; i++) s += c(a[i]);
+                    return s;
+                }
+            """,
+    ) as algo:
+        for protocol in DriverProtocol:
+            with algo.run(protocol=protocol) as p:
+                assert p.functions.f(3, [1, 2, 3], callbacks=[lambda x: 2 * x]) == 12
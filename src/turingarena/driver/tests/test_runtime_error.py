@@ -1,6 +1,10 @@
+import os
+import time
+
 import pytest
 
 from turingarena.driver.client.exceptions import AlgorithmRuntimeError
+from turingarena.driver.sandbox.connection import SandboxTransport
 from turingarena.driver.tests.test_utils import define_algorithm
 
 INTERFACE_TEXT = """
@@ -28,6 +32,28 @@ def test_timeout():
         assert "timeout expired" in exc_info.value.message
 
 
+def test_timeout_from_turingfile():
+    with define_algorithm(
+            interface_text=INTERFACE_TEXT,
+            language_name="C++",
+            source_text="""
+                #include <cstdio>
+                void p() { for(;;) scanf(" "); }
+            """,
+    ) as algo:
+        with open(os.path.join(os.path.dirname(algo.interface_path), "Turingfile"), "w") as f:
+            print("[driver]", file=f)
+            print("upward_timeout = 0.2", file=f)
+
+        start = time.monotonic()
+        with pytest.raises(AlgorithmRuntimeError) as exc_info:
+            with algo.run() as p:
+                p.procedures.p()
+                p.checkpoint()
+        assert "timeout expired" in exc_info.value.message
+        assert time.monotonic() - start < 2.0
+
+
 def test_io_blocked():
     with define_algorithm(
             interface_text=INTERFACE_TEXT,
@@ -46,7 +72,13 @@ def test_io_blocked():
         assert "timeout expired" in exc_info.value.message
 
 
-def test_io_garbage():
+@pytest.mark.parametrize("transport, message", [
+    (SandboxTransport.PIPE, "sent invalid data"),
+    # the skeleton only sends records through the shared memory, so the garbage goes unread
+    (SandboxTransport.SHARED_MEMORY, "timeout expired"),
+])
+def test_io_garbage(monkeypatch, transport, message):
+    monkeypatch.setenv("TURINGARENA_SANDBOX_TRANSPORT", transport.value)
     with define_algorithm(
             interface_text=INTERFACE_TEXT,
             language_name="C++",
@@ -55,8 +87,12 @@ def test_io_garbage():
                 void p() { for(;;) printf("garbage\n"); }
             """,
     ) as algo:
+        with open(os.path.join(os.path.dirname(algo.interface_path), "Turingfile"), "w") as f:
+            print("[driver]", file=f)
+            print("upward_timeout = 0.5", file=f)
+
         with pytest.raises(AlgorithmRuntimeError) as exc_info:
             with algo.run() as p:
                 p.procedures.p()
                 p.checkpoint()
-        assert "sent invalid data" in exc_info.value.message
+        assert message in exc_info.value.message
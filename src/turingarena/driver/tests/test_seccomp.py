@@ -0,0 +1,31 @@
+import errno
+import subprocess
+import sys
+
+import pytest
+
+from turingarena.driver.sandbox.seccomp import ALLOW, ERRNO, Arg, SeccompFilter, SeccompRule, get_architecture, \
+    get_seccomp_program
+
+requires_seccomp = pytest.mark.skipif(get_architecture() is None, reason="architecture not supported")
+
+
+@requires_seccomp
+def test_seccomp_argument_rule():
+    program = get_seccomp_program(SeccompFilter(
+        default_action=ALLOW,
+        rules=(
+            SeccompRule(ERRNO(errno.EACCES), "write", (Arg(index=0, value=2),)),
+        ),
+    ))
+
+    result = subprocess.run(
+        [sys.executable, "-c", "import os; os.write(1, b'out'); os.write(2, b'err')"],
+        preexec_fn=program.load,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+    assert result.stdout == b"out"
+    assert result.stderr == b""
+    assert result.returncode != 0
@@ -0,0 +1,103 @@
+import os
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from turingarena.driver.sandbox.connection import SandboxTransport
+from turingarena.driver.tests.test_utils import define_algorithm
+
+SOURCE = """
+        int f(int n, int a[], int c(int)) {
+            int s = 0;
+            for (int i = 0; i < n; i++) s = (s + a[i]) % 1000;
+            return s + c(a[0]) + c(a[n - 1]);
+        }
+        int g(int i) { return -i; }
+    """
+
+
+@pytest.mark.parametrize("language_name", ["C++", "C"])
+def test_shared_memory_transport(monkeypatch, language_name):
+    with define_algorithm(
+            interface_text="""
+                function f(n, a[]) callbacks {
+                    function c(x);
+                }
+                function g(i);
+                main {
+                    read n;
+                    for i to n {
+                        read a[i];
+                    }
+                    call r = f(n, a) callbacks {
+                        function c(x) {
+                            write x;
+                            read y;
+                            return y;
+                        }
+                    }
+                    write r;
+                    for i to 3 {
+                        call b[i] = g(i);
+                        write b[i];
+                    }
+                    checkpoint;
+                }
+            """,
+            language_name=language_name,
+            source_text=SOURCE,
+    ) as algo:
+        # more values than fit in the ring at once
+        a = list(range(200000))
+
+        outcomes = []
+        for transport in SandboxTransport:
+            monkeypatch.setenv("TURINGARENA_SANDBOX_TRANSPORT", transport.value)
+            with TemporaryDirectory() as tmp_dir:
+                downward_tee = os.path.join(tmp_dir, "downward.txt")
+                upward_tee = os.path.join(tmp_dir, "upward.txt")
+                with algo.run(downward_tee=downward_tee, upward_tee=upward_tee) as p:
+                    assert p.functions.f(len(a), a, callbacks=[lambda x: x + 1]) == 200001
+                    assert [p.functions.g(i) for i in range(3)] == [0, -1, -2]
+                    p.checkpoint()
+                with open(downward_tee) as f, open(upward_tee) as g:
+                    outcomes.append((f.read(), g.read()))
+
+        pipe_outcome, shm_outcome = outcomes
+        assert pipe_outcome == shm_outcome
+
+
+def test_shared_memory_full_upward_ring(monkeypatch):
+    monkeypatch.setenv("TURINGARENA_SANDBOX_TRANSPORT", SandboxTransport.SHARED_MEMORY.value)
+    with define_algorithm(
+            interface_text="""
+                procedure init(n);
+                function g(i);
+                main {
+                    read n;
+                    call init(n);
+                    for i to n {
+                        call b[i] = g(i);
+                        write b[i];
+                    }
+                    checkpoint;
+                }
+            """,
+            language_name="C++",
+            source_text="""
+                void init(int n) {}
+                int g(int i) {
+                    // the driver waits for the first value, then the others fill the ring
+                    if (i == 0) for (volatile int j = 0; j < 100000000; j++);
+                    return -i;
+                }
+            """,
+    ) as algo:
+        # more values (two for each record) than fit in the ring, written without flushing in between
+        n = 70000
+        with algo.run() as p:
+            p.procedures.init(n)
+            with p.batch() as batch:
+                futures = [batch.functions.g(i) for i in range(n)]
+            assert [f.result() for f in futures] == [-i for i in range(n)]
+            p.checkpoint()
@@ -0,0 +1,98 @@
+import functools
+import timeit
+
+import pytest
+
+from turingarena.util.visitor import classvisitormethod, visitormethod
+
+
+class Base:
+    pass
+
+
+class Derived(Base):
+    pass
+
+
+class Leaf(Derived):
+    pass
+
+
+class NodeVisitor:
+    @visitormethod
+    def visit(self, node):
+        pass
+
+    def visit_Base(self, node):
+        return "base"
+
+    def visit_Derived(self, node):
+        return NotImplemented
+
+    def visit_Leaf(self, node):
+        return "leaf"
+
+    @classvisitormethod
+    def create(self, cls):
+        pass
+
+    def create_object(self, cls):
+        return cls()
+
+    @staticmethod
+    def visit_int(node):
+        return "int"
+
+
+def test_visitor_dispatch():
+    v = NodeVisitor()
+    assert v.visit(Leaf()) == "leaf"
+    assert v.visit(Derived()) == "base"
+    assert v.visit(Base()) == "base"
+    assert v.visit(1) == "int"
+    assert isinstance(v.create(Leaf), Leaf)
+
+
+def test_visitor_dispatch_subclass():
+    class SubVisitor(NodeVisitor):
+        def visit_Derived(self, node):
+            return "derived"
+
+    assert SubVisitor().visit(Derived()) == "derived"
+    assert NodeVisitor().visit(Derived()) == "base"
+
+
+def test_visitor_not_implemented():
+    with pytest.raises(NotImplementedError):
+        NodeVisitor().visit("string")
+
+
+def mro_visitormethod(f):
+    # reference implementation, scanning the MRO at every call
+    @functools.wraps(f)
+    def visitor_method(self, node, *args, **kwargs):
+        for cls in node.__class__.__mro__:
+            try:
+                method = getattr(self, f"{f.__name__}_{cls.__name__}")
+            except AttributeError:
+                continue
+            ans = method(node, *args, **kwargs)
+            if ans is not NotImplemented:
+                return ans
+        raise NotImplementedError
+
+    return visitor_method
+
+
+class MroNodeVisitor(NodeVisitor):
+    visit = mro_visitormethod(NodeVisitor.visit)
+
+
+def test_dispatch_benchmark():
+    nodes = [Leaf(), Derived(), Base()]
+
+    def dispatch_time(visitor):
+        return min(timeit.repeat(lambda: [visitor.visit(n) for n in nodes], number=10000, repeat=5))
+
+    # the table dispatch should be faster, the margin is for noisy machines
+    assert dispatch_time(NodeVisitor()) < 1.5 * dispatch_time(MroNodeVisitor())
@@ -0,0 +1,34 @@
+import functools
+
+MAX_MEMO_SIZE = 1 << 16
+
+
+def memoizedanalysis(f):
+    """
+    Memoizes an analysis of a node, by analyzer class and node identity.
+
+    Nodes are (possibly unhashable) trees, so they are not compared by value:
+    each node is kept alive with its result, so that its id is not reused while cached.
+    Results must not be mutated by callers.
+    """
+
+    cache = {}
+
+    @functools.wraps(f)
+    def memoized(self, node):
+        key = (self.__class__, id(node))
+        try:
+            cached_node, result = cache[key]
+        except KeyError:
+            pass
+        else:
+            if cached_node is node:
+                return result
+
+        result = f(self, node)
+        if len(cache) >= MAX_MEMO_SIZE:
+            cache.clear()
+        cache[key] = (node, result)
+        return result
+
+    return memoized
@@ -1,35 +1,71 @@
 import functools
+import inspect
 from functools import partial
+from types import FunctionType
 
 
 def visitormethod(f, *, meta=False, static=False):
-    @functools.wraps(f)
-    def visitor_method(self, node, *args, **kwargs):
-        if meta:
-            mro = node.__mro__
-        else:
-            mro = node.__class__.__mro__
+    """
+    Dispatches on the class of the node to a method named `<f>_<class name>`,
+    trying each class in the MRO of the node, until a method does not return NotImplemented.
+
+    The methods to try are resolved once per (visitor class, node class) pair,
+    and then looked up in a dispatch table.
+    """
+
+    dispatch_table = {}
 
-        for cls in mro:
+    def resolve(visitor_class, node_class):
+        candidates = []
+        for cls in node_class.__mro__:
+            name = f"{f.__name__}_{cls.__name__}"
             try:
-                method = getattr(self, f"{f.__name__}_{cls.__name__}")
+                attr = inspect.getattr_static(visitor_class, name)
             except AttributeError:
                 continue
-
-            if static:
-                ans = method(*args, **kwargs)
+            if isinstance(attr, FunctionType):
+                method = attr
             else:
-                ans = method(node, *args, **kwargs)
+                # not a plain method (e.g., a staticmethod), bind it at every call
+                method = partial(_call_bound_method, name)
+            if static:
+                method = partial(_call_without_node, method)
+            candidates.append(method)
+
+        candidates = tuple(candidates)
+        dispatch_table[visitor_class, node_class] = candidates
+        return candidates
 
+    def not_implemented(node_class):
+        options = ", ".join(cls.__name__ for cls in node_class.__mro__)
+        return NotImplementedError(f"{f.__name__} for [{options}]")
+
+    @functools.wraps(f)
+    def visitor_method(self, node, *args, **kwargs):
+        node_class = node if meta else node.__class__
+        try:
+            candidates = dispatch_table[self.__class__, node_class]
+        except KeyError:
+            candidates = resolve(self.__class__, node_class)
+
+        for method in candidates:
+            ans = method(self, node, *args, **kwargs)
             if ans is not NotImplemented:
                 return ans
 
-        options = ", ".join(cls.__name__ for cls in mro)
-        raise NotImplementedError(f"{f.__name__} for [{options}]")
+        raise not_implemented(node_class)
 
     return visitor_method
 
 
+def _call_bound_method(name, self, *args, **kwargs):
+    return getattr(self, name)(*args, **kwargs)
+
+
+def _call_without_node(method, self, node, *args, **kwargs):
+    return method(self, *args, **kwargs)
+
+
 classvisitormethod = partial(visitormethod, meta=True)
 
 